@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash
 import os
 import json
 import subprocess
@@ -9,7 +9,21 @@ import threading
 import time
 from datetime import datetime
 import hashlib
+import gzip
+import atexit
+import signal
 from log import write_log
+from fsutil import write_atomic, FileRWLock
+from sync_stats import load_history
+from snapshots import SnapshotStore
+from scheduler import SyncScheduler, EXIT_MERGED
+from zr import plan_sync
+from node_check import load_quarantine
+from node_index import NodeIndex, SORT_KEYS, apply_edits, parse_line, is_valid_node_url, get_node_type
+from events import EventHub, read_tail
+import proc_inspect
+from probe import PROBE_TIMEOUT, LATENCY_GOOD, LATENCY_WARNING, classify, run_probes, iter_probes
+from latency_store import LatencyStore
 import re
 
 app = Flask(__name__)
@@ -21,11 +35,26 @@ NODES_FILE = f"{ROOT_DIR}/wangluo/nodes.txt"
 LOG_FILE = f"{ROOT_DIR}/wangluo/log.txt"
 CONFIG_FILE = os.getenv("OPENCLASH_CONFIG_PATH", "/etc/openclash/config.yaml")
 PID_FILE = "/tmp/openclash_watchdog.pid"
+# nodes.txt 的读写锁文件（flock），线程与多个 worker 进程之间共用
+NODES_LOCK_FILE = "/tmp/openclash_nodes.lock"
+# 大于该字节数的 JSON / 文本响应在客户端支持时用 gzip 压缩
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+# 进程启动标识：索引版本号等计数器在重启后从头开始，加入 ETag 避免命中重启前的缓存
+BOOT_ID = f"{os.getpid()}-{time.time_ns()}"
 
 class OpenClashManager:
     def __init__(self):
         self.watchdog_running = False
         self.watchdog_thread = None
+        # 节点索引：读接口直接从内存返回，文件被外部修改时按 stat 变化重新读取
+        self.node_index = NodeIndex(NODES_FILE)
+        # 读-改-写 nodes.txt 时持有写锁，读取时持有读锁
+        self.nodes_lock = FileRWLock(NODES_LOCK_FILE)
+        # 测速历史：TTL 内的结果直接复用，重启后从 latency.json 恢复
+        self.latency_store = LatencyStore()
+        # 按延迟排序时的数据来源：node -> 毫秒数或 None，未设置时按原顺序
+        self.latency_source = self.latency_store.latency_of
     
     def check_dependencies(self):
         """检查依赖文件是否存在"""
@@ -34,7 +63,25 @@ class OpenClashManager:
             f"{ROOT_DIR}/zr.py", 
             f"{ROOT_DIR}/jx.py",
             f"{ROOT_DIR}/zw.py",
-            f"{ROOT_DIR}/zc.py"
+            f"{ROOT_DIR}/zc.py",
+            f"{ROOT_DIR}/fsutil.py",
+            f"{ROOT_DIR}/sync_stats.py",
+            f"{ROOT_DIR}/env_probe.py",
+            f"{ROOT_DIR}/change_detect.py",
+            f"{ROOT_DIR}/watcher.py",
+            f"{ROOT_DIR}/scheduler.py",
+            f"{ROOT_DIR}/snapshots.py",
+            f"{ROOT_DIR}/sync_plan.py",
+            f"{ROOT_DIR}/node_check.py",
+            f"{ROOT_DIR}/lowprio.py",
+            f"{ROOT_DIR}/fragments.py",
+            f"{ROOT_DIR}/fastyaml.py",
+            f"{ROOT_DIR}/profiles.py",
+            f"{ROOT_DIR}/node_index.py",
+            f"{ROOT_DIR}/events.py",
+            f"{ROOT_DIR}/proc_inspect.py",
+            f"{ROOT_DIR}/probe.py",
+            f"{ROOT_DIR}/latency_store.py"
         ]
         
         missing_files = []
@@ -81,10 +128,8 @@ class OpenClashManager:
     def get_nodes_content(self):
         """获取节点文件内容"""
         try:
-            if os.path.exists(NODES_FILE):
-                with open(NODES_FILE, 'r', encoding='utf-8') as f:
-                    return f.read()
-            return ""
+            with self.nodes_lock.read():
+                return self.node_index.content()
         except Exception as e:
             write_log(f"❌ 读取节点文件失败: {e}")
             return ""
@@ -92,168 +137,119 @@ class OpenClashManager:
     def save_nodes_content(self, content):
         """保存节点文件内容"""
         try:
-            os.makedirs(os.path.dirname(NODES_FILE), exist_ok=True)
-            with open(NODES_FILE, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # 临时文件 + rename：监控进程只会看到完整的文件，并且只触发一次变化
+            with self.nodes_lock.write():
+                write_atomic(NODES_FILE, content)
+                self.node_index.update(content)
             write_log("✅ 节点文件已更新")
             return True
         except Exception as e:
             write_log(f"❌ 保存节点文件失败: {e}")
             return False
     
-    def parse_nodes(self, content):
-        """解析节点内容，返回节点列表"""
-        nodes = []
-        lines = content.strip().split('\n')
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            # 尝试解析节点名称（在#后面）
-            node_name = ""
-            if '#' in line:
-                parts = line.split('#', 1)
-                node_url = parts[0].strip()
-                node_name = parts[1].strip() if len(parts) > 1 else ""
-                
-                # 处理URL编码的节点名称
-                if node_name:
-                    try:
-                        from urllib.parse import unquote
-                        # 多次解码，处理多重编码的情况
-                        original_name = node_name
-                        for _ in range(3):  # 最多解码3次
-                            decoded_name = unquote(node_name)
-                            if decoded_name == node_name:  # 如果没有变化，说明已经解码完成
-                                break
-                            node_name = decoded_name
-                    except Exception as e:
-                        write_log(f"⚠️ URL解码失败: {e}")
-            else:
-                node_url = line
-            
-            # 验证是否为有效的节点链接
-            if self.is_valid_node_url(node_url):
-                nodes.append({
-                    'index': i,
-                    'url': node_url,
-                    'name': node_name,
-                    'type': self.get_node_type(node_url),
-                    'full_line': line
-                })
-        
-        return nodes
-    
     def is_valid_node_url(self, url):
         """验证是否为有效的节点URL"""
-        if not url or '://' not in url:
-            return False
-        
-        # 检查支持的协议
-        supported_protocols = ['ss://', 'ssr://', 'vmess://', 'vless://', 'trojan://']
-        if not any(url.startswith(protocol) for protocol in supported_protocols):
-            return False
-        
-        # 检查URL长度
-        if len(url) < 20:  # 最小长度
-            return False
-        
-        return True
+        return is_valid_node_url(url)
     
     def get_node_type(self, url):
         """获取节点类型"""
-        # 提取协议类型
-        if '://' in url:
-            protocol = url.split('://')[0].upper()
-            return protocol
-        else:
-            return 'Unknown'
+        return get_node_type(url)
     
     def get_nodes_list(self):
-        """获取节点列表"""
-        content = self.get_nodes_content()
-        return self.parse_nodes(content)
+        """获取节点列表（来自内存索引）"""
+        with self.nodes_lock.read():
+            return self.node_index.list()
     
-    def delete_node(self, node_index):
-        """删除指定索引的节点"""
+    def delete_nodes(self, ids=None, indices=None):
+        """按稳定 ID（或旧接口的位置索引）删除节点，整批只写入一次"""
         try:
-            content = self.get_nodes_content()
-            lines = content.split('\n')
-            
-            # 重新构建节点列表，保持原始行号
-            valid_lines = []
-            for i, line in enumerate(lines):
-                if line.strip() and not line.strip().startswith('#'):
-                    valid_lines.append((i, line))
-            
-            if node_index >= len(valid_lines):
-                return False, "节点索引超出范围"
+            with self.nodes_lock.write():
+                lines, targets, error = self.node_index.checkout(ids, indices)
+                if error:
+                    return False, error
+                if not targets:
+                    return False, "缺少节点参数"
             
-            # 获取要删除的行号
-            line_index, _ = valid_lines[node_index]
-            
-            # 删除该行
-            lines.pop(line_index)
-            
-            # 保存更新后的内容
-            new_content = '\n'.join(lines)
-            if self.save_nodes_content(new_content):
-                write_log(f"✅ 已删除节点 #{node_index + 1}")
-                return True, f"节点 #{node_index + 1} 已删除"
-            else:
-                return False, "保存节点文件失败"
+                # 按索引中记录的行号删除，不再重新解析文件
+                new_content = apply_edits(lines, [(node, None) for node in targets])
+                if self.save_nodes_content(new_content):
+                    if len(targets) == 1:
+                        name = targets[0]['name'] or f"#{targets[0]['position'] + 1}"
+                        write_log(f"✅ 已删除节点 {name}")
+                        return True, f"节点 {name} 已删除"
+                    write_log(f"✅ 已批量删除 {len(targets)} 个节点")
+                    return True, f"已删除 {len(targets)} 个节点"
+                else:
+                    return False, "保存节点文件失败"
                 
         except Exception as e:
             write_log(f"❌ 删除节点失败: {e}")
             return False, f"删除节点失败: {e}"
     
-    def delete_nodes_batch(self, node_indices):
-        """批量删除节点"""
+    def apply_node_operations(self, operations):
+        """批量执行 add / update / delete 操作：全部校验通过后一次原子写入
+
+        返回 (success, message, 结果)，校验失败时结果为 {'errors': [{'index', 'message'}]}，文件不变
+        """
         try:
-            content = self.get_nodes_content()
-            lines = content.split('\n')
+            if not isinstance(operations, list) or not operations:
+                return False, "operations 必须是非空列表", {}
             
-            # 重新构建节点列表，保持原始行号
-            valid_lines = []
-            for i, line in enumerate(lines):
-                if line.strip() and not line.strip().startswith('#'):
-                    valid_lines.append((i, line))
-            
-            # 验证索引
-            for index in node_indices:
-                if index >= len(valid_lines):
-                    return False, f"节点索引 {index} 超出范围"
-            
-            # 按索引倒序删除，避免索引变化
-            node_indices.sort(reverse=True)
-            deleted_lines = []
+            errors = []
+            additions = []
+            edits = []
+            seen_ids = set()
+            for i, op in enumerate(operations):
+                kind = op.get('op') if isinstance(op, dict) else None
+                line = op.get('line') if kind in ('add', 'update') else None
+                if kind not in ('add', 'update', 'delete'):
+                    errors.append({'index': i, 'message': f"不支持的操作: {kind}"})
+                elif kind != 'delete' and not isinstance(line, str):
+                    errors.append({'index': i, 'message': 'line 必须是字符串'})
+                elif kind != 'delete' and ('\n' in line.strip() or '\r' in line.strip()):
+                    errors.append({'index': i, 'message': 'line 只能包含一个节点链接，不能换行'})
+                elif kind != 'delete' and parse_line(line.strip()) is None:
+                    errors.append({'index': i, 'message': '节点链接格式无效'})
+                elif kind == 'add':
+                    additions.append(line.strip())
+                elif not isinstance(op.get('id'), str) or not op['id']:
+                    errors.append({'index': i, 'message': '缺少节点 ID'})
+                elif op['id'] in seen_ids:
+                    errors.append({'index': i, 'message': f"节点 {op['id']} 在同一批次中被重复修改"})
+                else:
+                    seen_ids.add(op['id'])
+                    edits.append((op['id'], line.strip() if line is not None else None))
+            if errors:
+                return False, f"{len(errors)} 个操作校验失败，未做任何修改", {'errors': errors}
             
-            for index in node_indices:
-                line_index, line_content = valid_lines[index]
-                deleted_lines.append(line_content)
-                lines.pop(line_index)
+            # 校验 ID 到写入完成期间持有写锁，其他请求不会插入修改
+            with self.nodes_lock.write():
+                ids = [node_id for node_id, _ in edits]
+                lines, targets, error = self.node_index.checkout(ids)
+                if error:
+                    return False, error, {}
+                new_lines = dict(edits)
+                changes = [(node, new_lines[node['id']]) for node in targets]
             
-            # 保存更新后的内容
-            new_content = '\n'.join(lines)
-            if self.save_nodes_content(new_content):
-                write_log(f"✅ 已批量删除 {len(node_indices)} 个节点")
-                return True, f"已删除 {len(node_indices)} 个节点"
-            else:
-                return False, "保存节点文件失败"
-                
+                result = {
+                    'added': len(additions),
+                    'updated': sum(1 for _, line in edits if line is not None),
+                    'deleted': sum(1 for _, line in edits if line is None)
+                }
+                if not self.save_nodes_content(apply_edits(lines, changes, additions)):
+                    return False, "保存节点文件失败", {}
+            message = f"新增 {result['added']} 个，更新 {result['updated']} 个，删除 {result['deleted']} 个节点"
+            write_log(f"✅ 批量修改节点: {message}")
+            return True, message, result
         except Exception as e:
-            write_log(f"❌ 批量删除节点失败: {e}")
-            return False, f"批量删除节点失败: {e}"
+            write_log(f"❌ 批量修改节点失败: {e}")
+            return False, f"批量修改节点失败: {e}", {}
     
     def get_log_content(self, lines=100):
         """获取日志内容"""
         try:
             if os.path.exists(LOG_FILE):
-                with open(LOG_FILE, 'r', encoding='utf-8') as f:
-                    all_lines = f.readlines()
-                    return ''.join(all_lines[-lines:])
+                return read_tail(LOG_FILE, lines)
             return ""
         except Exception as e:
             return f"读取日志失败: {e}"
@@ -310,6 +306,7 @@ class OpenClashManager:
             
             # 确保进程已停止
             subprocess.run("pkill -f 'jk.sh'", shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            subprocess.run("pkill -f 'watcher.py'", shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             
             if os.path.exists(PID_FILE):
                     os.remove(PID_FILE)
@@ -323,11 +320,7 @@ class OpenClashManager:
     
     def check_process_running(self, pid):
         """检查进程是否运行"""
-        try:
-            result = subprocess.run(f"ps -p {pid}", shell=True, capture_output=True, text=True)
-            return result.returncode == 0
-        except:
-            return False
+        return proc_inspect.pid_alive(pid)
     
     def get_watchdog_status(self):
         """获取守护进程状态"""
@@ -340,13 +333,9 @@ class OpenClashManager:
                     return True, pid
             
             # 检查进程是否在运行（备用方法）
-            result = subprocess.run("ps | grep jk.sh | grep -v grep", shell=True, capture_output=True, text=True)
-            if result.returncode == 0 and result.stdout.strip():
-                # 找到进程，提取PID
-                lines = result.stdout.strip().split('\n')
-                if lines:
-                    pid = lines[0].split()[0]
-                    return True, pid
+            pids = proc_inspect.find_processes(('jk.sh', 'watcher.py'))
+            if pids:
+                return True, str(pids[0])
             
             return False, None
         except Exception as e:
@@ -366,6 +355,9 @@ class OpenClashManager:
             if result.returncode == 0:
                 write_log("✅ 手动同步完成")
                 return True, "手动同步完成"
+            elif result.returncode == EXIT_MERGED:
+                write_log("⏳ 已有同步正在执行，手动同步已排队")
+                return True, "已有同步正在执行，本次同步已排队，将在其结束后自动执行"
             else:
                 write_log(f"❌ 手动同步失败: {result.stderr}")
                 return False, f"同步失败: {result.stderr}"
@@ -373,13 +365,18 @@ class OpenClashManager:
             write_log(f"❌ 手动同步异常: {e}")
             return False, f"同步异常: {e}"
     
+    def get_status_summary(self):
+        """守护进程与 OpenClash 的运行状态"""
+        watchdog_status, watchdog_pid = self.get_watchdog_status()
+        return {
+            'watchdog_status': watchdog_status,
+            'watchdog_pid': watchdog_pid,
+            'openclash_status': self.get_openclash_status()
+        }
+    
     def get_openclash_status(self):
         """获取OpenClash状态"""
-        try:
-            result = subprocess.run("pgrep -f 'openclash'", shell=True, capture_output=True, text=True)
-            return result.returncode == 0
-        except:
-            return False
+        return bool(proc_inspect.find_processes(('openclash',)))
     
     def restart_openclash(self):
         """重启OpenClash"""
@@ -392,54 +389,63 @@ class OpenClashManager:
             write_log(f"❌ 重启 OpenClash 失败: {e}")
             return False, f"重启失败: {e}"
     
+    def list_snapshots(self):
+        """获取配置快照列表"""
+        return SnapshotStore().list()
+    
+    def restore_snapshot(self, snapshot_id, path=None):
+        """恢复配置快照并重启OpenClash"""
+        scheduler = SyncScheduler()
+        held = False
+        try:
+            # 恢复与重启期间持有同步锁，避免与同步同时写配置、重复重启
+            with scheduler.locked() as acquired:
+                if not acquired:
+                    return False, "同步任务正在执行，请稍后再试"
+                held = True
+                
+                store = SnapshotStore()
+                entry = store.get(snapshot_id, path)
+                if entry is None:
+                    return False, f"快照不存在: {snapshot_id}"
+                
+                store.restore(entry['digest'], entry['path'])
+                write_log(f"✅ 已恢复配置快照 {entry['id']} ({entry['created']}) -> {entry['path']}")
+                success, message = self.restart_openclash()
+            if not success:
+                return False, f"快照已恢复，但{message}"
+            return True, f"已恢复快照 {entry['id']} 并重启 OpenClash"
+        except Exception as e:
+            write_log(f"❌ 恢复配置快照失败: {e}")
+            return False, f"恢复快照失败: {e}"
+        finally:
+            # 持锁期间到达的触发只登记了标记，由这里补跑
+            if held and scheduler.has_pending():
+                self.start_pending_sync()
+    
+    def start_pending_sync(self):
+        """在后台执行一次同步，接手恢复快照期间被合并的触发"""
+        try:
+            subprocess.Popen(["python3", f"{ROOT_DIR}/zr.py"], stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL, start_new_session=True)
+            write_log("🔄 恢复快照期间有新的同步触发，已在后台补跑")
+        except Exception as e:
+            write_log(f"❌ 补跑同步失败: {e}")
+    
     def get_system_info(self):
-        """获取系统信息"""
+        """获取系统信息：内存（KB）、磁盘（字节）、平均负载、开机时长（秒）"""
         try:
-            info = {}
-            
-            # 内存信息
-            try:
-                result = subprocess.run("free -h", shell=True, capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    info['memory'] = result.stdout
-                else:
-                    info['memory'] = '获取失败'
-            except subprocess.TimeoutExpired:
-                info['memory'] = '获取超时'
-            except:
-                info['memory'] = '获取失败'
-            
-            # 磁盘信息
-            try:
-                result = subprocess.run("df -h", shell=True, capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    info['disk'] = result.stdout
-                else:
-                    info['disk'] = '获取失败'
-            except subprocess.TimeoutExpired:
-                info['disk'] = '获取超时'
-            except:
-                info['disk'] = '获取失败'
-            
-            # CPU负载
-            try:
-                result = subprocess.run("uptime", shell=True, capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    info['cpu_load'] = result.stdout
-                else:
-                    info['cpu_load'] = '获取失败'
-            except subprocess.TimeoutExpired:
-                info['cpu_load'] = '获取超时'
-            except:
-                info['cpu_load'] = '获取失败'
-            
-            return info
+            return proc_inspect.system_snapshot()
         except Exception as e:
             write_log(f"❌ 获取系统信息失败: {e}")
             return {'error': str(e)}
 
 # 创建管理器实例
 manager = OpenClashManager()
+# 退出时写入尚未保存的测速结果；manage.sh 用 SIGTERM 停止服务，信号处理中转为正常退出以执行 atexit
+atexit.register(manager.latency_store.flush)
+# 所有浏览器共享的状态 / 日志推送
+event_hub = EventHub(manager.get_status_summary, LOG_FILE)
 
 # 初始化应用
 try:
@@ -450,6 +456,45 @@ try:
 except Exception as e:
     write_log(f"❌ 应用初始化失败: {e}")
 
+def make_etag(*parts):
+    """由内容版本（索引版本、日志偏移等）生成 ETag"""
+    return hashlib.md5(repr((BOOT_ID,) + parts).encode('utf-8')).hexdigest()[:16]
+
+def conditional_json(etag, build):
+    """客户端的 If-None-Match 与 etag 相同时直接返回 304，不再调用 build() 生成内容"""
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    # 压缩后字节不同，使用弱 ETag
+    response.set_etag(etag, weak=True)
+    return response
+
+def file_version(path):
+    """文件的 (大小, 修改时间, inode)，文件不存在时为 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+@app.after_request
+def compress_response(response):
+    """API 响应每次都要重新验证；较大的 JSON / 文本响应按 Accept-Encoding 压缩"""
+    if request.path.startswith('/api/'):
+        response.headers.setdefault('Cache-Control', 'no-cache')
+    if (response.status_code != 200 or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not response.mimetype.startswith(('application/json', 'text/'))):
+        return response
+    response.vary.add('Accept-Encoding')
+    if 'gzip' not in request.accept_encodings or response.content_length is None \
+            or response.content_length < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(response.get_data(), compresslevel=GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
 @app.route('/')
 def index():
     """主页"""
@@ -502,16 +547,19 @@ def clear_log():
 
 @app.route('/api/get_status')
 def get_status():
-    """获取状态信息"""
-    watchdog_status, watchdog_pid = manager.get_watchdog_status()
-    openclash_status = manager.get_openclash_status()
-    log_content = manager.get_log_content()
+    """获取状态信息（状态与日志都没有变化时返回 304）"""
+    status = manager.get_status_summary()
+    etag = make_etag(sorted(status.items()), file_version(LOG_FILE))
     
-    return jsonify({
-        'watchdog_status': watchdog_status,
-        'watchdog_pid': watchdog_pid,
-        'openclash_status': openclash_status,
-        'log_content': log_content
+    return conditional_json(etag, lambda: dict(status, log_content=manager.get_log_content()))
+
+@app.route('/api/events')
+def events():
+    """状态变化与新增日志的 Server-Sent Events 推送"""
+    client = event_hub.subscribe()
+    return Response(event_hub.stream(client), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
     })
 
 @app.route('/api/system_info')
@@ -520,6 +568,52 @@ def system_info():
     info = manager.get_system_info()
     return jsonify(info)
 
+@app.route('/api/sync_history')
+def sync_history():
+    """获取最近几次同步的分阶段耗时"""
+    try:
+        limit = request.args.get('limit', 20, type=int)
+        runs = load_history(max(1, min(limit, 100)))
+        return jsonify({'success': True, 'runs': runs})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取同步记录失败: {e}'})
+
+@app.route('/api/sync_plan')
+def sync_plan():
+    """预览同步将带来的配置变化（不写入、不重启）"""
+    try:
+        return jsonify({'success': True, 'plan': plan_sync()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'生成同步计划失败: {e}'})
+
+@app.route('/api/quarantine')
+def get_quarantine():
+    """获取上次同步时被隔离的问题节点"""
+    try:
+        return jsonify({'success': True, **load_quarantine()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取隔离节点失败: {e}'})
+
+@app.route('/api/snapshots')
+def list_snapshots():
+    """获取配置快照列表"""
+    try:
+        return jsonify({'success': True, 'snapshots': manager.list_snapshots()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取快照列表失败: {e}'})
+
+@app.route('/api/restore_snapshot', methods=['POST'])
+def restore_snapshot():
+    """恢复配置快照：{"id": 快照编号, "path": 可选，快照所属的配置文件}"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': '请求体必须是 JSON 对象'})
+    snapshot_id = str(data.get('id', '')).strip()
+    if not snapshot_id:
+        return jsonify({'success': False, 'message': '缺少快照ID参数'})
+    success, message = manager.restore_snapshot(snapshot_id, data.get('path') or None)
+    return jsonify({'success': success, 'message': message})
+
 @app.route('/api/health')
 def health_check():
     """健康检查"""
@@ -548,6 +642,13 @@ def health_check():
         watchdog_status, watchdog_pid = manager.get_watchdog_status()
         health_status['checks']['watchdog'] = watchdog_status
         
+        # 系统资源
+        system = manager.get_system_info()
+        health_status['checks']['system'] = {
+            'load1': (system.get('load') or {}).get('load1'),
+            'mem_available_kb': (system.get('memory') or {}).get('available')
+        }
+        
         # 如果有任何检查失败，标记为不健康
         if not all([
             health_status['checks']['filesystem']['nodes_file'],
@@ -566,24 +667,86 @@ def health_check():
 
 @app.route('/api/get_nodes', methods=['GET'])
 def get_nodes():
-    """获取节点列表"""
-    nodes = manager.get_nodes_list()
-    return jsonify({
-        'success': True,
-        'nodes': nodes
-    })
+    """获取节点列表
+
+    可选参数：offset / limit 分页（不传 limit 时返回全部），type / region / q 筛选，
+    sort=name|type|latency 与 order=asc|desc 排序
+    """
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = request.args.get('limit')
+        limit = int(limit) if limit not in (None, '') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'offset / limit 必须是整数'})
+
+    sort = request.args.get('sort') or None
+    if sort is not None and sort not in SORT_KEYS:
+        return jsonify({'success': False, 'message': f'不支持的排序字段: {sort}'})
+
+    index = manager.node_index
+    query = {
+        'node_type': request.args.get('type') or None,
+        'region': request.args.get('region') or None,
+        'q': (request.args.get('q') or '').strip() or None,
+        'sort': sort,
+        'desc': request.args.get('order') == 'desc',
+        'offset': offset,
+        'limit': limit
+    }
+
+    store = manager.latency_store
+
+    def build():
+        with manager.nodes_lock.read():
+            nodes, filtered = index.query(latency=manager.latency_source, **query)
+            counts = index.counts()
+        return {
+            'success': True,
+            'nodes': [dict(node, latency=store.get(node['server'], node['port'])) for node in nodes],
+            'total': sum(counts['types'].values()),
+            'filtered': filtered,
+            'offset': offset,
+            'limit': limit,
+            'counts': counts
+        }
+
+    with manager.nodes_lock.read():
+        generation = index.generation()
+    # 每个节点附带延迟概况，测速结果变化时 ETag 随之变化
+    etag = make_etag(generation, store.version, sorted(query.items()))
+    return conditional_json(etag, build)
+
+def node_refs(data, single):
+    """从请求中取出节点引用 (ids, indices)：优先使用稳定 ID，兼容旧的位置索引
+
+    参数格式不对时抛出 ValueError
+    """
+    if not isinstance(data, dict):
+        raise ValueError('请求体必须是 JSON 对象')
+    if single:
+        ids = [data['id']] if data.get('id') else None
+        indices = [data['index']] if data.get('index') is not None else None
+    else:
+        ids = data.get('ids') or None
+        indices = data.get('indices') or None
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, str) for i in ids)):
+        raise ValueError('节点 ID 必须是字符串')
+    if indices is not None and (not isinstance(indices, list)
+                                or not all(isinstance(i, int) and not isinstance(i, bool) for i in indices)):
+        raise ValueError('节点索引必须是整数')
+    # 同时提供时以 ID 为准
+    return ids, (None if ids else indices)
 
 @app.route('/api/delete_node', methods=['POST'])
 def delete_node():
     """删除单个节点"""
     try:
-        data = request.get_json()
-        node_index = data.get('index')
+        ids, indices = node_refs(request.get_json(), single=True)
         
-        if node_index is None:
-            return jsonify({'success': False, 'message': '缺少节点索引参数'})
+        if not ids and not indices:
+            return jsonify({'success': False, 'message': '缺少节点 ID 或索引参数'})
         
-        success, message = manager.delete_node(node_index)
+        success, message = manager.delete_nodes(ids, indices)
         return jsonify({'success': success, 'message': message})
     except Exception as e:
         return jsonify({'success': False, 'message': f'删除节点失败: {e}'})
@@ -592,89 +755,168 @@ def delete_node():
 def delete_nodes_batch():
     """批量删除节点"""
     try:
-        data = request.get_json()
-        node_indices = data.get('indices', [])
+        ids, indices = node_refs(request.get_json(), single=False)
         
-        if not node_indices:
-            return jsonify({'success': False, 'message': '缺少节点索引参数'})
+        if not ids and not indices:
+            return jsonify({'success': False, 'message': '缺少节点 ID 或索引参数'})
         
-        success, message = manager.delete_nodes_batch(node_indices)
+        success, message = manager.delete_nodes(ids, indices)
         return jsonify({'success': success, 'message': message})
     except Exception as e:
         return jsonify({'success': False, 'message': f'批量删除节点失败: {e}'})
 
+@app.route('/api/nodes/batch', methods=['POST'])
+def nodes_batch():
+    """批量修改节点：{"operations": [{"op": "add", "line": ...}, {"op": "update", "id": ..., "line": ...},
+    {"op": "delete", "id": ...}]}，全部成功或全部不生效，只写入一次、只触发一次同步"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': '请求体必须是 JSON 对象'})
+    success, message, result = manager.apply_node_operations(data.get('operations'))
+    return jsonify(dict(result, success=success, message=message))
+
+def probe_target(node):
+    """测速需要的节点字段"""
+    return {key: node[key] for key in ('id', 'name', 'type', 'server', 'port')}
+
+def cached_probe(target):
+    """TTL 内已有测速结果时返回与探测结果相同格式的缓存，否则返回 None"""
+    summary = manager.latency_store.fresh(target['server'], target['port'])
+    if summary is None:
+        return None
+    latency = summary['last']
+    return dict(target, latency=latency, status=classify(latency), error=summary['error'],
+                dns_ms=None, connect_ms=latency, tls_ms=None, probed_at=summary['updated'], cached=True)
+
+def record_probe(result):
+    """把探测结果写入测速历史"""
+    manager.latency_store.record(result['server'], result['port'], result['latency'],
+                                 result['probed_at'], result['error'])
+
 @app.route('/api/test_node_speed', methods=['POST'])
 def test_node_speed():
-    """测试节点速度"""
+    """测试单个节点的延迟（TCP 连接耗时，tls=true 时同时测量 TLS 握手）
+
+    TTL 内测过的节点直接返回缓存结果，force=true 时重新测速
+    """
     try:
         data = request.get_json()
-        node_index = data.get('index')
+        ids, indices = node_refs(data, single=True)
         
-        if node_index is None:
-            return jsonify({'success': False, 'message': '缺少节点索引参数'})
+        if not ids and not indices:
+            return jsonify({'success': False, 'message': '缺少节点 ID 或索引参数'})
         
         # 获取节点信息
-        nodes = manager.get_nodes_list()
-        if node_index >= len(nodes):
-            return jsonify({'success': False, 'message': '节点索引超出范围'})
-        
-        node = nodes[node_index]
-        node_url = node['url']
-        
-        # 解析节点信息进行更准确的模拟测速
-        node_info = parse_single_node_link(node_url)
-        if not node_info:
-            return jsonify({'success': False, 'message': '无法解析节点信息'})
-        
-        # 基于节点类型和服务器信息进行更合理的模拟
-        import random
-        import time
-        
-        # 模拟测速延迟
-        time.sleep(0.5)
-        
-        # 根据协议类型调整测速参数
-        protocol = node_info.get('protocol', 'unknown')
-        server = node_info.get('server', 'unknown')
-        
-        # 基于协议类型的延迟范围
-        if protocol == 'ss':
-            latency = random.randint(30, 150)
-        elif protocol in ['vmess', 'vless']:
-            latency = random.randint(50, 200)
-        elif protocol == 'trojan':
-            latency = random.randint(40, 180)
-        else:
-            latency = random.randint(50, 300)
-        
-        # 基于服务器位置的调整
-        if any(keyword in server.lower() for keyword in ['hk', 'hongkong', '香港']):
-            latency = max(20, latency - 30)  # 香港节点通常更快
-        elif any(keyword in server.lower() for keyword in ['jp', 'japan', '日本']):
-            latency = max(30, latency - 20)  # 日本节点较快
-        elif any(keyword in server.lower() for keyword in ['us', 'usa', '美国']):
-            latency = min(500, latency + 50)  # 美国节点较慢
-        
-        # 速度基于延迟计算
-        speed = max(1, int(1000 / latency)) if latency > 0 else random.randint(1, 100)
+        node = manager.node_index.get_by_id(ids[0]) if ids else manager.node_index.get(indices[0])
+        if node is None:
+            return jsonify({'success': False, 'message': '节点不存在或已被修改，请刷新列表后重试'})
+        
+        node_name = node.get('name') or f"节点 {node['position'] + 1}"
+        if not node['server'] or not node['port']:
+            return jsonify({'success': False, 'message': f'{node_name}: 无法解析节点服务器地址'})
+        
+        target = probe_target(node)
+        result = None if data.get('force') else cached_probe(target)
+        if result is None:
+            result = run_probes([target], tls=bool(data.get('tls')))[0]
+            record_probe(result)
+            manager.latency_store.save()
+        if result['latency'] is None:
+            return jsonify({'success': False, 'message': f"{node_name}: {result['error']}", 'status': result['status']})
         
-        result = {
+        return jsonify({
             'success': True,
-            'node_name': node.get('name', f'节点 {node_index + 1}'),
-            'latency': latency,
-            'speed': speed,
-            'protocol': protocol,
-            'server': server,
-            'status': 'success' if latency < 200 else 'warning' if latency < 500 else 'error'
-        }
-        
-        return jsonify(result)
+            'id': node['id'],
+            'node_name': node_name,
+            'latency': result['latency'],
+            'dns_ms': result['dns_ms'],
+            'connect_ms': result['connect_ms'],
+            'tls_ms': result['tls_ms'],
+            'protocol': node['type'].lower(),
+            'server': node['server'],
+            'port': node['port'],
+            'status': result['status'],
+            'cached': result.get('cached', False)
+        })
     except Exception as e:
         return jsonify({'success': False, 'message': f'测速失败: {e}'})
 
+@app.route('/api/nodes/probe', methods=['POST'])
+def probe_nodes():
+    """批量测速：{"ids": [...]（不传时测全部）, "tls": false, "timeout": 3, "force": false}
+
+    按完成顺序以 NDJSON 逐行返回每个节点的结果，最后一行为 {"done": true, ...} 汇总；
+    TTL 内测过的节点先以 "cached": true 返回缓存，不再重新探测
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        ids, _ = node_refs(data, single=False)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    try:
+        timeout = min(max(float(data.get('timeout', PROBE_TIMEOUT)), 0.1), 10)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'timeout 必须是数字'})
+    
+    if ids:
+        _, nodes, error = manager.node_index.checkout(ids)
+        if error:
+            return jsonify({'success': False, 'message': error})
+    else:
+        nodes = manager.get_nodes_list()
+    targets = [probe_target(node) for node in nodes]
+    tls = bool(data.get('tls'))
+    cached = []
+    if not data.get('force'):
+        pending = []
+        for target in targets:
+            result = cached_probe(target)
+            if result is None:
+                pending.append(target)
+            else:
+                cached.append(result)
+    else:
+        pending = targets
+    
+    def generate():
+        started = time.monotonic()
+        ok = 0
+        for result in cached:
+            ok += result['latency'] is not None
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+        try:
+            for result in iter_probes(pending, timeout=timeout, tls=tls):
+                record_probe(result)
+                ok += result['latency'] is not None
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+        finally:
+            manager.latency_store.save(force=True)
+        yield json.dumps({
+            'done': True,
+            'total': len(targets),
+            'ok': ok,
+            'failed': len(targets) - ok,
+            'cached': len(cached),
+            'elapsed_ms': int((time.monotonic() - started) * 1000)
+        }) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
+def speed_bucket(summary):
+    """测速概况对应的速度分组名称"""
+    if summary is None:
+        return '未测速'
+    if summary['last'] is None:
+        return '不可用'
+    if summary['latency'] < LATENCY_GOOD:
+        return '快速'
+    if summary['latency'] < LATENCY_WARNING:
+        return '一般'
+    return '较慢'
+
 @app.route('/api/get_node_groups', methods=['GET'])
 def get_node_groups():
-    """获取节点分组"""
+    """获取节点分组，每组列出节点的稳定 ID（可直接用于批量删除等操作）"""
     try:
         nodes = manager.get_nodes_list()
         groups = {
@@ -683,32 +925,24 @@ def get_node_groups():
             '速度': {}
         }
         
-        for i, node in enumerate(nodes):
+        for node in nodes:
+            node_id = node['id']
             # 按类型分组
             node_type = node.get('type', 'Unknown')
             if node_type not in groups['类型']:
                 groups['类型'][node_type] = []
-            groups['类型'][node_type].append(i)
+            groups['类型'][node_type].append(node_id)
             
             # 按地区分组（从节点名称中提取）
-            name = node.get('name', '').lower()
-            region = '其他'
-            if any(keyword in name for keyword in ['香港', 'hk', 'hongkong']):
-                region = '香港'
-            elif any(keyword in name for keyword in ['台湾', 'tw', 'taiwan']):
-                region = '台湾'
-            elif any(keyword in name for keyword in ['美国', 'us', 'usa']):
-                region = '美国'
-            elif any(keyword in name for keyword in ['日本', 'jp', 'japan']):
-                region = '日本'
-            elif any(keyword in name for keyword in ['新加坡', 'sg', 'singapore']):
-                region = '新加坡'
-            elif any(keyword in name for keyword in ['韩国', 'kr', 'korea']):
-                region = '韩国'
+            region = node.get('region', '其他')
             
             if region not in groups['地区']:
                 groups['地区'][region] = []
-            groups['地区'][region].append(i)
+            groups['地区'][region].append(node_id)
+            
+            # 按测速历史分组（EWMA 延迟，最近一次失败视为不可用）
+            speed = speed_bucket(manager.latency_store.get(node['server'], node['port']))
+            groups['速度'].setdefault(speed, []).append(node_id)
         
         return jsonify({'success': True, 'groups': groups})
     except Exception as e:
@@ -725,23 +959,19 @@ def import_nodes():
         if not content:
             return jsonify({'success': False, 'message': '内容不能为空'})
         
-        # 获取当前节点内容
-        current_content = manager.get_nodes_content()
-        
         if import_type == 'manual':
             # 手动输入：直接添加新内容
-            new_content = current_content + '\n' + content
+            imported = content
         elif import_type == 'file':
             # 文件导入：解析文件内容
-            new_content = current_content + '\n' + content
+            imported = content
         elif import_type == 'url':
-            # URL导入：从URL获取节点列表
+            # URL导入：从URL获取节点列表（在获取写锁之前完成下载）
             try:
                 import requests
                 response = requests.get(content, timeout=10)
                 if response.status_code == 200:
-                    url_content = response.text
-                    new_content = current_content + '\n' + url_content
+                    imported = response.text
                 else:
                     return jsonify({'success': False, 'message': f'URL请求失败: {response.status_code}'})
             except Exception as e:
@@ -749,8 +979,13 @@ def import_nodes():
         else:
             return jsonify({'success': False, 'message': '不支持的导入类型'})
         
-        # 保存新内容
-        if manager.save_nodes_content(new_content):
+        with manager.nodes_lock.write():
+            # 获取当前节点内容
+            new_content = manager.get_nodes_content() + '\n' + imported
+            
+            # 保存新内容
+            saved = manager.save_nodes_content(new_content)
+        if saved:
             write_log(f"✅ 成功导入节点 (类型: {import_type})")
             return jsonify({'success': True, 'message': '节点导入成功'})
         else:
@@ -792,11 +1027,11 @@ def update_node():
     """更新单个节点"""
     try:
         data = request.get_json()
-        node_index = data.get('index')
+        ids, indices = node_refs(data, single=True)
         new_line = data.get('new_line', '').strip()
         
-        if node_index is None:
-            return jsonify({'success': False, 'message': '缺少节点索引'})
+        if not ids and not indices:
+            return jsonify({'success': False, 'message': '缺少节点 ID 或索引'})
         
         if not new_line:
             return jsonify({'success': False, 'message': '新的节点链接为空'})
@@ -805,33 +1040,20 @@ def update_node():
         if '://' not in new_line:
             return jsonify({'success': False, 'message': '无效的节点链接格式'})
         
-        # 读取当前节点文件
-        content = manager.get_nodes_content()
-        lines = content.split('\n')
-        
-        # 找到实际的节点行（跳过注释和空行）
-        node_lines = []
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if line and not line.startswith('#'):
-                node_lines.append((i, line))
+        with manager.nodes_lock.write():
+            # 从节点索引取得要更新的行号，ID 已失效时拒绝
+            lines, targets, error = manager.node_index.checkout(ids, indices)
+            if error:
+                return jsonify({'success': False, 'message': error})
+            node = targets[0]
         
-        if node_index >= len(node_lines):
-            return jsonify({'success': False, 'message': '节点索引超出范围'})
-        
-        # 获取要更新的行号
-        line_index, _ = node_lines[node_index]
-        
-        # 更新该行
-        lines[line_index] = new_line
-        
-        # 保存更新后的内容
-        new_content = '\n'.join(lines)
-        if manager.save_nodes_content(new_content):
-            write_log(f"✅ 节点 #{node_index + 1} 已更新")
-            return jsonify({'success': True, 'message': f'节点 #{node_index + 1} 更新成功'})
-        else:
-            return jsonify({'success': False, 'message': '保存节点文件失败'})
+            # 保存更新后的内容
+            new_content = apply_edits(lines, [(node, new_line)])
+            if manager.save_nodes_content(new_content):
+                write_log(f"✅ 节点 #{node['position'] + 1} 已更新")
+                return jsonify({'success': True, 'message': f"节点 #{node['position'] + 1} 更新成功"})
+            else:
+                return jsonify({'success': False, 'message': '保存节点文件失败'})
             
     except Exception as e:
         write_log(f"❌ 更新节点失败: {e}")
@@ -842,72 +1064,64 @@ def batch_update_nodes():
     """批量更新节点"""
     try:
         data = request.get_json()
-        indices = data.get('indices', [])
+        ids, indices = node_refs(data, single=False)
         tags = data.get('tags', '').strip()
         remarks = data.get('remarks', '').strip()
         prefix = data.get('prefix', '').strip()
         suffix = data.get('suffix', '').strip()
         
-        if not indices:
-            return jsonify({'success': False, 'message': '缺少节点索引'})
+        if not ids and not indices:
+            return jsonify({'success': False, 'message': '缺少节点 ID 或索引'})
         
         if not tags and not remarks and not prefix and not suffix:
             return jsonify({'success': False, 'message': '至少需要指定一个修改项'})
         
-        # 读取当前节点文件
-        content = manager.get_nodes_content()
-        lines = content.split('\n')
+        with manager.nodes_lock.write():
+            # 从节点索引取得选中节点的行号，任何一个 ID 已失效时整批拒绝
+            lines, targets, error = manager.node_index.checkout(ids, indices)
+            if error:
+                return jsonify({'success': False, 'message': error})
         
-        # 找到实际的节点行（跳过注释和空行）
-        node_lines = []
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if line and not line.startswith('#'):
-                node_lines.append((i, line))
+            changes = []
         
-        updated_count = 0
-        
-        # 更新选中的节点
-        for node_index in indices:
-            if node_index >= len(node_lines):
-                continue
-            
-            line_index, original_line = node_lines[node_index]
+            # 更新选中的节点
+            for node in targets:
+                original_line = node['full_line']
             
-            # 解析原始节点
-            parts = original_line.split('#', 1)
-            node_url = parts[0].strip()
-            node_name = parts[1].strip() if len(parts) > 1 else ""
+                # 解析原始节点
+                parts = original_line.split('#', 1)
+                node_url = parts[0].strip()
+                node_name = parts[1].strip() if len(parts) > 1 else ""
             
-            # 应用修改
-            new_name = node_name
+                # 应用修改
+                new_name = node_name
             
-            if prefix:
-                new_name = prefix + new_name
+                if prefix:
+                    new_name = prefix + new_name
             
-            if suffix:
-                new_name = new_name + suffix
+                if suffix:
+                    new_name = new_name + suffix
             
-            # 构建新的节点行
-            new_line = node_url
-            if new_name:
-                new_line += f"#{new_name}"
+                # 构建新的节点行
+                new_line = node_url
+                if new_name:
+                    new_line += f"#{new_name}"
             
-            # 更新行
-            lines[line_index] = new_line
-            updated_count += 1
-        
-        # 保存更新后的内容
-        new_content = '\n'.join(lines)
-        if manager.save_nodes_content(new_content):
-            write_log(f"✅ 批量更新了 {updated_count} 个节点")
-            return jsonify({
-                'success': True, 
-                'message': f'批量更新成功', 
-                'updated_count': updated_count
-            })
-        else:
-            return jsonify({'success': False, 'message': '保存节点文件失败'})
+                changes.append((node, new_line))
+        
+            updated_count = len(changes)
+        
+            # 所有修改一次写入
+            new_content = apply_edits(lines, changes)
+            if manager.save_nodes_content(new_content):
+                write_log(f"✅ 批量更新了 {updated_count} 个节点")
+                return jsonify({
+                    'success': True, 
+                    'message': f'批量更新成功', 
+                    'updated_count': updated_count
+                })
+            else:
+                return jsonify({'success': False, 'message': '保存节点文件失败'})
             
     except Exception as e:
         write_log(f"❌ 批量更新节点失败: {e}")
@@ -927,20 +1141,21 @@ def add_single_node():
         if not manager.is_valid_node_url(node_link):
             return jsonify({'success': False, 'message': '节点链接格式无效'})
         
-        # 读取当前节点文件
-        content = manager.get_nodes_content()
-        lines = content.split('\n')
+        with manager.nodes_lock.write():
+            # 读取当前节点文件
+            content = manager.get_nodes_content()
+            lines = content.split('\n')
         
-        # 添加新节点到文件末尾
-        lines.append(node_link)
+            # 添加新节点到文件末尾
+            lines.append(node_link)
         
-        # 保存更新后的内容
-        new_content = '\n'.join(lines)
-        if manager.save_nodes_content(new_content):
-            write_log(f"✅ 手动添加节点成功: {node_link.split('#')[-1] if '#' in node_link else '未命名节点'}")
-            return jsonify({'success': True, 'message': '节点添加成功'})
-        else:
-            return jsonify({'success': False, 'message': '保存节点文件失败'})
+            # 保存更新后的内容
+            new_content = '\n'.join(lines)
+            if manager.save_nodes_content(new_content):
+                write_log(f"✅ 手动添加节点成功: {node_link.split('#')[-1] if '#' in node_link else '未命名节点'}")
+                return jsonify({'success': True, 'message': '节点添加成功'})
+            else:
+                return jsonify({'success': False, 'message': '保存节点文件失败'})
             
     except Exception as e:
         write_log(f"❌ 添加单个节点失败: {e}")
@@ -1276,5 +1491,9 @@ def parse_single_node_link(link: str) -> dict:
         write_log(f"❌ 解析节点链接时出错: {e}")
         return None
 
+def handle_sigterm(signum, frame):
+    raise SystemExit(0)
+
 if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, handle_sigterm)
     app.run(host='0.0.0.0', port=8888, debug=False) 
\ No newline at end of file
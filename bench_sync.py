@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+同步性能基准：生成大量节点，比较生成配置的大小与序列化耗时
+用法: python3 bench_sync.py [--nodes 1000,10000]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import base64
+import argparse
+import tempfile
+
+# 基准数据不写入正式日志
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench_sync.log"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import log
+from ruamel.yaml import YAML
+from jx import parse_nodes
+from fragments import FragmentCache
+from fastyaml import HAS_LIBYAML, SafeYAML, load_config, dump_config, dump_text, to_plain
+
+log.ENABLE_CONSOLE_OUTPUT = False
+
+
+def generate_links(count: int) -> list:
+    """按 ss / vmess / vless / trojan 轮流生成节点链接"""
+    links = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            links.append(f"ss://aes-256-gcm:pass{i}@10.0.{i // 250 % 250}.{i % 250}:{8000 + i % 1000}#HK-ss-{i}")
+        elif kind == 1:
+            info = {
+                "v": "2", "ps": f"JP-{i}", "add": f"jp{i}.example.com", "port": "443",
+                "id": str(uuid.UUID(int=i)), "aid": "0", "net": "ws" if i % 8 == 1 else "tcp",
+                "type": "none", "host": "", "path": "/ws", "tls": "tls"
+            }
+            links.append("vmess://" + base64.b64encode(json.dumps(info).encode()).decode() + f"#JP-vmess-{i}")
+        elif kind == 2:
+            links.append(f"vless://{uuid.UUID(int=i)}@us{i}.example.com:443?encryption=none&security=tls#US-vless-{i}")
+        else:
+            links.append(f"trojan://pw{i}@sg{i}.example.com:443?sni=sg{i}.example.com#SG-trojan-{i}")
+    return links
+
+
+def dump_proxies(nodes: list) -> tuple:
+    """用 zr.py 相同的方式序列化 proxies 段，返回 (字节数, 耗时秒)"""
+    yaml = YAML()
+    yaml.preserve_quotes = True
+    buf = io.StringIO()
+    start = time.perf_counter()
+    yaml.dump({"proxies": nodes}, buf)
+    elapsed = time.perf_counter() - start
+    return len(buf.getvalue().encode("utf-8")), elapsed
+
+
+def bench_compact(nodes_file: str):
+    """比较精简字段前后的配置体积"""
+    full = parse_nodes(nodes_file, compact=False)
+    compact = parse_nodes(nodes_file)
+    full_size, full_time = dump_proxies(full)
+    compact_size, compact_time = dump_proxies(compact)
+    saved = full_size - compact_size
+    print(f"📦 精简字段: {full_size / 1024:.0f} KB -> {compact_size / 1024:.0f} KB "
+          f"(减少 {saved / 1024:.0f} KB, {saved / full_size:.1%})")
+    print(f"⏱️ 序列化耗时: {full_time:.2f}s -> {compact_time:.2f}s")
+
+
+def make_config(nodes: list) -> dict:
+    names = [node["name"] for node in nodes]
+    return {
+        "mixed-port": 7890,
+        "mode": "rule",
+        "proxies": nodes,
+        "proxy-groups": [
+            {"name": "节点选择", "type": "select", "proxies": ["自动选择", "DIRECT"] + names},
+            {"name": "自动选择", "type": "url-test", "url": "http://www.gstatic.com/generate_204",
+             "interval": 300, "proxies": names}
+        ],
+        "rules": ["MATCH,节点选择"]
+    }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def make_rt_yaml() -> YAML:
+    yaml = YAML()
+    yaml.preserve_quotes = True
+    return yaml
+
+
+def bench_backends(nodes_file: str, tmp_dir: str):
+    """比较往返模式与 safe 模式（libyaml / 纯 Python）加载和输出整份配置的耗时"""
+    nodes = parse_nodes(nodes_file)
+    config_file = os.path.join(tmp_dir, "config.yaml")
+    yaml = make_rt_yaml()
+    expected = make_config(nodes)
+    text, rt_dump = timed(dump_text, yaml, expected)
+    with open(config_file, "w", encoding="utf-8") as f:
+        f.write(text)
+    with open(config_file, "r", encoding="utf-8") as f:
+        _, rt_load = timed(yaml.load, f)
+    print(f"⏱️ 往返模式: 加载 {rt_load:.2f}s，输出 {rt_dump:.2f}s")
+
+    backends = [True] + ([False] if HAS_LIBYAML else [])
+    for pure in backends:
+        safe = SafeYAML(pure=pure)
+        config, load_time = timed(load_config, make_rt_yaml(), config_file, safe)
+        assert to_plain(config) == expected, "拆分加载结果与原配置不一致"
+        text, dump_time = timed(dump_config, make_rt_yaml(), config, safe.dump, safe)
+        assert safe.load(text) == expected, "safe 模式输出结果与原配置不一致"
+        print(f"⏱️ safe 模式（{safe.name}）: 加载 {load_time:.2f}s，输出 {dump_time:.2f}s")
+    if not HAS_LIBYAML:
+        print("⚠️ 未安装 ruamel.yaml.clib，跳过 libyaml 对比")
+
+
+def bench_fragments(nodes_file: str, tmp_dir: str):
+    """片段缓存在冷缓存 / 热缓存 / 1% 节点变化时的输出耗时"""
+    nodes = parse_nodes(nodes_file)
+    safe = SafeYAML()
+    cache_path = os.path.join(tmp_dir, "fragments.json")
+    changed = [dict(node, port=node["port"] + 1) if i % 100 == 0 else node for i, node in enumerate(nodes)]
+    for label, current in (("冷缓存", nodes), ("热缓存", nodes), ("1% 变化", changed)):
+        cache = FragmentCache(cache_path, safe.name)
+        config = make_config(current)
+        text, elapsed = timed(dump_config, make_rt_yaml(), config, lambda items: cache.render(safe.dump, items), safe)
+        cache.save()
+        assert safe.load(text) == config, "片段拼接结果与原配置不一致"
+        print(f"⏱️ 片段缓存（{label}，{safe.name}）: {elapsed:.2f}s，命中 {cache.hits}，未命中 {cache.misses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenClash 同步性能基准")
+    parser.add_argument("--nodes", default="1000,10000", help="生成的节点数量，多个用逗号分隔")
+    args = parser.parse_args()
+
+    for count in [int(n) for n in args.nodes.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            nodes_file = os.path.join(tmp_dir, "nodes.txt")
+            with open(nodes_file, "w", encoding="utf-8") as f:
+                f.write("\n".join(generate_links(count)) + "\n")
+            print(f"\n🧪 基准测试: {count} 个节点")
+            bench_compact(nodes_file)
+            bench_backends(nodes_file, tmp_dir)
+            bench_fragments(nodes_file, tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
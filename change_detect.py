@@ -0,0 +1,65 @@
+# change_detect.py
+import os
+import json
+import hashlib
+from fsutil import write_atomic
+
+ROOT_DIR = os.getenv("OPENCLASH_MANAGE_ROOT", "/root/OpenClashManage")
+NODES_FILE = f"{ROOT_DIR}/wangluo/nodes.txt"
+# 守护进程与同步脚本共用的节点文件状态记录
+STATE_FILE = os.getenv("NODES_STATE_FILE", f"{ROOT_DIR}/wangluo/nodes_state.json")
+
+CHUNK_SIZE = 64 * 1024
+
+
+def file_signature(path: str):
+    """返回文件的 (mtime_ns, size, inode) 签名，文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
+def file_digest(path: str) -> str:
+    """分块计算文件摘要，blake2b 比 md5 更快且无需一次性读入内存"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ChangeDetector:
+    """先比较 stat 签名，只有签名变化时才计算摘要"""
+
+    def __init__(self, path: str = NODES_FILE, state_path: str = STATE_FILE):
+        self.path = path
+        self.state_path = state_path
+
+    def load_state(self) -> dict:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            return state if isinstance(state, dict) else {}
+        except Exception:
+            return {}
+
+    def check(self):
+        """返回 (是否变化, 当前记录)，记录需在同步成功后通过 commit 保存"""
+        state = self.load_state()
+        signature = file_signature(self.path)
+        if signature is None:
+            raise FileNotFoundError(self.path)
+        if state.get("signature") == signature:
+            return False, state
+
+        record = {"signature": signature, "digest": file_digest(self.path)}
+        if record["digest"] == state.get("digest"):
+            # 仅 stat 变化（如 touch 或原样保存），刷新签名即可
+            self.commit(record)
+            return False, record
+        return True, record
+
+    def commit(self, record: dict):
+        write_atomic(self.state_path, json.dumps(record), fsync=False)
@@ -0,0 +1,103 @@
+# env_probe.py
+import os
+import shlex
+
+# 直接读取 UCI 配置与 opkg 状态文件，避免每次同步都 fork uci/opkg
+UCI_CONFIG_DIR = os.getenv("UCI_CONFIG_DIR", "/etc/config")
+UCI_DELTA_DIR = os.getenv("UCI_DELTA_DIR", "/tmp/.uci")
+OPKG_STATUS_FILE = os.getenv("OPKG_STATUS_FILE", "/usr/lib/opkg/status")
+
+# path -> ((mtime_ns, size, inode), value)
+_cache = {}
+
+
+def _cached(path: str, loader):
+    """按文件 stat 缓存解析结果，文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    hit = _cache.get(path)
+    if hit and hit[0] == signature:
+        return hit[1]
+    value = loader(path)
+    _cache[path] = (signature, value)
+    return value
+
+
+def parse_uci_file(path: str) -> dict:
+    """解析 UCI 配置文件，返回 {section: {option: value}}，匿名 section 以 @type[n] 命名"""
+    sections = {}
+    type_counts = {}
+    current = None
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for raw in f:
+            try:
+                tokens = shlex.split(raw, comments=True)
+            except ValueError:
+                continue
+            if not tokens:
+                continue
+            keyword = tokens[0]
+            if keyword == "config" and len(tokens) >= 2:
+                section_type = tokens[1]
+                index = type_counts.get(section_type, 0)
+                type_counts[section_type] = index + 1
+                current = {".type": section_type}
+                sections[f"@{section_type}[{index}]"] = current
+                if len(tokens) >= 3:
+                    sections[tokens[2]] = current
+            elif current is not None and keyword == "option" and len(tokens) >= 3:
+                current[tokens[1]] = tokens[2]
+            elif current is not None and keyword == "list" and len(tokens) >= 3:
+                current.setdefault(tokens[1], []).append(tokens[2])
+    return sections
+
+
+def parse_opkg_status(path: str) -> set:
+    """解析 opkg 状态文件，返回已安装的软件包名集合"""
+    installed = set()
+    package = None
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if line.startswith("Package:"):
+                package = line.split(":", 1)[1].strip()
+            elif line.startswith("Status:") and package:
+                words = line.split(":", 1)[1].split()
+                if words and words[-1] == "installed":
+                    installed.add(package)
+            elif not line.strip():
+                package = None
+    return installed
+
+
+def get_uci_option(package: str, section: str, option: str) -> str:
+    """读取 UCI 选项，等价于 uci get package.section.option"""
+    # 存在未提交的修改时以 uci 命令为准
+    if not os.path.exists(os.path.join(UCI_DELTA_DIR, package)):
+        sections = _cached(os.path.join(UCI_CONFIG_DIR, package), parse_uci_file)
+        if sections is not None:
+            value = sections.get(section, {}).get(option, "")
+            return value if isinstance(value, str) else " ".join(value)
+    try:
+        return os.popen(f"uci get {package}.{section}.{option} 2>/dev/null").read().strip()
+    except Exception:
+        return ""
+
+
+def is_package_installed(keyword: str) -> bool:
+    """检查是否安装了名称包含 keyword 的软件包"""
+    installed = _cached(OPKG_STATUS_FILE, parse_opkg_status)
+    if installed is None:
+        # 没有 opkg 状态文件时退回到命令行检查
+        return os.system(f"opkg list-installed | grep {keyword} > /dev/null 2>&1") == 0
+    return any(keyword in name for name in installed)
+
+
+def is_openclash_installed() -> bool:
+    return is_package_installed("openclash")
+
+
+def get_openclash_config_path() -> str:
+    return get_uci_option("openclash", "config", "config_path")
@@ -0,0 +1,186 @@
+# events.py
+# 面板的 Server-Sent Events：一个共享的后台线程轮询状态并按字节偏移追踪日志，
+# 把变化推送给所有连接的浏览器；没有客户端时线程自动退出
+import os
+import json
+import queue
+import threading
+
+# 轮询间隔（秒），与连接的浏览器数量无关
+EVENT_INTERVAL = float(os.getenv("OPENCLASH_EVENT_INTERVAL", "2"))
+# 空闲时发送注释行心跳的间隔（秒），避免连接被中间代理断开
+HEARTBEAT = 15
+# 单个客户端积压的事件上限，超过说明客户端已卡住，断开让浏览器重连
+CLIENT_QUEUE_SIZE = 100
+LOG_TAIL_LINES = 100
+# 一次轮询追加的日志超过该字节数时改为发送日志尾部
+LOG_CHUNK_LIMIT = 64 * 1024
+
+
+def format_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def last_lines(text: str, lines: int = LOG_TAIL_LINES) -> str:
+    parts = text.splitlines(keepends=True)
+    return ''.join(parts[-lines:])
+
+
+def read_tail(path: str, lines: int = LOG_TAIL_LINES) -> str:
+    """只读取文件末尾 LOG_CHUNK_LIMIT 字节，返回最后几行"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - LOG_CHUNK_LIMIT))
+        data = f.read()
+    return last_lines(data.decode('utf-8', errors='replace'), lines)
+
+
+class LogTail:
+    """按字节偏移读取日志新增内容；文件被截断或替换时重新读取尾部"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = None
+        self.inode = None
+
+    def _read(self, f, size: int) -> str:
+        data = f.read(size)
+        # 只消费完整的行，写了一半的行留到下次
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+        return data[:end].decode('utf-8', errors='replace')
+
+    def poll(self):
+        """返回 None（无变化）、("reset", 尾部文本) 或 ("append", 新增文本)"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            if self.offset:
+                self.offset = 0
+                return "reset", ""
+            self.offset = 0
+            return None
+
+        if self.offset is None or st.st_ino != self.inode or st.st_size < self.offset:
+            kind = "reset"
+        elif st.st_size == self.offset:
+            return None
+        elif st.st_size - self.offset > LOG_CHUNK_LIMIT:
+            kind = "reset"
+        else:
+            kind = "append"
+
+        with open(self.path, 'rb') as f:
+            if kind == "reset":
+                start = max(0, st.st_size - LOG_CHUNK_LIMIT)
+                f.seek(start)
+                if start:
+                    f.readline()  # 丢弃被截断的第一行
+                self.offset = f.tell()
+                text = last_lines(self._read(f, st.st_size - self.offset))
+            else:
+                f.seek(self.offset)
+                text = self._read(f, st.st_size - self.offset)
+        self.inode = st.st_ino
+        if kind == "append" and not text:
+            return None
+        return kind, text
+
+
+class _Client:
+    def __init__(self):
+        self.queue = queue.Queue(CLIENT_QUEUE_SIZE)
+        self.closed = False
+
+
+class EventHub:
+    """所有 SSE 连接共享一个轮询线程：status_source() 返回状态字典，变化时广播"""
+
+    def __init__(self, status_source, log_path: str, interval: float = EVENT_INTERVAL):
+        self.status_source = status_source
+        self.log_path = log_path
+        self.interval = interval
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = None
+        self._log_tail = ""
+
+    def subscribe(self) -> _Client:
+        client = _Client()
+        with self._lock:
+            self._clients.add(client)
+            if self._thread is None:
+                # 首个客户端：线程的第一次轮询会广播完整状态
+                self._status = None
+                self._log_tail = ""
+                self._thread = threading.Thread(target=self._run, name="event-hub", daemon=True)
+                self._thread.start()
+            elif self._status is not None:
+                client.queue.put_nowait(format_event("status", self._status))
+                client.queue.put_nowait(format_event("log", {'reset': True, 'text': self._log_tail}))
+        return client
+
+    def unsubscribe(self, client: _Client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def client_count(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+    def _broadcast(self, message: str):
+        """调用方需持有 self._lock"""
+        for client in list(self._clients):
+            try:
+                client.queue.put_nowait(message)
+            except queue.Full:
+                client.closed = True
+                self._clients.discard(client)
+
+    def _poll(self, tail: LogTail):
+        status = self.status_source()
+        change = tail.poll()
+        # 更新快照与广播在同一把锁内，新订阅的客户端不会漏掉或重复收到变化
+        with self._lock:
+            if status != self._status:
+                self._status = status
+                self._broadcast(format_event("status", status))
+            if change is not None:
+                kind, text = change
+                if kind == "reset":
+                    self._log_tail = text
+                else:
+                    self._log_tail = last_lines(self._log_tail + text)
+                self._broadcast(format_event("log", {'reset': kind == "reset", 'text': text}))
+
+    def _run(self):
+        tail = LogTail(self.log_path)
+        wait = threading.Event()
+        while True:
+            with self._lock:
+                if not self._clients:
+                    self._thread = None
+                    return
+            try:
+                self._poll(tail)
+            except Exception as e:
+                with self._lock:
+                    self._broadcast(format_event("error", {'message': str(e)}))
+            wait.wait(self.interval)
+
+    def stream(self, client: _Client):
+        """生成 SSE 文本；浏览器断开时 Flask 关闭生成器，自动取消订阅"""
+        try:
+            yield f"retry: {int(self.interval * 1000)}\n\n"
+            while True:
+                try:
+                    message = client.queue.get(timeout=HEARTBEAT)
+                except queue.Empty:
+                    if client.closed:
+                        return
+                    yield ": ping\n\n"
+                    continue
+                yield message
+        finally:
+            self.unsubscribe(client)
@@ -0,0 +1,139 @@
+# fastyaml.py
+# proxies / proxy-groups 是程序生成的内容，不需要保留注释：
+# 这两段单独用 safe 模式加载和输出（有 libyaml 时走 C 实现），其余部分仍使用往返模式
+import io
+import os
+import re
+import ruamel.yaml
+from ruamel.yaml import YAML
+
+# 自动选择；可设为 pure 强制使用纯 Python 实现（用于对比测试）
+YAML_BACKEND = os.getenv("OPENCLASH_YAML_BACKEND", "auto")
+HAS_LIBYAML = bool(getattr(ruamel.yaml, "__with_libyaml__", False))
+
+PROXIES_SENTINEL = "__OCM_PROXIES__"
+GROUPS_SENTINEL = "__OCM_PROXY_GROUPS__"
+SECTION_SENTINELS = {"proxies": PROXIES_SENTINEL, "proxy-groups": GROUPS_SENTINEL}
+
+_TOP_LEVEL_KEY = re.compile(r"^([^\s#\-][^:]*):(?:\s|$)")
+
+
+def to_plain(value):
+    """把 ruamel 的 CommentedMap/CommentedSeq 等转换为普通 dict/list"""
+    if isinstance(value, dict):
+        return {str(k): to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_plain(v) for v in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    return str(value)
+
+
+class SafeYAML:
+    """safe 模式的加载/输出，pure=None 时按 libyaml 是否可用自动选择"""
+
+    def __init__(self, pure: bool = None):
+        if pure is None:
+            pure = YAML_BACKEND == "pure" or not HAS_LIBYAML
+        self.yaml = YAML(typ="safe", pure=pure)
+        self.yaml.default_flow_style = False
+        self.yaml.allow_unicode = True
+        # 保持字段原有顺序，与往返模式输出一致
+        self.yaml.sort_base_mapping_type_on_output = False
+        self.name = "pure" if pure else "libyaml"
+
+    def load(self, text: str):
+        return self.yaml.load(text)
+
+    def dump(self, data) -> str:
+        buf = io.StringIO()
+        self.yaml.dump(data, buf)
+        return buf.getvalue()
+
+
+def split_sections(text: str, keys=tuple(SECTION_SENTINELS)) -> tuple:
+    """把指定的顶层段落从文本中取出，原位置替换为占位符，返回 (剩余文本, {键: 段落文本})"""
+    lines = text.splitlines(keepends=True)
+    sections = {}
+    rest = []
+    i = 0
+    while i < len(lines):
+        match = _TOP_LEVEL_KEY.match(lines[i])
+        key = match.group(1).strip() if match else None
+        if key not in keys or key in sections:
+            rest.append(lines[i])
+            i += 1
+            continue
+        end = i + 1
+        while end < len(lines):
+            line = lines[end]
+            if line[:1] not in (" ", "\t", "-", "#", "\r", "\n") or line.startswith(("---", "...")):
+                break
+            end += 1
+        # 段落末尾的空行和注释属于下一个键，留在剩余文本中
+        tail = end
+        while tail > i + 1:
+            stripped = lines[tail - 1].strip()
+            if stripped and not stripped.startswith("#"):
+                break
+            tail -= 1
+        sections[key] = "".join(lines[i:tail])
+        rest.append(f"{key}: {SECTION_SENTINELS[key]}\n")
+        rest.extend(lines[tail:end])
+        i = end
+    return "".join(rest), sections
+
+
+def load_config(rt_yaml: YAML, path: str, safe: SafeYAML = None):
+    """加载配置：proxies / proxy-groups 用 safe 模式，其余用往返模式；失败时整体用往返模式加载"""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    safe = safe or SafeYAML()
+    try:
+        rest, sections = split_sections(text)
+        config = rt_yaml.load(rest)
+        for key, section in sections.items():
+            if config.get(key) != SECTION_SENTINELS[key]:
+                raise ValueError(f"{key} 占位符丢失")
+            config[key] = (safe.load(section) or {}).get(key) or []
+        return config
+    except Exception:
+        # 锚点/别名跨段引用等情况无法拆分加载
+        return rt_yaml.load(text)
+
+
+def dump_config(rt_yaml: YAML, config, render_proxies, safe: SafeYAML = None) -> str:
+    """输出配置：其余部分用往返模式，proxies 由 render_proxies(nodes) 生成，proxy-groups 用 safe 模式"""
+    safe = safe or SafeYAML()
+    replaced = {}
+    for key, sentinel in SECTION_SENTINELS.items():
+        value = config.get(key)
+        if isinstance(value, list) and value:
+            replaced[key] = value
+            config[key] = sentinel
+    try:
+        text = dump_text(rt_yaml, config)
+    finally:
+        for key, value in replaced.items():
+            config[key] = value
+
+    for key, value in replaced.items():
+        if key == "proxies":
+            section = "proxies:\n" + render_proxies(value)
+        else:
+            section = safe.dump({key: to_plain(value)})
+        pattern = re.compile(rf"^{re.escape(key)}: {SECTION_SENTINELS[key]}\n", re.M)
+        if len(pattern.findall(text)) != 1:
+            raise ValueError(f"未找到 {key} 占位符")
+        text = pattern.sub(lambda _: section, text, count=1)
+    return text
+
+
+def dump_text(yaml, data) -> str:
+    buf = io.StringIO()
+    yaml.dump(data, buf)
+    return buf.getvalue()
@@ -0,0 +1,85 @@
+# fragments.py
+# 按节点内容缓存序列化后的 YAML 片段，同步时只有新增或变更的节点需要经过序列化
+import os
+import json
+import hashlib
+from fsutil import write_atomic
+
+# 缓存放在内存文件系统中，避免每次同步都额外写一遍闪存；重启后首次同步会重新生成
+FRAGMENT_CACHE_FILE = os.getenv("OPENCLASH_FRAGMENT_CACHE", "/tmp/openclash_fragments.json")
+# 片段格式版本，序列化方式变化时使旧缓存失效
+FRAGMENT_FORMAT = 1
+
+
+def node_fingerprint(node: dict) -> str:
+    """节点内容指纹；字段顺序会影响输出，因此不排序"""
+    data = json.dumps(node, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def split_items(text: str) -> list:
+    """把顶层序列的输出按列表项拆开，每项以第 0 列的 "- " 开头"""
+    items = []
+    current = []
+    for line in text.splitlines(keepends=True):
+        if line.startswith("- ") or line.rstrip("\n") == "-":
+            if current:
+                items.append("".join(current))
+            current = [line]
+        else:
+            current.append(line)
+    if current:
+        items.append("".join(current))
+    return items
+
+
+class FragmentCache:
+    def __init__(self, path: str = FRAGMENT_CACHE_FILE, flavor: str = ""):
+        self.path = path
+        # 不同序列化实现的输出格式略有差异，缓存只在同一实现下复用
+        self.format = f"{FRAGMENT_FORMAT}:{flavor}"
+        self.fragments = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") == self.format:
+                self.fragments = data.get("fragments", {})
+        except Exception:
+            self.fragments = {}
+
+    def save(self):
+        if not self._dirty:
+            return
+        data = {"format": self.format, "fragments": self.fragments}
+        write_atomic(self.path, json.dumps(data, ensure_ascii=False, separators=(",", ":")), fsync=False)
+        self._dirty = False
+
+    def render(self, dump, nodes: list) -> str:
+        """返回 proxies 列表的 YAML 文本，未命中的节点通过 dump(list) 一次性序列化"""
+        keys = [node_fingerprint(node) for node in nodes]
+        missing = {}
+        for key, node in zip(keys, nodes):
+            if key not in self.fragments and key not in missing:
+                missing[key] = node
+        self.misses = len(missing)
+        self.hits = len(nodes) - sum(1 for key in keys if key in missing)
+
+        if missing:
+            items = split_items(dump(list(missing.values())))
+            if len(items) != len(missing):
+                raise ValueError(f"片段拆分数量不一致: {len(items)} != {len(missing)}")
+            self.fragments.update(zip(missing.keys(), items))
+            self._dirty = True
+
+        # 只保留本次用到的片段，防止缓存无限增长
+        if len(self.fragments) != len(set(keys)):
+            self.fragments = {key: self.fragments[key] for key in keys}
+            self._dirty = True
+        return "".join(self.fragments[key] for key in keys)
+
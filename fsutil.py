@@ -0,0 +1,114 @@
+# fsutil.py
+import os
+import fcntl
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+
+def write_staged(path: str, data, fsync: bool = True) -> str:
+    """把内容写入目标文件同目录下的临时文件，返回临时文件路径"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        # 保留原文件权限
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        else:
+            os.chmod(tmp_path, 0o644)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def write_atomic(path: str, data, fsync: bool = True):
+    """原子写入文件：先写同目录临时文件，再 rename 覆盖目标"""
+    tmp_path = write_staged(path, data, fsync)
+    try:
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    if fsync:
+        fsync_dir(os.path.dirname(path) or ".")
+
+
+def fsync_dir(directory: str):
+    """同步目录项，让 rename 在断电后也能保留；不支持的文件系统忽略"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def link_or_copy(src: str, dst: str):
+    """用硬链接原子地让 dst 指向 src 的内容，文件系统不支持时退回进程内复制"""
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copy2(src, tmp_path)
+    try:
+        os.replace(tmp_path, dst)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+class FileRWLock:
+    """基于 flock 的读写锁：多个读者可同时持有，写者独占
+
+    每次获取都单独打开锁文件，所以同一进程的不同线程之间、多个 worker 进程之间都互斥；
+    同一线程内可以嵌套获取（持有写锁时也可以再获取读锁），但不能从读锁升级为写锁
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    @contextmanager
+    def _acquire(self, exclusive: bool):
+        held = getattr(self._local, "mode", None)
+        if held is not None:
+            if exclusive and held != "write":
+                raise RuntimeError("持有读锁时不能获取写锁")
+            yield
+            return
+
+        fd = os.open(self.path, os.O_RDONLY | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._local.mode = "write" if exclusive else "read"
+            try:
+                yield
+            finally:
+                self._local.mode = None
+        finally:
+            # 关闭文件描述符即释放 flock
+            os.close(fd)
+
+    def read(self):
+        return self._acquire(False)
+
+    def write(self):
+        return self._acquire(True)
@@ -195,7 +195,7 @@ copy_app_files() {
     
     # 尝试下载主应用文件
     download_success=true
-    for file in app.py log.py jx.py zc.py zr.py zw.py; do
+    for file in app.py log.py jx.py zc.py zr.py zw.py fsutil.py sync_stats.py env_probe.py change_detect.py watcher.py scheduler.py snapshots.py sync_plan.py node_check.py lowprio.py fragments.py fastyaml.py profiles.py node_index.py events.py proc_inspect.py probe.py latency_store.py; do
         if wget -q "$GITHUB_RAW/$file" -O "$file" 2>/dev/null; then
             print_success "$file 下载成功"
             chmod +x "$file"
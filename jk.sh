@@ -3,9 +3,8 @@
 # === 路径配置 ===
 ROOT_DIR="/root/OpenClashManage"
 NODES_FILE="$ROOT_DIR/wangluo/nodes.txt"
-CONFIG_FILE="/etc/openclash/config.yaml"
-BACKUP_FILE="/etc/openclash/config.yaml.bak"
 SCRIPT_TO_RUN="$ROOT_DIR/zr.py"
+WATCHER="$ROOT_DIR/watcher.py"
 LOG_FILE="$ROOT_DIR/wangluo/log.txt"
 PID_FILE="/tmp/openclash_watchdog.pid"
 INTERVAL=5  # 秒
@@ -23,8 +22,15 @@ if [ -f "$PID_FILE" ] && kill -0 "$(cat "$PID_FILE")" 2>/dev/null; then
 fi
 echo $$ > "$PID_FILE"
 
+# === 优先使用 inotify 监控（exec 后 PID 不变），不可用时回退到轮询 ===
+if [ "$WATCH_MODE" != "poll" ] && [ -f "$WATCHER" ] && python3 "$WATCHER" --check >/dev/null 2>&1; then
+  log "✅ 使用 inotify 监控节点文件变化"
+  exec python3 "$WATCHER"
+fi
+
 # === 初始状态 ===
-LAST_HASH=""
+# 只比较 stat 签名（修改时间/大小/inode），内容是否真的变化由 zr.py 的状态记录判断
+LAST_SIG=""
 log "✅ OpenClash 节点同步守护已启动..."
 
 # === 主循环 ===
@@ -42,32 +48,25 @@ while true; do
     continue
   fi
 
-  CURRENT_HASH=$(md5sum "$NODES_FILE" | awk '{print $1}')
-  
-  if [ "$CURRENT_HASH" != "$LAST_HASH" ]; then
-    log "🔄 检测到节点文件变动，准备执行同步"
-    log "🔍 文件MD5变化: $LAST_HASH -> $CURRENT_HASH"
+  CURRENT_SIG=$(stat -c '%y:%s:%i' "$NODES_FILE" 2>/dev/null)
 
-    # 检查备份文件
-    if [ -f "$CONFIG_FILE" ]; then
-      cp "$CONFIG_FILE" "$BACKUP_FILE"
-      log "✅ 已备份原配置文件"
-    else
-      log "⚠️ 原配置文件不存在，跳过备份"
-    fi
+  if [ "$CURRENT_SIG" != "$LAST_SIG" ]; then
+    log "🔄 检测到节点文件变动，准备执行同步"
+    log "🔍 文件签名变化: $LAST_SIG -> $CURRENT_SIG"
+    # 无论成功与否都记录签名，失败的同步等下次文件变动再重试
+    LAST_SIG="$CURRENT_SIG"
 
+    # 备份与回滚由 zr.py 通过快照库完成，这里不再复制配置文件
     log "🚀 开始执行同步脚本: $SCRIPT_TO_RUN"
-    if python3 "$SCRIPT_TO_RUN" >> "$LOG_FILE" 2>&1; then
+    python3 "$SCRIPT_TO_RUN" >> "$LOG_FILE" 2>&1
+    STATUS=$?
+    if [ $STATUS -eq 0 ]; then
       log "✅ 同步成功，OpenClash 配置文件已更新"
-      LAST_HASH="$CURRENT_HASH"
+    elif [ $STATUS -eq 75 ]; then
+      # 75 = scheduler.EXIT_MERGED
+      log "⏳ 已有同步在执行，本次触发已合并，将在其结束后补跑"
     else
-      log "❌ 同步失败，恢复上次配置并重启 OpenClash"
-      if [ -f "$BACKUP_FILE" ]; then
-        cp "$BACKUP_FILE" "$CONFIG_FILE"
-        log "✅ 已恢复备份配置"
-      fi
-      /etc/init.d/openclash restart
-      log "🔄 已重启OpenClash服务"
+      log "❌ 同步失败，配置未写入或已由同步脚本回滚，详见上方日志"
     fi
   fi
 
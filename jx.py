@@ -131,7 +131,39 @@ def extract_host_port(hostport: str) -> (str, int):
         raise ValueError(f"无效 host:port 格式: {hostport}")
     return match.group(1), int(match.group(2))
 
-def parse_nodes(file_path: str) -> List[Dict]:
+# 各协议在 Clash 中不可省略的字段，即使为空也保留
+REQUIRED_KEYS = {"name", "type", "server", "port", "cipher", "password", "uuid", "alterId", "psk", "protocol", "obfs"}
+# 与 Clash 默认值相同的字段，省略后行为不变
+DEFAULT_VALUES = {"tls": False, "skip-cert-verify": False, "udp": False, "tfo": False, "network": "tcp", "encryption": "none"}
+
+def compact_value(value):
+    """递归去掉空值：None、空字符串、空列表、空字典，以及清理后变空的嵌套结构"""
+    if isinstance(value, dict):
+        value = {k: compact_value(v) for k, v in value.items()}
+        return {k: v for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [v for v in (compact_value(v) for v in value) if v not in (None, "", [], {})]
+    return value
+
+def compact_node(node: Dict) -> Dict:
+    """去掉节点中的空字段和默认值字段，减小生成的配置体积"""
+    compact = {}
+    for key, value in node.items():
+        if key in REQUIRED_KEYS:
+            compact[key] = value
+            continue
+        value = compact_value(value)
+        if value in (None, "", [], {}):
+            continue
+        if key in DEFAULT_VALUES and value == DEFAULT_VALUES[key] and type(value) is type(DEFAULT_VALUES[key]):
+            continue
+        compact[key] = value
+    return compact
+
+def compact_nodes(nodes: List[Dict]) -> List[Dict]:
+    return [compact_node(node) for node in nodes]
+
+def parse_nodes(file_path: str, compact: bool = True) -> List[Dict]:
     parsed_nodes = []
     existing_names = set()
     success_count = 0
@@ -508,4 +540,4 @@ def parse_nodes(file_path: str) -> List[Dict]:
 
     write_log(f"✅ [parse] 成功解析 {success_count} 条，失败 {error_count} 条")
     write_log("------------------------------------------------------------")
-    return parsed_nodes
+    return compact_nodes(parsed_nodes) if compact else parsed_nodes
@@ -0,0 +1,160 @@
+# latency_store.py
+# 节点延迟历史：按 sha1(server:port) 记录最近的测速样本、EWMA 与丢包率，保存到 JSON 文件，
+# 面板的排序、分组和同步时的策略组排序都从这里读取
+import os
+import json
+import time
+import hashlib
+import threading
+from fsutil import write_atomic
+
+ROOT_DIR = os.getenv("OPENCLASH_MANAGE_ROOT", "/root/OpenClashManage")
+LATENCY_FILE = os.getenv("OPENCLASH_LATENCY_FILE", f"{ROOT_DIR}/wangluo/latency.json")
+# 结果在多少秒内视为新鲜，直接返回缓存而不重新测速
+LATENCY_TTL = float(os.getenv("OPENCLASH_LATENCY_TTL", "300"))
+# 每个节点保留的样本数
+HISTORY_SIZE = 20
+EWMA_ALPHA = 0.3
+# 两次写盘的最小间隔（秒），减少路由器闪存写入
+SAVE_INTERVAL = 60
+# 超过该时间（秒）没有测速的节点在保存时清除
+RETENTION = 7 * 86400
+# 同步时按延迟排列策略组成员（1 开启）
+SYNC_LATENCY_ORDER = os.getenv("OPENCLASH_SYNC_LATENCY_ORDER", "0") == "1"
+
+
+def fingerprint(server, port) -> str:
+    try:
+        port = int(port)
+    except (TypeError, ValueError):
+        pass
+    return hashlib.sha1(f"{server}:{port}".encode("utf-8")).hexdigest()[:16]
+
+
+class LatencyStore:
+    """延迟样本环形缓冲 + EWMA + 丢包率，线程安全"""
+
+    def __init__(self, path: str = LATENCY_FILE, ttl: float = LATENCY_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+        # 每次记录加 1，用于让依赖延迟的缓存（ETag 等）失效
+        self.version = 0
+        self._dirty = False
+        self._saved_at = 0.0
+        self._flush_timer = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and isinstance(data.get("entries"), dict):
+            with self._lock:
+                self.entries = data["entries"]
+                self.version += 1
+
+    def save(self, force: bool = False) -> bool:
+        """有新数据时写盘；force 为 False 时距上次写盘不足 SAVE_INTERVAL 秒则跳过"""
+        with self._lock:
+            now = time.time()
+            if not self._dirty or (not force and now - self._saved_at < SAVE_INTERVAL):
+                return False
+            self.entries = {key: entry for key, entry in self.entries.items()
+                            if now - entry["updated"] < RETENTION}
+            data = json.dumps({"entries": self.entries}, ensure_ascii=False, separators=(",", ":"))
+            self._dirty = False
+            self._saved_at = now
+        try:
+            write_atomic(self.path, data)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            raise
+        return True
+
+    def record(self, server, port, latency, at: float = None, error: str = None) -> dict:
+        """记录一次测速结果，latency 为 None 表示失败，error 为失败原因"""
+        at = time.time() if at is None else at
+        key = fingerprint(server, port)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {"samples": [], "ewma": None, "updated": at}
+            entry["samples"].append([int(at), latency])
+            del entry["samples"][:-HISTORY_SIZE]
+            if latency is not None:
+                ewma = entry["ewma"]
+                entry["ewma"] = latency if ewma is None else round(EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * ewma, 1)
+            entry["error"] = None if latency is not None else error
+            entry["updated"] = at
+            self.version += 1
+            self._dirty = True
+            self._schedule_flush()
+            return self._summary(entry)
+
+    def _schedule_flush(self):
+        """有未保存的数据时在 SAVE_INTERVAL 秒后写盘一次，之后没有新测速也不会丢失（需持有 _lock）"""
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(SAVE_INTERVAL, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """立即写入未保存的数据；写盘失败时数据仍标记为未保存，下次测速后重试"""
+        with self._lock:
+            self._flush_timer = None
+        try:
+            self.save(force=True)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _summary(entry: dict) -> dict:
+        samples = entry["samples"]
+        failed = sum(1 for _, latency in samples if latency is None)
+        return {
+            "latency": None if entry["ewma"] is None else int(round(entry["ewma"])),
+            "last": samples[-1][1] if samples else None,
+            "loss": round(failed / len(samples), 2) if samples else None,
+            "error": entry.get("error"),
+            "samples": len(samples),
+            "updated": entry["updated"]
+        }
+
+    def get(self, server, port):
+        """节点的延迟概况，没有记录时返回 None"""
+        with self._lock:
+            entry = self.entries.get(fingerprint(server, port))
+            return None if entry is None else self._summary(entry)
+
+    def fresh(self, server, port):
+        """TTL 内的结果，没有或已过期时返回 None"""
+        summary = self.get(server, port)
+        if summary is None or time.time() - summary["updated"] >= self.ttl:
+            return None
+        return summary
+
+    def latency_of(self, node: dict):
+        """用于排序的延迟（EWMA 毫秒数）；没有数据或最近一次测速失败时返回 None"""
+        summary = self.get(node.get("server"), node.get("port"))
+        if summary is None or summary["last"] is None:
+            return None
+        return summary["latency"]
+
+
+def order_by_latency(proxies: list, store: LatencyStore) -> list:
+    """按延迟从低到高返回节点名称；没有数据或不可用的节点保持原顺序排在后面"""
+    measured = []
+    unknown = []
+    for position, proxy in enumerate(proxies):
+        latency = store.latency_of(proxy)
+        if latency is None:
+            unknown.append(proxy["name"])
+        else:
+            measured.append((latency, position, proxy["name"]))
+    measured.sort()
+    return [name for _, _, name in measured] + unknown
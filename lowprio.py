@@ -0,0 +1,122 @@
+# lowprio.py
+# 以较低的 CPU/IO 优先级运行同步任务，并可等待系统负载回落后再开始
+import os
+import time
+import ctypes
+import ctypes.util
+import platform
+from contextlib import contextmanager
+import proc_inspect
+
+# 同步进程的 nice 值（0 表示不调整）
+SYNC_NICE = int(os.getenv("OPENCLASH_SYNC_NICE", "10"))
+# 1 分钟平均负载超过该值时推迟同步（0 表示不等待）
+SYNC_MAX_LOAD = float(os.getenv("OPENCLASH_SYNC_MAX_LOAD", "0"))
+# 最多等待多久（秒），超时后照常执行
+SYNC_MAX_DELAY = float(os.getenv("OPENCLASH_SYNC_MAX_DELAY", "300"))
+
+# ioprio_set/ioprio_get 系统调用号（见各架构 unistd.h）
+IOPRIO_SYSCALLS = {
+    "x86_64": (251, 252),
+    "i386": (289, 290),
+    "i686": (289, 290),
+    "aarch64": (30, 31),
+    "riscv64": (30, 31),
+    "armv7l": (314, 315),
+    "armv6l": (314, 315),
+    "mips": (4314, 4315),
+    "mipsel": (4314, 4315),
+    "mips64": (5273, 5274),
+    "ppc": (273, 274),
+    "ppc64le": (273, 274),
+}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_CLASS_BE = 2
+# best-effort 类中的最低级别，不会像 idle 类那样在磁盘繁忙时长期饿死
+IOPRIO_LOWEST = (IOPRIO_CLASS_BE << IOPRIO_CLASS_SHIFT) | 7
+
+_libc = None
+
+
+def _syscall(index: int, *args) -> int:
+    """调用 ioprio 系统调用，架构未知或调用失败时返回 -1"""
+    global _libc
+    numbers = IOPRIO_SYSCALLS.get(platform.machine())
+    if numbers is None:
+        return -1
+    try:
+        if _libc is None:
+            _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        return _libc.syscall(numbers[index], *args)
+    except (OSError, AttributeError):
+        return -1
+
+
+def get_ioprio() -> int:
+    return _syscall(1, IOPRIO_WHO_PROCESS, 0)
+
+
+def set_ioprio(value: int) -> bool:
+    return _syscall(0, IOPRIO_WHO_PROCESS, 0, value) == 0
+
+
+def get_nice() -> int:
+    return os.getpriority(os.PRIO_PROCESS, 0)
+
+
+def set_nice(value: int) -> bool:
+    try:
+        os.setpriority(os.PRIO_PROCESS, 0, value)
+        return True
+    except OSError:
+        return False
+
+
+def lower_priority(nice: int = SYNC_NICE) -> dict:
+    """降低当前进程的 CPU 与 IO 优先级，返回调整前的值供恢复使用"""
+    previous = {"nice": get_nice(), "ioprio": get_ioprio()}
+    if nice > previous["nice"]:
+        set_nice(nice)
+        set_ioprio(IOPRIO_LOWEST)
+    return previous
+
+
+@contextmanager
+def normal_priority(previous: dict):
+    """临时恢复原优先级，避免重启的 OpenClash 内核继承降低后的优先级"""
+    lowered = {"nice": get_nice(), "ioprio": get_ioprio()} if previous else None
+    if lowered == previous:
+        yield
+        return
+    set_nice(previous["nice"])
+    if previous["ioprio"] >= 0:
+        set_ioprio(previous["ioprio"])
+    try:
+        yield
+    finally:
+        set_nice(lowered["nice"])
+        if lowered["ioprio"] >= 0:
+            set_ioprio(lowered["ioprio"])
+
+
+def read_loadavg() -> float:
+    """读取 1 分钟平均负载，无法读取时返回 0"""
+    try:
+        return proc_inspect.read_loadavg()["load1"]
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def wait_for_load(max_load: float = SYNC_MAX_LOAD, max_delay: float = SYNC_MAX_DELAY, interval: float = 5.0) -> float:
+    """等待负载低于阈值，返回实际等待的秒数；超过最长等待时间后直接返回"""
+    if max_load <= 0:
+        return 0.0
+    started = time.monotonic()
+    deadline = started + max_delay
+    while read_loadavg() >= max_load:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(interval, remaining))
+    return time.monotonic() - started
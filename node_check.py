@@ -0,0 +1,148 @@
+# node_check.py
+# 在调用 verify_config 之前，按协议对解析后的节点做结构校验
+import os
+import re
+import json
+from datetime import datetime
+from fsutil import write_atomic
+
+ROOT_DIR = os.getenv("OPENCLASH_MANAGE_ROOT", "/root/OpenClashManage")
+QUARANTINE_FILE = os.getenv("OPENCLASH_QUARANTINE_FILE", f"{ROOT_DIR}/wangluo/quarantine.json")
+
+# 各协议必填字段（server/port 对所有协议都要求）
+REQUIRED_FIELDS = {
+    "ss": ("cipher", "password"),
+    "ssr": ("cipher", "password", "protocol", "obfs"),
+    "vmess": ("uuid",),
+    "vless": ("uuid",),
+    "trojan": ("password",),
+    "http": (),
+    "socks5": (),
+    "snell": ("psk",),
+    "hysteria": (),
+    "tuic": ("uuid",),
+}
+
+UUID_TYPES = {"vmess", "vless", "tuic"}
+
+# 已知的加密方式（与 Meta 内核保持一致）；不在列表中的只记录警告，不隔离节点，
+# 避免内核新增加密方式后好节点被误拒
+SS_CIPHERS = {
+    "none", "plain", "dummy",
+    "aes-128-gcm", "aes-192-gcm", "aes-256-gcm",
+    "aes-128-ccm", "aes-192-ccm", "aes-256-ccm",
+    "aes-128-gcm-siv", "aes-256-gcm-siv",
+    "chacha20-poly1305", "xchacha20-poly1305",
+    "chacha20-ietf-poly1305", "xchacha20-ietf-poly1305",
+    "chacha8-ietf-poly1305", "xchacha8-ietf-poly1305",
+    "lea-128-gcm", "lea-192-gcm", "lea-256-gcm",
+    "rabbit128-poly1305", "aegis-128l", "aegis-256", "aez-384", "deoxys-ii-256-128",
+    "aes-128-cfb", "aes-192-cfb", "aes-256-cfb",
+    "aes-128-ctr", "aes-192-ctr", "aes-256-ctr",
+    "camellia-128-cfb", "camellia-192-cfb", "camellia-256-cfb", "bf-cfb",
+    "rc4", "rc4-md5", "salsa20", "chacha20", "chacha20-ietf", "xchacha20",
+    "2022-blake3-aes-128-gcm", "2022-blake3-aes-256-gcm",
+    "2022-blake3-chacha20-poly1305", "2022-blake3-chacha8-poly1305",
+}
+
+SSR_CIPHERS = {
+    "none", "table", "rc4", "rc4-md5", "dummy",
+    "aes-128-cfb", "aes-192-cfb", "aes-256-cfb",
+    "aes-128-ctr", "aes-192-ctr", "aes-256-ctr",
+    "camellia-128-cfb", "camellia-192-cfb", "camellia-256-cfb", "bf-cfb",
+    "salsa20", "chacha20", "chacha20-ietf", "xchacha20",
+}
+
+UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+SERVER_RE = re.compile(r"^[^\s/?#@]+$")
+
+
+def validate_node(node: dict) -> list:
+    """返回节点的问题列表，空列表表示通过"""
+    if not isinstance(node, dict):
+        return ["节点不是字典"]
+    node_type = node.get("type")
+    required = REQUIRED_FIELDS.get(node_type)
+    if required is None:
+        return [f"不支持的类型: {node_type}"]
+
+    problems = []
+    name = node.get("name")
+    if not isinstance(name, str) or not name.strip():
+        problems.append("缺少节点名称")
+
+    server = node.get("server")
+    if not isinstance(server, str) or not SERVER_RE.match(server):
+        problems.append(f"服务器地址无效: {server!r}")
+
+    port = node.get("port")
+    if isinstance(port, bool) or not isinstance(port, int) or not 1 <= port <= 65535:
+        problems.append(f"端口超出范围: {port!r}")
+
+    for field in required:
+        value = node.get(field)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            problems.append(f"缺少字段: {field}")
+
+    if node_type in UUID_TYPES and node.get("uuid") and not UUID_RE.match(str(node["uuid"])):
+        problems.append(f"UUID 格式无效: {node['uuid']}")
+
+    cipher = node.get("cipher")
+    if node_type in ("ss", "ssr") and cipher is not None and not isinstance(cipher, str):
+        problems.append(f"加密方式无效: {cipher!r}")
+
+    return problems
+
+
+def cipher_warning(node: dict):
+    """加密方式不在已知列表中时返回警告文本，否则返回 None"""
+    cipher = node.get("cipher")
+    if not isinstance(cipher, str) or not cipher:
+        return None
+    if node.get("type") == "ss" and cipher.lower() not in SS_CIPHERS:
+        return f"未知的 SS 加密方式: {cipher}"
+    if node.get("type") == "ssr" and cipher.lower() not in SSR_CIPHERS:
+        return f"未知的 SSR 加密方式: {cipher}"
+    return None
+
+
+def validate_nodes(nodes: list) -> tuple:
+    """校验全部节点，返回 (有效节点, 被拒绝的 [{"node":..., "problems": [...]}])"""
+    valid = []
+    rejected = []
+    seen_names = set()
+    for node in nodes:
+        problems = validate_node(node)
+        name = node.get("name") if isinstance(node, dict) else None
+        if not problems and name in seen_names:
+            problems = [f"节点名称重复: {name}"]
+        if problems:
+            rejected.append({"node": node, "problems": problems})
+        else:
+            seen_names.add(name)
+            valid.append(node)
+    return valid, rejected
+
+
+def quarantine(rejected: list, path: str = QUARANTINE_FILE):
+    """把被拒绝的节点写入隔离文件；没有被拒绝的节点时删除旧的隔离文件"""
+    if not rejected:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+    record = {
+        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "count": len(rejected),
+        "nodes": rejected
+    }
+    write_atomic(path, json.dumps(record, ensure_ascii=False, indent=2, default=str), fsync=False)
+
+
+def load_quarantine(path: str = QUARANTINE_FILE) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {"count": 0, "nodes": []}
@@ -0,0 +1,356 @@
+# node_index.py
+# 管理面板使用的节点索引：nodes.txt 只在 stat 变化时重新读取，面板自己的写入直接更新内存
+import os
+import json
+import base64
+import hashlib
+import threading
+from urllib.parse import unquote, urlparse
+
+SUPPORTED_PROTOCOLS = ('ss://', 'ssr://', 'vmess://', 'vless://', 'trojan://')
+
+# 按节点名称关键字划分地区，按顺序匹配，都不匹配时归为"其他"
+REGION_KEYWORDS = (
+    ('香港', ('香港', 'hk', 'hongkong')),
+    ('台湾', ('台湾', 'tw', 'taiwan')),
+    ('美国', ('美国', 'us', 'usa')),
+    ('日本', ('日本', 'jp', 'japan')),
+    ('新加坡', ('新加坡', 'sg', 'singapore')),
+    ('韩国', ('韩国', 'kr', 'korea')),
+)
+DEFAULT_REGION = '其他'
+SORT_KEYS = ('name', 'type', 'latency')
+# 缓存的查询结果数量（每个只是位置列表）
+QUERY_CACHE_SIZE = 8
+
+
+def is_valid_node_url(url: str) -> bool:
+    """验证是否为有效的节点URL"""
+    if not url or '://' not in url:
+        return False
+    if not url.startswith(SUPPORTED_PROTOCOLS):
+        return False
+    # 检查URL长度
+    return len(url) >= 20
+
+
+def get_node_type(url: str) -> str:
+    """获取节点类型"""
+    if '://' in url:
+        return url.split('://')[0].upper()
+    return 'Unknown'
+
+
+def decode_name(name: str) -> str:
+    """处理URL编码的节点名称，最多解码3次"""
+    for _ in range(3):
+        decoded = unquote(name)
+        if decoded == name:
+            break
+        name = decoded
+    return name
+
+
+def _b64decode(data: str) -> str:
+    try:
+        data = data.strip()
+        return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4)).decode(errors="ignore")
+    except Exception:
+        return ""
+
+
+def extract_server(url: str) -> tuple:
+    """不完整解析链接，只取出服务器和端口，失败时返回 ("", 0)"""
+    try:
+        if url.startswith('vmess://'):
+            info = json.loads(_b64decode(url[8:]))
+            return str(info.get('add', '')), int(info.get('port') or 0)
+        if url.startswith('ssr://'):
+            parts = _b64decode(url[6:]).split(':')
+            return parts[0], int(parts[1])
+        body = url.split('://', 1)[1]
+        if url.startswith('ss://') and '@' not in body:
+            body = _b64decode(body.split('?')[0])
+        parsed = urlparse('//' + body.split('@')[-1].split('?')[0].split('/')[0])
+        return parsed.hostname or "", parsed.port or 0
+    except Exception:
+        return "", 0
+
+
+def get_node_region(name: str) -> str:
+    """从节点名称中提取地区"""
+    name = (name or '').lower()
+    for region, keywords in REGION_KEYWORDS:
+        if any(keyword in name for keyword in keywords):
+            return region
+    return DEFAULT_REGION
+
+
+def line_id(line: str) -> str:
+    return hashlib.blake2b(line.encode('utf-8'), digest_size=6).hexdigest()
+
+
+def parse_line(line: str):
+    """解析一行节点，返回不含位置信息的字段；不是节点时返回 None"""
+    if not line or line.startswith('#'):
+        return None
+    if '#' in line:
+        node_url, node_name = line.split('#', 1)
+        node_url = node_url.strip()
+        node_name = decode_name(node_name.strip())
+    else:
+        node_url, node_name = line, ""
+    if not is_valid_node_url(node_url):
+        return None
+    server, port = extract_server(node_url)
+    return {
+        'url': node_url,
+        'name': node_name,
+        'type': get_node_type(node_url),
+        'region': get_node_region(node_name),
+        'server': server,
+        'port': port,
+        'full_line': line
+    }
+
+
+def apply_edits(lines: list, changes: list, additions=()) -> str:
+    """在行列表上应用修改并返回新内容
+
+    changes 为 [(节点, 新行)]，新行为 None 表示删除；additions 中的行追加到文件末尾
+    """
+    removed = set()
+    for node, new_line in changes:
+        if new_line is None:
+            removed.add(node['line_no'])
+        else:
+            lines[node['line_no']] = new_line
+    if removed:
+        lines = [line for line_no, line in enumerate(lines) if line_no not in removed]
+    if additions:
+        # 保持文件原有的结尾换行
+        trailing = bool(lines) and lines[-1] == ''
+        if trailing:
+            lines = lines[:-1]
+        lines = lines + list(additions) + ([''] if trailing else [])
+    return '\n'.join(lines)
+
+
+class NodeIndex:
+    """nodes.txt 的内存索引：位置、行号、稳定 ID、类型、名称、服务器"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.text = ""
+        self.lines = []
+        self.nodes = []
+        self.by_id = {}
+        self.by_type = {}
+        self.by_region = {}
+        self.signature = None
+        # 每次重建加 1，用于让查询缓存失效
+        self.version = 0
+        self._parsed = {}
+        self._queries = {}
+        self._lock = threading.RLock()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _build(self, text: str):
+        lines = text.split('\n')
+        nodes = []
+        by_id = {}
+        by_type = {}
+        by_region = {}
+        parsed_cache = {}
+        # 每个节点行出现的次数，用于给重复行编号
+        copies = {}
+        for raw in lines:
+            line = raw.strip()
+            if line not in parsed_cache:
+                # 未变化的行直接复用上次的解析结果
+                parsed_cache[line] = self._parsed[line] if line in self._parsed else parse_line(line)
+            if parsed_cache[line] is not None:
+                copies[line] = copies.get(line, 0) + 1
+        seen = {}
+        for line_no, raw in enumerate(lines):
+            line = raw.strip()
+            fields = parsed_cache[line]
+            if fields is None:
+                continue
+            # 内容哈希，行的位置变化时 ID 不变；重复行为 哈希-序号-份数，
+            # 份数变化（删除或新增了相同的行）后旧 ID 全部失效，过期的请求不会误删另一份
+            node_id = line_id(line)
+            if copies[line] > 1:
+                seen[line] = seen.get(line, 0) + 1
+                node_id = f"{node_id}-{seen[line]}-{copies[line]}"
+            node = dict(fields, index=len(nodes), position=len(nodes), line_no=line_no, id=node_id)
+            by_id[node_id] = node
+            by_type.setdefault(node['type'], []).append(len(nodes))
+            by_region.setdefault(node['region'], []).append(len(nodes))
+            nodes.append(node)
+        self.text = text
+        self.lines = lines
+        self.nodes = nodes
+        self.by_id = by_id
+        self.by_type = by_type
+        self.by_region = by_region
+        self.version += 1
+        self._parsed = parsed_cache
+        self._queries = {}
+
+    def refresh(self):
+        """文件 stat 变化时重新读取（外部编辑、同步脚本等）"""
+        with self._lock:
+            signature = self._stat()
+            if signature == self.signature:
+                return
+            if signature is None:
+                self._build("")
+            else:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._build(f.read())
+            self.signature = signature
+
+    def update(self, text: str):
+        """面板自己写入文件后调用：直接用写入的内容更新索引，不再读取文件"""
+        with self._lock:
+            self._build(text)
+            self.signature = self._stat()
+
+    def content(self) -> str:
+        with self._lock:
+            self.refresh()
+            return self.text
+
+    def snapshot(self) -> tuple:
+        """返回 (行列表副本, 节点列表)，用于读-改-写操作"""
+        with self._lock:
+            self.refresh()
+            return list(self.lines), self.nodes
+
+    def list(self) -> list:
+        with self._lock:
+            self.refresh()
+            return self.nodes
+
+    def get(self, position: int):
+        nodes = self.list()
+        if isinstance(position, int) and 0 <= position < len(nodes):
+            return nodes[position]
+        return None
+
+    def checkout(self, ids=None, positions=None) -> tuple:
+        """在同一版本上取出 (行列表副本, 目标节点, 错误信息)，用于一次写入的批量修改
+
+        ids 为稳定 ID，找不到说明节点已被修改或删除，整批拒绝；
+        positions 为旧接口的位置索引，仅做范围检查
+        """
+        with self._lock:
+            self.refresh()
+            targets = []
+            seen = set()
+            missing = [node_id for node_id in ids or [] if node_id not in self.by_id]
+            if missing:
+                return None, None, f"节点 {', '.join(map(str, missing))} 已被修改或删除，请刷新列表后重试"
+            for node_id in ids or []:
+                if node_id not in seen:
+                    seen.add(node_id)
+                    targets.append(self.by_id[node_id])
+            for position in positions or []:
+                if not isinstance(position, int) or not 0 <= position < len(self.nodes):
+                    return None, None, f"节点索引 {position} 超出范围"
+                node = self.nodes[position]
+                if node['id'] not in seen:
+                    seen.add(node['id'])
+                    targets.append(node)
+            return list(self.lines), targets, None
+
+    def get_by_id(self, node_id: str):
+        with self._lock:
+            self.refresh()
+            return self.by_id.get(node_id)
+
+    def generation(self) -> int:
+        """当前索引版本，文件内容变化后递增"""
+        with self._lock:
+            self.refresh()
+            return self.version
+
+    def counts(self) -> dict:
+        """各类型、各地区的节点数量"""
+        with self._lock:
+            self.refresh()
+            return {
+                'types': {key: len(value) for key, value in self.by_type.items()},
+                'regions': {key: len(value) for key, value in self.by_region.items()}
+            }
+
+    def _filter(self, node_type, region, q):
+        candidates = None
+        for positions in (
+            self.by_type.get(node_type.upper(), []) if node_type else None,
+            self.by_region.get(region, []) if region else None
+        ):
+            if positions is None:
+                continue
+            if candidates is None:
+                candidates = positions
+            else:
+                allowed = set(positions)
+                candidates = [p for p in candidates if p in allowed]
+        if candidates is None:
+            candidates = range(len(self.nodes))
+        if not q:
+            return list(candidates)
+        q = q.lower()
+        return [p for p in candidates
+                if q in self.nodes[p]['name'].lower()
+                or q in self.nodes[p]['type'].lower()
+                or q in self.nodes[p]['url'].lower()]
+
+    def query(self, node_type=None, region=None, q=None, sort=None, desc=False,
+              offset=0, limit=None, latency=None) -> tuple:
+        """筛选、排序并分页，返回 (当前页节点, 筛选后的总数)
+
+        筛选与按名称/类型排序的结果按索引版本缓存，翻页时只切片；
+        按延迟排序时 latency(node) 返回毫秒数，没有数据（None）的节点排在最后
+        """
+        with self._lock:
+            self.refresh()
+            nodes = self.nodes
+            order = sort if sort in ('name', 'type') else None
+            key = (self.version, node_type, region, q, order, bool(desc))
+            positions = self._queries.get(key)
+            if positions is None:
+                positions = self._filter(node_type, region, q)
+                if order == 'name':
+                    positions.sort(key=lambda p: nodes[p]['name'].lower(), reverse=bool(desc))
+                elif order == 'type':
+                    positions.sort(key=lambda p: nodes[p]['type'], reverse=bool(desc))
+                elif desc:
+                    positions.reverse()
+                if len(self._queries) >= QUERY_CACHE_SIZE:
+                    self._queries.pop(next(iter(self._queries)))
+                self._queries[key] = positions
+
+            if sort == 'latency' and latency is not None:
+                measured = []
+                unknown = []
+                for p in positions:
+                    value = latency(nodes[p])
+                    if value is None:
+                        unknown.append(p)
+                    else:
+                        measured.append((value, p))
+                measured.sort(reverse=bool(desc))
+                positions = [p for _, p in measured] + unknown
+
+            offset = max(0, offset)
+            end = len(positions) if limit is None else offset + max(0, limit)
+            return [nodes[p] for p in positions[offset:end]], len(positions)
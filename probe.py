@@ -0,0 +1,152 @@
+# probe.py
+# 节点延迟探测：asyncio 并发测量 DNS 解析、TCP 连接与可选的 TLS 握手耗时，
+# 每个节点有独立超时，全局并发数有上限，结果按完成顺序逐个产出
+import os
+import ssl
+import time
+import queue
+import socket
+import asyncio
+import threading
+
+# 单个节点的超时（秒），包含 DNS、TCP 和 TLS 所有阶段
+PROBE_TIMEOUT = float(os.getenv("OPENCLASH_PROBE_TIMEOUT", "3"))
+# 同时进行的探测数，路由器上连接数和文件描述符有限
+PROBE_CONCURRENCY = int(os.getenv("OPENCLASH_PROBE_CONCURRENCY", "32"))
+# 延迟分级阈值（毫秒）
+LATENCY_GOOD = 200
+LATENCY_WARNING = 500
+
+_DONE = object()
+
+
+def classify(latency) -> str:
+    if latency is None:
+        return "error"
+    if latency < LATENCY_GOOD:
+        return "success"
+    if latency < LATENCY_WARNING:
+        return "warning"
+    return "error"
+
+
+def _tls_context() -> ssl.SSLContext:
+    # 只测握手耗时，不校验证书（节点常用自签证书或 IP 直连）
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def _ms(seconds: float) -> int:
+    return max(0, int(round(seconds * 1000)))
+
+
+async def probe(server: str, port: int, timeout: float = PROBE_TIMEOUT, tls: bool = False, sni: str = None) -> dict:
+    """探测一个 server:port，返回各阶段耗时（毫秒）；latency 为 TCP 连接耗时"""
+    loop = asyncio.get_running_loop()
+    result = {
+        'server': server,
+        'port': port,
+        'dns_ms': None,
+        'connect_ms': None,
+        'tls_ms': None,
+        'latency': None,
+        'status': 'error',
+        'error': None,
+        'probed_at': time.time()
+    }
+    if not server or not port:
+        result['error'] = '缺少服务器地址或端口'
+        return result
+
+    deadline = loop.time() + timeout
+    stage = 'DNS 解析'
+    transport = None
+    try:
+        started = loop.time()
+        infos = await asyncio.wait_for(loop.getaddrinfo(server, port, type=socket.SOCK_STREAM), timeout)
+        result['dns_ms'] = _ms(loop.time() - started)
+        address = infos[0][4]
+
+        stage = 'TCP 连接'
+        started = loop.time()
+        transport, protocol = await asyncio.wait_for(
+            loop.create_connection(asyncio.Protocol, address[0], address[1]),
+            max(0.001, deadline - loop.time()))
+        result['connect_ms'] = _ms(loop.time() - started)
+
+        if tls:
+            stage = 'TLS 握手'
+            started = loop.time()
+            transport = await asyncio.wait_for(
+                loop.start_tls(transport, protocol, _tls_context(), server_hostname=sni or server),
+                max(0.001, deadline - loop.time()))
+            result['tls_ms'] = _ms(loop.time() - started)
+
+        result['latency'] = result['connect_ms']
+        result['status'] = classify(result['latency'])
+    except asyncio.TimeoutError:
+        result['status'] = 'timeout'
+        result['error'] = f'{stage}超时'
+    except (OSError, ssl.SSLError, IndexError) as e:
+        result['error'] = f'{stage}失败: {getattr(e, "strerror", None) or e}'
+    except Exception as e:
+        # 例如主机名不合法时 getaddrinfo 抛出的 UnicodeError，只影响这一个节点
+        result['error'] = f'{stage}失败: {e}'
+    finally:
+        if transport is not None:
+            transport.close()
+    return result
+
+
+def iter_probes(targets: list, timeout: float = PROBE_TIMEOUT, concurrency: int = PROBE_CONCURRENCY, tls: bool = False):
+    """在后台线程的事件循环中并发探测，按完成顺序产出结果
+
+    targets 中的每一项需要 server、port 字段，其余字段（id、name 等）原样带回；
+    生成器被提前关闭（例如浏览器断开）时取消剩余的探测
+    """
+    results = queue.Queue()
+    loop = asyncio.new_event_loop()
+
+    async def runner():
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(target):
+            async with semaphore:
+                result = await probe(target.get('server'), target.get('port'), timeout, tls, target.get('sni'))
+            results.put(dict(target, **result))
+
+        # 单个节点出错不能中断其余节点
+        await asyncio.gather(*(one(target) for target in targets), return_exceptions=True)
+
+    task = loop.create_task(runner())
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            loop.close()
+            results.put(_DONE)
+
+    thread = threading.Thread(target=run, name="probe", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        if thread.is_alive():
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # 事件循环刚好已经结束
+
+
+def run_probes(targets: list, timeout: float = PROBE_TIMEOUT, concurrency: int = PROBE_CONCURRENCY, tls: bool = False) -> list:
+    """探测全部目标，返回按完成顺序排列的结果列表"""
+    return list(iter_probes(targets, timeout, concurrency, tls))
@@ -0,0 +1,171 @@
+# proc_inspect.py
+# 直接读取 /proc 与 statvfs 获取进程和系统信息，代替每次请求都启动 ps / pgrep / free / df / uptime；
+# 结果按短 TTL 缓存，状态接口、健康检查和 SSE 推送共用
+import os
+import time
+import threading
+from functools import wraps
+
+PROC_DIR = os.getenv("OPENCLASH_PROC_DIR", "/proc")
+# 缓存有效期（秒）
+INSPECT_TTL = float(os.getenv("OPENCLASH_INSPECT_TTL", "2"))
+# 统计磁盘使用的挂载点，同一设备只统计一次（OpenWrt 上 / 通常就是 /overlay）
+DISK_PATHS = ("/", "/overlay", "/tmp")
+
+
+def ttl_cache(ttl: float = INSPECT_TTL):
+    """按参数缓存函数结果 ttl 秒"""
+    def decorator(func):
+        cache = {}
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            with lock:
+                hit = cache.get(args)
+                if hit is not None and now - hit[0] < ttl:
+                    return hit[1]
+            value = func(*args)
+            with lock:
+                cache[args] = (now, value)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
+def pid_alive(pid) -> bool:
+    """进程存在且不是僵尸进程（相当于 ps -p）"""
+    try:
+        pid = int(pid)
+        with open(f"{PROC_DIR}/{pid}/stat", "r") as f:
+            stat = f.read()
+    except (ValueError, TypeError, OSError):
+        return False
+    # 第 3 个字段是状态；进程名可能含空格和括号，从最后一个 ')' 之后开始取
+    fields = stat[stat.rfind(")") + 1:].split()
+    return bool(fields) and fields[0] not in ("Z", "X")
+
+
+def read_cmdline(pid) -> list:
+    try:
+        with open(f"{PROC_DIR}/{pid}/cmdline", "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    return [arg.decode("utf-8", errors="replace") for arg in data.split(b"\0") if arg]
+
+
+def iter_processes():
+    """遍历 (pid, 命令行参数列表)，内核线程的命令行为空，跳过"""
+    try:
+        entries = os.listdir(PROC_DIR)
+    except OSError:
+        return
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        argv = read_cmdline(entry)
+        if argv:
+            yield int(entry), argv
+
+
+@ttl_cache()
+def find_processes(patterns: tuple) -> list:
+    """命令行中包含任一字符串的进程 PID（相当于 pgrep -f），不含当前进程"""
+    own = os.getpid()
+    found = []
+    for pid, argv in iter_processes():
+        if pid == own:
+            continue
+        cmdline = " ".join(argv)
+        if any(pattern in cmdline for pattern in patterns):
+            found.append(pid)
+    return sorted(found)
+
+
+def read_meminfo() -> dict:
+    """内存信息（KB）：total / free / available / buffers / cached / used / swap_total / swap_free"""
+    values = {}
+    with open(f"{PROC_DIR}/meminfo", "r") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            parts = rest.split()
+            if parts:
+                values[key] = int(parts[0])
+    total = values.get("MemTotal", 0)
+    free = values.get("MemFree", 0)
+    buffers = values.get("Buffers", 0)
+    cached = values.get("Cached", 0) + values.get("SReclaimable", 0)
+    # 旧内核没有 MemAvailable，按 free + buffers + cached 估算
+    available = values.get("MemAvailable", free + buffers + cached)
+    return {
+        "total": total,
+        "free": free,
+        "available": available,
+        "buffers": buffers,
+        "cached": cached,
+        "used": max(0, total - available),
+        "swap_total": values.get("SwapTotal", 0),
+        "swap_free": values.get("SwapFree", 0)
+    }
+
+
+def read_loadavg() -> dict:
+    """平均负载与进程数"""
+    with open(f"{PROC_DIR}/loadavg", "r") as f:
+        parts = f.read().split()
+    running, _, total = parts[3].partition("/")
+    return {
+        "load1": float(parts[0]),
+        "load5": float(parts[1]),
+        "load15": float(parts[2]),
+        "running": int(running),
+        "processes": int(total)
+    }
+
+
+def read_uptime() -> float:
+    """开机时长（秒）"""
+    with open(f"{PROC_DIR}/uptime", "r") as f:
+        return float(f.read().split()[0])
+
+
+def disk_usage(path: str) -> dict:
+    """文件系统容量（字节），used 与 df 一致按已分配块计算"""
+    st = os.statvfs(path)
+    total = st.f_blocks * st.f_frsize
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    return {"path": path, "total": total, "used": used, "free": st.f_bavail * st.f_frsize}
+
+
+def disks(paths=DISK_PATHS) -> list:
+    result = []
+    seen = set()
+    for path in paths:
+        try:
+            dev = os.stat(path).st_dev
+        except OSError:
+            continue
+        if dev in seen:
+            continue
+        seen.add(dev)
+        usage = disk_usage(path)
+        if usage["total"] > 0:
+            result.append(usage)
+    return result
+
+
+@ttl_cache()
+def system_snapshot() -> dict:
+    """内存、负载、开机时长与磁盘，读取失败的项为 None"""
+    snapshot = {}
+    for key, reader in (("memory", read_meminfo), ("load", read_loadavg),
+                        ("uptime", read_uptime), ("disks", disks)):
+        try:
+            snapshot[key] = reader()
+        except (OSError, ValueError, IndexError):
+            snapshot[key] = None
+    return snapshot
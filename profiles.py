@@ -0,0 +1,81 @@
+# profiles.py
+# 多配置档：一次解析 nodes.txt，按各自的规则注入到多个 OpenClash 配置文件
+#
+# wangluo/profiles.json 示例：
+# {
+#   "profiles": [
+#     {"name": "full", "config": "/etc/openclash/config/full.yaml"},
+#     {"name": "game", "config": "/etc/openclash/config/game.yaml",
+#      "include": "香港|HK|台湾|TW", "groups": {"🎮 游戏": "HK|TW", "📺 流媒体": null}},
+#     {"name": "guest", "config": "/etc/openclash/config/guest.yaml",
+#      "types": ["ss", "trojan"], "exclude": "倍率|x[2-9]"}
+#   ]
+# }
+#
+# include / exclude: 按节点名称（正则）筛选进入该配置档的节点
+# types: 只保留指定协议的节点
+# groups: 策略组规则，值为正则时该组只注入名称匹配的节点，为 null 时该组保持不变；
+#         未列出的策略组按默认方式注入全部节点
+# 与 uci 中当前启用的配置文件路径相同的配置档会触发 OpenClash 重启，其余只写入文件
+import os
+import re
+import json
+
+ROOT_DIR = os.getenv("OPENCLASH_MANAGE_ROOT", "/root/OpenClashManage")
+PROFILES_FILE = os.getenv("OPENCLASH_PROFILES_FILE", f"{ROOT_DIR}/wangluo/profiles.json")
+# 并行生成配置的线程数，路由器内存有限，默认最多 2 个
+PROFILE_WORKERS = int(os.getenv("OPENCLASH_PROFILE_WORKERS", "2"))
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_\-]+$")
+
+
+def load_profiles(path: str = PROFILES_FILE) -> list:
+    """读取配置档列表；文件不存在时返回空列表（单配置模式），格式错误时抛出 ValueError"""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    profiles = data.get("profiles", []) if isinstance(data, dict) else data
+    if not isinstance(profiles, list):
+        raise ValueError("profiles 必须是列表")
+
+    seen = set()
+    for profile in profiles:
+        name = profile.get("name", "") if isinstance(profile, dict) else ""
+        if not _NAME_RE.match(name):
+            raise ValueError(f"配置档名称无效: {name!r}")
+        if name in seen:
+            raise ValueError(f"配置档名称重复: {name}")
+        seen.add(name)
+        if not profile.get("config"):
+            raise ValueError(f"配置档 {name} 缺少 config 路径")
+        patterns = [profile[key] for key in ("include", "exclude") if profile.get(key)]
+        patterns += [rule for rule in (profile.get("groups") or {}).values() if rule is not None]
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except (re.error, TypeError) as e:
+                raise ValueError(f"配置档 {name} 的正则无效: {pattern!r} ({e})")
+    return profiles
+
+
+def select_nodes(nodes: list, profile: dict) -> list:
+    """按配置档的 include / exclude / types 规则筛选节点"""
+    include = re.compile(profile["include"]) if profile.get("include") else None
+    exclude = re.compile(profile["exclude"]) if profile.get("exclude") else None
+    types = set(profile.get("types") or [])
+    selected = []
+    for node in nodes:
+        name = node.get("name", "")
+        if include and not include.search(name):
+            continue
+        if exclude and exclude.search(name):
+            continue
+        if types and node.get("type") not in types:
+            continue
+        selected.append(node)
+    return selected
+
+
+def same_file(a: str, b: str) -> bool:
+    return os.path.realpath(a) == os.path.realpath(b)
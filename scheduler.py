@@ -0,0 +1,89 @@
+# scheduler.py
+import os
+import errno
+import fcntl
+from contextlib import contextmanager
+
+LOCK_FILE = "/tmp/openclash_update.lock"
+PENDING_FILE = "/tmp/openclash_update.pending"
+# 触发被合并到正在执行的同步时 zr.py 的退出码（sysexits 的 EX_TEMPFAIL），区别于成功与失败
+EXIT_MERGED = 75
+
+
+class SyncScheduler:
+    """用 flock 保证同一时间只有一个同步在执行，执行期间到达的触发合并为一次补跑
+
+    锁由内核持有，进程崩溃时自动释放，不会留下失效的锁文件。
+    """
+
+    def __init__(self, lock_path: str = LOCK_FILE, pending_path: str = PENDING_FILE):
+        self.lock_path = lock_path
+        self.pending_path = pending_path
+
+    def _try_lock(self):
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except OSError as e:
+            os.close(fd)
+            if e.errno in (errno.EAGAIN, errno.EACCES, errno.EWOULDBLOCK):
+                return None
+            raise
+
+    def _unlock(self, fd: int):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _mark_pending(self):
+        os.close(os.open(self.pending_path, os.O_WRONLY | os.O_CREAT, 0o644))
+
+    def _take_pending(self) -> bool:
+        try:
+            os.remove(self.pending_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def has_pending(self) -> bool:
+        return os.path.exists(self.pending_path)
+
+    @contextmanager
+    def locked(self):
+        """不阻塞地独占同步锁，用于恢复快照等不能与同步同时进行的操作
+
+        产出是否拿到锁；持锁期间到达的触发会登记标记后退出，
+        调用方释放锁后需检查 has_pending() 并补跑一次同步
+        """
+        fd = self._try_lock()
+        if fd is None:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            self._unlock(fd)
+
+    def run(self, job):
+        """提交一次同步请求
+
+        先登记待执行标记再尝试加锁：拿到锁就循环执行直到没有新的标记；
+        拿不到锁说明已有同步在执行，持锁者释放锁前后都会检查标记并补跑。
+        返回最后一次 job() 的返回值，本次请求被合并时返回 None。
+        """
+        self._mark_pending()
+        result = None
+        while True:
+            fd = self._try_lock()
+            if fd is None:
+                return result
+            try:
+                while self._take_pending():
+                    result = job()
+            finally:
+                self._unlock(fd)
+            # 释放锁的瞬间可能有新的触发没抢到锁，再检查一次
+            if not os.path.exists(self.pending_path):
+                return result
@@ -0,0 +1,145 @@
+# snapshots.py
+import os
+import json
+import zlib
+import fcntl
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime
+from fsutil import write_atomic
+
+ROOT_DIR = os.getenv("OPENCLASH_MANAGE_ROOT", "/root/OpenClashManage")
+SNAPSHOT_DIR = os.getenv("OPENCLASH_SNAPSHOT_DIR", f"{ROOT_DIR}/snapshots")
+# 快照占用空间上限（压缩后字节数）
+SNAPSHOT_BUDGET = int(os.getenv("OPENCLASH_SNAPSHOT_BUDGET", str(4 * 1024 * 1024)))
+# 无论预算多少，至少保留最近的几个版本
+KEEP_MIN = 2
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def stat_signature(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
+class SnapshotStore:
+    """按内容摘要寻址的配置快照库：相同内容只存一份，zlib 压缩，按字节预算淘汰旧版本"""
+
+    def __init__(self, root: str = SNAPSHOT_DIR, budget: int = SNAPSHOT_BUDGET):
+        self.root = root
+        self.budget = budget
+        self.index_path = os.path.join(root, "index.json")
+        self.objects_dir = os.path.join(root, "objects")
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.objects_dir, exist_ok=True)
+        fd = os.open(os.path.join(self.root, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, f"{digest}.z")
+
+    def _load_index(self) -> list:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, list) else []
+        except Exception:
+            return []
+
+    def _save_index(self, entries: list):
+        write_atomic(self.index_path, json.dumps(entries, ensure_ascii=False, indent=1), fsync=False)
+
+    def _enforce_budget(self, entries: list) -> list:
+        """从最旧的快照开始淘汰，直到压缩后总大小不超过预算"""
+        def total_size(items):
+            return sum({e["digest"]: e["stored"] for e in items}.values())
+
+        while len(entries) > KEEP_MIN and total_size(entries) > self.budget:
+            dropped = entries.pop(0)
+            if not any(e["digest"] == dropped["digest"] for e in entries):
+                try:
+                    os.remove(self._object_path(dropped["digest"]))
+                except FileNotFoundError:
+                    pass
+        return entries
+
+    def list(self) -> list:
+        """返回所有快照，最新的在前"""
+        return list(reversed(self._load_index()))
+
+    def get(self, snapshot_id: str, path: str = None):
+        """按完整编号（id 或 digest）或唯一前缀查找快照，path 限定配置文件
+
+        找不到时返回 None；前缀或编号对应多条记录时抛出 ValueError，避免恢复错误的版本
+        """
+        entries = [e for e in self.list() if path is None or e["path"] == path]
+        matches = [e for e in entries if snapshot_id in (e["id"], e["digest"])]
+        if not matches and snapshot_id:
+            matches = [e for e in entries if e["digest"].startswith(snapshot_id)]
+        if len(matches) > 1:
+            raise ValueError(f"快照编号 {snapshot_id} 对应 {len(matches)} 个快照，请提供更完整的编号或配置文件路径")
+        return matches[0] if matches else None
+
+    def read(self, entry: dict) -> bytes:
+        with open(self._object_path(entry["digest"]), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def add(self, data: bytes, config_path: str, note: str = "") -> dict:
+        """保存一份配置内容，同一文件的相同内容只保留一条记录"""
+        digest = content_digest(data)
+        with self._locked():
+            object_path = self._object_path(digest)
+            if not os.path.exists(object_path):
+                write_atomic(object_path, zlib.compress(data, 6), fsync=False)
+
+            entries = [e for e in self._load_index() if not (e["digest"] == digest and e["path"] == config_path)]
+            entry = {
+                "id": digest[:12],
+                "digest": digest,
+                "path": config_path,
+                "size": len(data),
+                "stored": os.path.getsize(object_path),
+                "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "note": note,
+                "signature": stat_signature(config_path)
+            }
+            entries.append(entry)
+            self._save_index(self._enforce_budget(entries))
+        return entry
+
+    def ensure(self, config_path: str, note: str = "") -> dict:
+        """确保配置文件当前内容已在快照库中；文件自上次记录后未变化时不读取内容"""
+        signature = stat_signature(config_path)
+        if signature is None:
+            return None
+        for entry in reversed(self._load_index()):
+            if entry["path"] == config_path:
+                if entry.get("signature") == signature:
+                    return entry
+                break
+        with open(config_path, "rb") as f:
+            return self.add(f.read(), config_path, note)
+
+    def restore(self, snapshot_id: str, config_path: str = None) -> dict:
+        """恢复指定快照：解压到同目录临时文件后 rename 覆盖；config_path 为该快照所属的配置文件"""
+        entry = self.get(snapshot_id, config_path)
+        if entry is None:
+            raise KeyError(snapshot_id)
+        target = entry["path"]
+        self.ensure(target, "恢复前自动保存")
+        data = self.read(entry)
+        write_atomic(target, data)
+        return self.add(data, target, f"恢复自 {entry['id']}")
@@ -0,0 +1,134 @@
+# sync_plan.py
+# 计算同步前后配置的差异，用于 zr.py --plan 与 /api/sync_plan
+
+from fastyaml import to_plain
+
+# 差异列表中最多列出的节点名称数
+MAX_LISTED = 10
+# Clash 内置策略，可直接出现在策略组成员中
+BUILTIN_POLICIES = {"DIRECT", "REJECT", "REJECT-DROP", "PASS", "COMPATIBLE", "GLOBAL"}
+
+
+def capture_state(config) -> dict:
+    """记录配置中的节点与策略组成员，需在注入前调用"""
+    proxies = {}
+    for proxy in config.get("proxies") or []:
+        if isinstance(proxy, dict) and proxy.get("name"):
+            proxies[str(proxy["name"])] = to_plain(proxy)
+    groups = {}
+    for group in config.get("proxy-groups") or []:
+        if isinstance(group, dict) and group.get("name"):
+            groups[str(group["name"])] = [str(p) for p in group.get("proxies") or []]
+    return {"proxies": proxies, "groups": groups}
+
+
+def check_references(config) -> list:
+    """内存中校验策略组引用：成员必须是已有节点、策略组或内置策略"""
+    proxy_names = {str(p.get("name")) for p in config.get("proxies") or [] if isinstance(p, dict)}
+    group_names = {str(g.get("name")) for g in config.get("proxy-groups") or [] if isinstance(g, dict)}
+    known = proxy_names | group_names | BUILTIN_POLICIES
+    problems = []
+    if len(proxy_names) != len(config.get("proxies") or []):
+        problems.append("存在重名或缺少名称的节点")
+    for group in config.get("proxy-groups") or []:
+        if not isinstance(group, dict):
+            continue
+        missing = [str(m) for m in group.get("proxies") or [] if str(m) not in known]
+        if missing:
+            problems.append(f"策略组 {group.get('name')} 引用了不存在的成员: {'、'.join(missing[:MAX_LISTED])}")
+    return problems
+
+
+def estimate_yaml_size(value, indent: int = 0) -> int:
+    """粗略估算块格式 YAML 的字节数，避免为了估算大小而完整序列化一次"""
+    if isinstance(value, dict):
+        return sum(indent + len(str(k).encode()) + 2 + estimate_yaml_size(v, indent + 2) for k, v in value.items())
+    if isinstance(value, list):
+        if not value:
+            return 3
+        return sum(indent + 2 + estimate_yaml_size(v, indent + 2) for v in value)
+    return len(str(value).encode()) + 1
+
+
+def diff_config(before: dict, after: dict, current_size: int = 0) -> dict:
+    """比较注入前后的状态，返回新增/删除/变更节点、策略组成员变化与预计大小"""
+    old_proxies = before["proxies"]
+    new_proxies = after["proxies"]
+    added = [name for name in new_proxies if name not in old_proxies]
+    removed = [name for name in old_proxies if name not in new_proxies]
+    changed = [name for name in new_proxies if name in old_proxies and new_proxies[name] != old_proxies[name]]
+
+    group_changes = []
+    for name, members in after["groups"].items():
+        old_members = before["groups"].get(name, [])
+        old_set = set(old_members)
+        new_set = set(members)
+        plus = len(new_set - old_set)
+        minus = len(old_set - new_set)
+        if plus or minus or members != old_members:
+            group_changes.append({
+                "name": name,
+                "added": plus,
+                "removed": minus,
+                "reordered": not plus and not minus,
+                "total": len(members)
+            })
+
+    old_estimate = estimate_yaml_size({"proxies": list(old_proxies.values())}) + estimate_yaml_size(before["groups"])
+    new_estimate = estimate_yaml_size({"proxies": list(new_proxies.values())}) + estimate_yaml_size(after["groups"])
+
+    return {
+        "proxies": {
+            "added": len(added),
+            "removed": len(removed),
+            "changed": len(changed),
+            "unchanged": len(new_proxies) - len(added) - len(changed),
+            "total": len(new_proxies),
+            "added_names": added[:MAX_LISTED],
+            "removed_names": removed[:MAX_LISTED],
+            "changed_names": changed[:MAX_LISTED]
+        },
+        "groups": group_changes,
+        "current_size": current_size,
+        "estimated_size": max(0, current_size - old_estimate + new_estimate),
+        "restart_needed": bool(added or removed or changed or group_changes)
+    }
+
+
+def _format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:.1f} MB"
+    if size >= 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size} B"
+
+
+def format_plan(plan: dict) -> str:
+    """生成简洁的文本差异报告"""
+    p = plan["proxies"]
+    lines = [
+        "📋 同步计划（仅预览，未写入配置、未重启）",
+        f"节点: 新增 {p['added']}，删除 {p['removed']}，变更 {p['changed']}，不变 {p['unchanged']}（共 {p['total']} 个）"
+    ]
+    for label, key in (("  + ", "added_names"), ("  - ", "removed_names"), ("  ~ ", "changed_names")):
+        if p[key]:
+            more = p[key.replace("_names", "")] - len(p[key])
+            lines.append(label + "、".join(p[key]) + (f" 等 {more} 个" if more > 0 else ""))
+
+    if plan["groups"]:
+        lines.append("策略组变化:")
+        for g in plan["groups"]:
+            detail = "仅顺序变化" if g["reordered"] else f"+{g['added']} -{g['removed']}"
+            lines.append(f"  {g['name']}: {detail}（共 {g['total']} 个）")
+    else:
+        lines.append("策略组变化: 无")
+
+    lines.append(f"预计配置大小: {_format_size(plan['estimated_size'])}（当前 {_format_size(plan['current_size'])}）")
+    lines.append(f"需要重启: {'是' if plan['restart_needed'] else '否'}")
+    if plan.get("rejected_nodes"):
+        lines.append(f"⚠️ 已隔离 {plan['rejected_nodes']} 个问题节点，不会写入配置")
+    for problem in plan.get("problems", []):
+        lines.append(f"⚠️ {problem}")
+    if "elapsed" in plan:
+        lines.append(f"耗时: {plan['elapsed']} 秒")
+    return "\n".join(lines)
@@ -0,0 +1,103 @@
+# sync_stats.py
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from fsutil import write_atomic
+
+try:
+    import resource
+except ImportError:  # 非 Unix 平台
+    resource = None
+
+ROOT_DIR = os.getenv("OPENCLASH_MANAGE_ROOT", "/root/OpenClashManage")
+HISTORY_FILE = os.getenv("SYNC_HISTORY_FILE", f"{ROOT_DIR}/wangluo/sync_history.json")
+# 环形缓冲区大小：只保留最近 N 次同步记录
+HISTORY_SIZE = int(os.getenv("SYNC_HISTORY_SIZE", "50"))
+
+
+def peak_rss_kb() -> int:
+    """当前进程的峰值内存占用（KB）"""
+    if resource is None:
+        return 0
+    try:
+        # Linux 下 ru_maxrss 单位为 KB
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    except Exception:
+        return 0
+
+
+class SyncTimer:
+    """记录一次同步中各阶段的耗时与峰值内存"""
+
+    def __init__(self, source: str = "zr"):
+        self.source = source
+        self.started_at = datetime.now()
+        self.status = "running"
+        self.stages = []
+        self.extra = {}
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.stages.append({
+                "name": name,
+                "ms": round(seconds * 1000, 2),
+                "peak_rss_kb": peak_rss_kb()
+            })
+
+    def merge(self, other: "SyncTimer", prefix: str):
+        """合并子任务（如工作线程）的阶段记录，名称加上前缀"""
+        with other._lock:
+            stages = [dict(s, name=f"{prefix}/{s['name']}") for s in other.stages]
+        with self._lock:
+            self.stages.extend(stages)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = list(self.stages)
+        return {
+            "started_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "source": self.source,
+            "status": self.status,
+            "total_ms": round((time.perf_counter() - self._start) * 1000, 2),
+            "peak_rss_kb": peak_rss_kb(),
+            "stages": stages,
+            **self.extra
+        }
+
+    def save(self, path: str = HISTORY_FILE, size: int = HISTORY_SIZE) -> dict:
+        """追加到历史记录文件，超出容量时丢弃最旧的记录"""
+        run = self.to_dict()
+        history = _read_history(path)
+        history.append(run)
+        write_atomic(path, json.dumps(history[-size:], ensure_ascii=False), fsync=False)
+        return run
+
+
+def _read_history(path: str) -> list:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except Exception:
+        return []
+
+
+def load_history(limit: int = 20, path: str = HISTORY_FILE) -> list:
+    """读取最近 limit 次同步记录，最新的在前"""
+    history = _read_history(path)
+    if limit > 0:
+        history = history[-limit:]
+    return list(reversed(history))
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试面板接口：批量修改节点、ETag 条件请求与 gzip 压缩
+"""
+
+import os
+import sys
+import gzip
+import json
+import atexit
+import shutil
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 导入 app 之前指向临时目录，不影响真实的节点文件和日志
+TMP_ROOT = tempfile.mkdtemp(prefix="openclash_manage_test_")
+atexit.register(shutil.rmtree, TMP_ROOT, True)
+os.makedirs(os.path.join(TMP_ROOT, "wangluo"))
+os.environ["OPENCLASH_MANAGE_ROOT"] = TMP_ROOT
+os.environ["LOG_FILE"] = os.path.join(TMP_ROOT, "wangluo", "log.txt")
+os.environ["OPENCLASH_LATENCY_FILE"] = os.path.join(TMP_ROOT, "wangluo", "latency.json")
+
+import app
+from fsutil import write_atomic
+
+CONTENT = """# 注释
+trojan://pw@hk.example.com:443#香港01
+trojan://pw@jp.example.com:443#日本01
+trojan://pw@us.example.com:443#美国01
+"""
+
+
+def reset_nodes(content=CONTENT):
+    """写入测试用的节点文件，返回 (test_client, 节点列表)"""
+    write_atomic(app.NODES_FILE, content)
+    return app.app.test_client(), app.manager.get_nodes_list()
+
+
+def read_nodes():
+    with open(app.NODES_FILE, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_batch_rejects_whole_batch():
+    """任一操作不合法时整批拒绝、文件不变，错误按操作序号返回"""
+    print("🧪 测试批量修改校验...")
+    client, nodes = reset_nodes()
+    hk, jp, _ = nodes
+    cases = [
+        ([{"op": "update", "id": hk["id"], "line": "trojan://pw@hk.example.com:8443#香港02"},
+          {"op": "add", "line": "not a node"}], 1, "格式无效"),
+        ([{"op": "update", "id": hk["id"], "line": "trojan://pw@hk.example.com:443#X\nhello world injected"}],
+         0, "不能换行"),
+        ([{"op": "add", "line": "trojan://pw@sg.example.com:443#SG\rtrojan://pw@kr.example.com:443#KR"}],
+         0, "不能换行"),
+        ([{"op": "update", "id": jp["id"], "line": 5}], 0, "必须是字符串"),
+        ([{"op": "delete", "id": jp["id"]}, {"op": "update", "id": jp["id"],
+                                             "line": "trojan://pw@jp.example.com:443#日本02"}], 1, "重复修改"),
+        ([{"op": "rename", "id": jp["id"]}], 0, "不支持的操作"),
+        ([{"op": "delete"}], 0, "缺少节点 ID")
+    ]
+    for operations, index, message in cases:
+        data = client.post("/api/nodes/batch", json={"operations": operations}).get_json()
+        assert data["success"] is False, operations
+        assert [e["index"] for e in data["errors"]] == [index], data
+        assert message in data["errors"][0]["message"], data
+        assert read_nodes() == CONTENT
+
+    for body in ([1], "text", {"operations": []}, {"operations": {"op": "add"}}):
+        response = client.post("/api/nodes/batch", json=body)
+        assert response.status_code == 200 and response.get_json()["success"] is False
+    assert read_nodes() == CONTENT
+    print("✅ 批量修改校验正常")
+
+
+def test_batch_single_write_and_stale_ids():
+    """合法的批次只写入一次；再次提交已失效的 ID 时整批拒绝"""
+    print("🧪 测试批量修改写入...")
+    client, nodes = reset_nodes()
+    hk, jp, us = nodes
+    writes = []
+    original = app.write_atomic
+    app.write_atomic = lambda path, content, *args, **kwargs: writes.append(path) or original(path, content, *args, **kwargs)
+    try:
+        operations = [
+            {"op": "update", "id": hk["id"], "line": "trojan://pw@hk.example.com:8443#香港02"},
+            {"op": "delete", "id": jp["id"]},
+            {"op": "add", "line": "trojan://pw@sg.example.com:443#新加坡01\n"}
+        ]
+        data = client.post("/api/nodes/batch", json={"operations": operations}).get_json()
+        assert data["success"] and (data["added"], data["updated"], data["deleted"]) == (1, 1, 1), data
+        assert writes == [app.NODES_FILE]
+        assert [n["name"] for n in app.manager.get_nodes_list()] == ["香港02", "美国01", "新加坡01"]
+
+        before = read_nodes()
+        data = client.post("/api/nodes/batch", json={"operations": [
+            {"op": "delete", "id": us["id"]}, {"op": "delete", "id": jp["id"]}]}).get_json()
+        assert data["success"] is False and jp["id"] in data["message"]
+        assert read_nodes() == before and len(writes) == 1
+    finally:
+        app.write_atomic = original
+    print("✅ 批量修改写入正常")
+
+
+def test_conditional_json():
+    """If-None-Match 与 ETag 相同时返回 304；节点写入、测速、日志追加后 ETag 变化"""
+    print("🧪 测试 ETag 条件请求...")
+    client, nodes = reset_nodes()
+    response = client.get("/api/get_nodes")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200 and etag.startswith("W/")
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    response = client.get("/api/get_nodes", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and response.get_data() == b""
+    assert response.headers["ETag"] == etag and "Content-Encoding" not in response.headers
+
+    client.post("/api/nodes/batch", json={"operations": [{"op": "delete", "id": nodes[0]["id"]}]})
+    response = client.get("/api/get_nodes", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and len(response.get_json()["nodes"]) == 2
+    assert response.headers["ETag"] != etag
+    etag = response.headers["ETag"]
+
+    app.manager.latency_store.record(nodes[1]["server"], nodes[1]["port"], 80)
+    response = client.get("/api/get_nodes", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["ETag"] != etag
+
+    etag = client.get("/api/get_status").headers["ETag"]
+    assert client.get("/api/get_status", headers={"If-None-Match": etag}).status_code == 304
+    with open(app.LOG_FILE, "a", encoding="utf-8") as f:
+        f.write("2024-01-01 00:00:00 测试日志\n")
+    response = client.get("/api/get_status", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and "测试日志" in response.get_json()["log_content"]
+    assert response.headers["ETag"] != etag
+    print("✅ ETag 条件请求正常")
+
+
+def test_compress_response():
+    """只有客户端接受 gzip 且响应超过 GZIP_MIN_SIZE 时才压缩；流式响应不压缩"""
+    print("🧪 测试响应压缩...")
+    lines = "".join(f"trojan://pw@n{i}.example.com:443#节点{i:02d}\n" for i in range(30))
+    client, nodes = reset_nodes(lines)
+    plain = client.get("/api/get_nodes")
+    assert plain.content_length >= app.GZIP_MIN_SIZE and "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    packed = client.get("/api/get_nodes", headers={"Accept-Encoding": "gzip, deflate"})
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in packed.headers["Vary"]
+    assert json.loads(gzip.decompress(packed.get_data())) == plain.get_json()
+    assert packed.content_length < plain.content_length
+
+    small = client.get("/api/get_nodes?limit=1", headers={"Accept-Encoding": "gzip"})
+    assert small.content_length < app.GZIP_MIN_SIZE and "Content-Encoding" not in small.headers
+    assert small.get_json()["success"]
+
+    # 全部命中测速缓存，不发起真实探测
+    for node in nodes[:3]:
+        app.manager.latency_store.record(node["server"], node["port"], 50)
+    ids = [node["id"] for node in nodes[:3]]
+    response = client.post("/api/nodes/probe", json={"ids": ids}, headers={"Accept-Encoding": "gzip"})
+    assert response.is_streamed and "Content-Encoding" not in response.headers
+    results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [r.get("cached") for r in results[:3]] == [True] * 3 and results[-1]["done"]
+
+    response = client.get("/api/events", headers={"Accept-Encoding": "gzip"}, buffered=False)
+    try:
+        assert response.is_streamed and response.mimetype == "text/event-stream"
+        assert "Content-Encoding" not in response.headers
+        assert next(iter(response.response)).startswith(b"retry:")
+    finally:
+        response.close()
+    print("✅ 响应压缩正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_batch_rejects_whole_batch,
+        test_batch_single_write_and_stale_ids,
+        test_conditional_json,
+        test_compress_response
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试节点文件变化检测：stat 快速路径、仅 stat 变化时自动刷新、同步成功后才提交
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import change_detect
+from change_detect import ChangeDetector
+
+
+class DigestCounter:
+    """统计 file_digest 的调用次数"""
+
+    def __init__(self):
+        self.calls = 0
+        self.original = change_detect.file_digest
+
+    def __call__(self, path):
+        self.calls += 1
+        return self.original(path)
+
+
+def make_detector(tmp_dir, content="ss://a#HK\n"):
+    path = os.path.join(tmp_dir, "nodes.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return ChangeDetector(path, os.path.join(tmp_dir, "nodes_state.json"))
+
+
+def test_stat_fast_path():
+    """签名未变时不读取文件内容；仅 stat 变化、内容相同时视为未变化并自动刷新签名"""
+    print("🧪 测试 stat 快速路径...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        detector = make_detector(tmp_dir)
+        changed, record = detector.check()
+        assert changed
+        detector.commit(record)
+
+        counter = DigestCounter()
+        change_detect.file_digest = counter
+        try:
+            changed, _ = detector.check()
+            assert not changed and counter.calls == 0
+
+            st = os.stat(detector.path)
+            os.utime(detector.path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+            changed, record = detector.check()
+            assert not changed and counter.calls == 1
+            with open(detector.state_path, "r", encoding="utf-8") as f:
+                assert json.load(f)["signature"] == record["signature"]
+
+            changed, _ = detector.check()
+            assert not changed and counter.calls == 1
+        finally:
+            change_detect.file_digest = counter.original
+    print("✅ stat 快速路径正常")
+
+
+def test_commit_only_after_sync():
+    """内容变化后不提交时每次都报告变化（同步失败会重试），提交后不再报告"""
+    print("🧪 测试提交时机...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        detector = make_detector(tmp_dir)
+        detector.commit(detector.check()[1])
+
+        with open(detector.path, "a", encoding="utf-8") as f:
+            f.write("trojan://pw@jp.example.com:443#JP\n")
+        changed, record = detector.check()
+        assert changed
+        # 模拟同步失败：没有提交
+        changed, record = detector.check()
+        assert changed
+
+        detector.commit(record)
+        assert detector.check()[0] is False
+
+        os.remove(detector.path)
+        try:
+            detector.check()
+            raise AssertionError("文件不存在时应当抛出 FileNotFoundError")
+        except FileNotFoundError:
+            pass
+        with open(detector.state_path, "w", encoding="utf-8") as f:
+            f.write("[broken")
+        assert detector.load_state() == {}
+    print("✅ 提交时机正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_stat_fast_path,
+        test_commit_only_after_sync
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
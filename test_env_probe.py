@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试 UCI 配置与 opkg 状态文件的解析
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import env_probe
+from env_probe import parse_uci_file, parse_opkg_status
+
+UCI_OPENCLASH = """
+config openclash 'config'
+	option enable '1'
+	option config_path '/etc/openclash/config/my config.yaml'
+	option dns_port "7874"  # 行尾注释
+	list lan_ac_black_ips '192.168.1.10'
+	list lan_ac_black_ips '192.168.1.11'
+
+config dns_servers
+	option group 'nameserver'
+	option ip '114.114.114.114'
+
+config dns_servers
+	option group 'fallback'
+	option ip '8.8.8.8'
+
+config config_subscribe 'sub1'
+	option name 'it'\\''s mine'
+"""
+
+OPKG_STATUS = """Package: luci-app-openclash
+Version: 0.46.003-beta
+Status: install user installed
+Architecture: all
+
+Package: dnsmasq
+Status: deinstall ok not-installed
+
+Package: ruby
+Status: install ok installed
+"""
+
+
+def test_parse_uci_file():
+    """命名 section、匿名 @type[n] section、list 选项与带引号的值"""
+    print("🧪 测试 UCI 解析...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "openclash")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(UCI_OPENCLASH)
+        sections = parse_uci_file(path)
+
+        config = sections["config"]
+        assert config is sections["@openclash[0]"] and config[".type"] == "openclash"
+        assert config["config_path"] == "/etc/openclash/config/my config.yaml"
+        assert config["dns_port"] == "7874"
+        assert config["lan_ac_black_ips"] == ["192.168.1.10", "192.168.1.11"]
+
+        assert sections["@dns_servers[0]"]["group"] == "nameserver"
+        assert sections["@dns_servers[1]"]["ip"] == "8.8.8.8"
+        assert sections["sub1"] is sections["@config_subscribe[0]"]
+        assert sections["sub1"]["name"] == "it's mine"
+
+        old_dir, old_delta = env_probe.UCI_CONFIG_DIR, env_probe.UCI_DELTA_DIR
+        env_probe.UCI_CONFIG_DIR, env_probe.UCI_DELTA_DIR = tmp_dir, os.path.join(tmp_dir, "delta")
+        try:
+            assert env_probe.get_uci_option("openclash", "config", "enable") == "1"
+            assert env_probe.get_uci_option("openclash", "config", "lan_ac_black_ips") == "192.168.1.10 192.168.1.11"
+            assert env_probe.get_uci_option("openclash", "@dns_servers[1]", "group") == "fallback"
+            assert env_probe.get_uci_option("openclash", "config", "missing") == ""
+        finally:
+            env_probe.UCI_CONFIG_DIR, env_probe.UCI_DELTA_DIR = old_dir, old_delta
+    print("✅ UCI 解析正常")
+
+
+def test_parse_opkg_status():
+    """只有状态以 installed 结尾的软件包算已安装"""
+    print("🧪 测试 opkg 状态解析...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "status")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(OPKG_STATUS)
+        assert parse_opkg_status(path) == {"luci-app-openclash", "ruby"}
+
+        old_file = env_probe.OPKG_STATUS_FILE
+        env_probe.OPKG_STATUS_FILE = path
+        try:
+            assert env_probe.is_openclash_installed()
+            assert not env_probe.is_package_installed("dnsmasq")
+        finally:
+            env_probe.OPKG_STATUS_FILE = old_file
+    print("✅ opkg 状态解析正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_parse_uci_file,
+        test_parse_opkg_status
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试状态 / 日志推送：日志按偏移追加、截断后重置、多客户端共享一个轮询线程
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from events import EventHub, LogTail
+
+
+def test_log_tail_append_and_reset():
+    """只返回新增的完整行，文件被清空后返回 reset"""
+    print("🧪 测试日志追踪...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "log.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("第一行\n")
+        tail = LogTail(path)
+        assert tail.poll() == ("reset", "第一行\n")
+        assert tail.poll() is None
+
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("第二行\n半行")
+        assert tail.poll() == ("append", "第二行\n")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("写完\n")
+        assert tail.poll() == ("append", "半行写完\n")
+
+        open(path, "w").close()
+        assert tail.poll() == ("reset", "")
+    print("✅ 日志追踪正常")
+
+
+def test_hub_shares_one_poller():
+    """两个客户端收到同一份推送，状态源每次轮询只调用一次，断开后线程退出"""
+    print("🧪 测试共享轮询...")
+    calls = []
+
+    def status_source():
+        calls.append(1)
+        return {"watchdog_status": False}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "log.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("启动\n")
+        hub = EventHub(status_source, path, interval=0.05)
+        first, second = hub.subscribe(), hub.subscribe()
+        streams = [hub.stream(first), hub.stream(second)]
+        for stream in streams:
+            assert next(stream).startswith("retry:")
+            assert next(stream).startswith("event: status")
+            assert "启动" in next(stream)
+
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("新日志\n")
+        for stream in streams:
+            message = next(stream)
+            assert message.startswith("event: log") and "新日志" in message
+
+        polls = len(calls)
+        time.sleep(0.2)
+        assert len(calls) - polls <= 6
+        for stream in streams:
+            stream.close()
+        time.sleep(0.2)
+        assert hub.client_count() == 0 and hub._thread is None
+    print("✅ 共享轮询正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_log_tail_append_and_reset,
+        test_hub_shares_one_poller
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
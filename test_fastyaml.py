@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试 proxies / proxy-groups 拆分加载与输出
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ruamel.yaml import YAML
+from fastyaml import SafeYAML, split_sections, load_config, dump_config, to_plain
+
+CONFIG_TEXT = """# 用户配置
+mixed-port: 7890
+proxies:
+- name: NO
+  type: ss
+  server: 1.2.3.4
+  port: 8388
+  cipher: aes-256-gcm
+  password: 'true'
+
+# 策略组
+proxy-groups:
+- name: 节点选择
+  type: select
+  proxies: [NO, DIRECT]
+rules:
+- MATCH,节点选择  # 兜底
+"""
+
+
+def make_yaml():
+    yaml = YAML()
+    yaml.preserve_quotes = True
+    return yaml
+
+
+def write_config(tmp_dir, text):
+    path = os.path.join(tmp_dir, "config.yaml")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def test_split_keeps_other_sections():
+    """拆分后其余内容和注释保持不变"""
+    print("🧪 测试段落拆分...")
+    rest, sections = split_sections(CONFIG_TEXT)
+    assert set(sections) == {"proxies", "proxy-groups"}
+    assert "# 策略组\n" in rest and "# 兜底" in rest
+    assert "proxies: __OCM_PROXIES__\n" in rest
+    assert "proxy-groups: __OCM_PROXY_GROUPS__\n" in rest
+    print("✅ 段落拆分正常")
+
+
+def test_load_and_dump_roundtrip():
+    """拆分加载与拼接输出的结果和完整往返加载一致，YAML 1.2 下 NO 仍是字符串"""
+    print("🧪 测试加载与输出...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = write_config(tmp_dir, CONFIG_TEXT)
+        expected = to_plain(make_yaml().load(CONFIG_TEXT))
+        for pure in (True, False):
+            safe = SafeYAML(pure=pure)
+            config = load_config(make_yaml(), path, safe)
+            assert to_plain(config) == expected
+            assert config["proxies"][0]["name"] == "NO"
+            text = dump_config(make_yaml(), config, safe.dump, safe)
+            assert "# 兜底" in text
+            assert to_plain(make_yaml().load(text)) == expected
+    print("✅ 加载与输出正常")
+
+
+def test_alias_falls_back_to_round_trip():
+    """跨段引用锚点时退回完整往返加载"""
+    print("🧪 测试锚点回退...")
+    text = "base: &opts\n  udp: true\nproxies:\n- name: a\n  <<: *opts\n"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config = load_config(make_yaml(), write_config(tmp_dir, text))
+        assert config["proxies"][0]["udp"] is True
+    print("✅ 锚点回退正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_split_keeps_other_sections,
+        test_load_and_dump_roundtrip,
+        test_alias_falls_back_to_round_trip
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试节点片段缓存：拼接结果与完整序列化一致、缓存修剪与失效、拆分数量不一致时回退
+"""
+
+import os
+import sys
+import copy
+import json
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fragments
+from fragments import FragmentCache, split_items, node_fingerprint
+from fastyaml import SafeYAML
+
+NODES = [
+    {"name": "香港01", "type": "ss", "server": "hk.example.com", "port": 8388,
+     "cipher": "aes-256-gcm", "password": "a: b # c"},
+    {"name": "日本01", "type": "vmess", "server": "jp.example.com", "port": 443, "uuid": "u",
+     "alterId": 0, "cipher": "auto", "tls": True, "ws-opts": {"path": "/ws", "headers": {"Host": "jp"}}},
+    {"name": "- 美国01", "type": "trojan", "server": "us.example.com", "port": 443, "password": "pw",
+     "alpn": ["h2", "http/1.1"], "sni": ""},
+    {"name": "多行", "type": "http", "server": "m.example.com", "port": 80, "headers": "line1\nline2"}
+]
+
+
+class CountingDump:
+    """记录每次 dump 收到的节点数"""
+
+    def __init__(self, safe):
+        self.safe = safe
+        self.calls = []
+
+    def __call__(self, nodes):
+        self.calls.append(len(nodes))
+        return self.safe.dump(nodes)
+
+
+def test_split_items():
+    """按第 0 列的 "- " 拆分列表项，嵌套列表和多行值留在所属项中"""
+    print("🧪 测试片段拆分...")
+    safe = SafeYAML()
+    text = safe.dump(NODES)
+    items = split_items(text)
+    assert len(items) == len(NODES) and "".join(items) == text
+    assert items[2].startswith("- ") and "  - h2\n" in items[2]
+    assert split_items("") == []
+    assert split_items("-\n  a: 1\n- b\n") == ["-\n  a: 1\n", "- b\n"]
+    print("✅ 片段拆分正常")
+
+
+def test_render_matches_full_dump():
+    """冷缓存、热缓存、部分节点变化时，拼接结果都与 SafeYAML().dump 完全一致"""
+    print("🧪 测试片段拼接...")
+    safe = SafeYAML()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "fragments.json")
+        dump = CountingDump(safe)
+        cache = FragmentCache(path, safe.name)
+        assert cache.render(dump, NODES) == safe.dump(NODES)
+        assert (cache.hits, cache.misses) == (0, len(NODES))
+        cache.save()
+
+        cache = FragmentCache(path, safe.name)
+        assert cache.render(dump, NODES) == safe.dump(NODES)
+        assert (cache.hits, cache.misses) == (len(NODES), 0) and dump.calls == [len(NODES)]
+
+        nodes = [dict(NODES[0], port=443)] + NODES[1:] + [dict(NODES[0], name="新加坡01")]
+        assert cache.render(dump, nodes) == safe.dump(nodes)
+        assert (cache.hits, cache.misses) == (3, 2) and dump.calls[-1] == 2
+
+        # 内容相同的节点只序列化一次
+        nodes = [copy.deepcopy(NODES[1]), copy.deepcopy(NODES[1])]
+        assert cache.render(dump, nodes) == safe.dump(nodes)
+    print("✅ 片段拼接正常")
+
+
+def test_prune_and_invalidate():
+    """只保留本次用到的片段；格式版本或序列化实现变化时旧缓存失效"""
+    print("🧪 测试缓存修剪与失效...")
+    safe = SafeYAML()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "fragments.json")
+        cache = FragmentCache(path, safe.name)
+        cache.render(safe.dump, NODES)
+        cache.render(safe.dump, NODES[:2])
+        assert set(cache.fragments) == {node_fingerprint(n) for n in NODES[:2]}
+        cache.save()
+        with open(path, "r", encoding="utf-8") as f:
+            assert len(json.load(f)["fragments"]) == 2
+
+        assert len(FragmentCache(path, safe.name).fragments) == 2
+        assert FragmentCache(path, "other").fragments == {}
+        old_format = fragments.FRAGMENT_FORMAT
+        fragments.FRAGMENT_FORMAT = old_format + 1
+        try:
+            assert FragmentCache(path, safe.name).fragments == {}
+        finally:
+            fragments.FRAGMENT_FORMAT = old_format
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{broken")
+        assert FragmentCache(path, safe.name).fragments == {}
+    print("✅ 缓存修剪与失效正常")
+
+
+def test_split_mismatch_fallback():
+    """拆分数量不一致时不写入缓存并抛出 ValueError，zr 退回完整序列化"""
+    print("🧪 测试拆分不一致回退...")
+    from ruamel.yaml import YAML
+    from zr import serialize_config
+
+    safe = SafeYAML()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "fragments.json")
+        cache = FragmentCache(path, safe.name)
+        try:
+            cache.render(lambda nodes: "- merged\n", NODES)
+            raise AssertionError("拆分数量不一致时应当抛出 ValueError")
+        except ValueError:
+            pass
+        assert cache.fragments == {}
+
+        yaml = YAML()
+        config = {"mode": "rule", "proxies": [dict(n) for n in NODES[:2]]}
+        original = fragments.split_items
+        fragments.split_items = lambda text: []
+        try:
+            text = serialize_config(yaml, config, cache_path=path).decode("utf-8")
+        finally:
+            fragments.split_items = original
+        assert yaml.load(text) == config
+        assert not os.path.exists(path)
+    print("✅ 拆分不一致时回退正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_split_items,
+        test_render_matches_full_dump,
+        test_prune_and_invalidate,
+        test_split_mismatch_fallback
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试 nodes.txt 的读写锁：读者并发、写者独占、同一线程嵌套
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fsutil import FileRWLock, write_atomic
+
+
+def test_readers_share_writers_exclusive():
+    """两个读者可以同时持有锁，写者等待读者释放后才进入"""
+    print("🧪 测试读写互斥...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        lock = FileRWLock(os.path.join(tmp_dir, "nodes.lock"))
+        events = []
+        both_reading = threading.Barrier(2, timeout=2)
+
+        def reader():
+            with lock.read():
+                both_reading.wait()
+                time.sleep(0.1)
+                events.append("read-done")
+
+        def writer():
+            time.sleep(0.05)
+            with lock.write():
+                events.append("write")
+
+        threads = [threading.Thread(target=reader), threading.Thread(target=reader),
+                   threading.Thread(target=writer)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert events == ["read-done", "read-done", "write"]
+    print("✅ 读写互斥正常")
+
+
+def test_nested_and_concurrent_writes():
+    """持有写锁时可以再取读锁；并发的读-改-写不会丢失修改"""
+    print("🧪 测试并发写入...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        lock = FileRWLock(os.path.join(tmp_dir, "nodes.lock"))
+        path = os.path.join(tmp_dir, "nodes.txt")
+        write_atomic(path, "")
+
+        def append(line):
+            with lock.write():
+                with lock.read():
+                    with open(path, "r", encoding="utf-8") as f:
+                        content = f.read()
+                write_atomic(path, content + line + "\n")
+
+        threads = [threading.Thread(target=append, args=(f"node-{i}",)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with open(path, "r", encoding="utf-8") as f:
+            assert sorted(f.read().split()) == sorted(f"node-{i}" for i in range(20))
+
+        try:
+            with lock.read():
+                with lock.write():
+                    pass
+            raise AssertionError("读锁升级为写锁应当失败")
+        except RuntimeError:
+            pass
+    print("✅ 并发写入正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_readers_share_writers_exclusive,
+        test_nested_and_concurrent_writes
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试节点精简：必填字段即使为空也保留，只省略空值和与默认值相同的字段
+"""
+
+import os
+import sys
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jx import compact_node, compact_nodes, DEFAULT_VALUES
+
+
+def test_required_keys_survive():
+    """各协议的必填字段为空或为 0 时仍然保留"""
+    print("🧪 测试必填字段...")
+    ss = {"name": "SS", "type": "ss", "server": "1.2.3.4", "port": 8388, "cipher": "", "password": ""}
+    assert compact_node(ss) == ss
+
+    vmess_tcp = {"name": "VMess-TCP", "type": "vmess", "server": "v.example.com", "port": 443,
+                 "uuid": "12345678-1234-1234-1234-123456789012", "alterId": 0, "cipher": "auto",
+                 "tls": False, "network": "tcp", "ws-opts": {}}
+    assert compact_node(vmess_tcp) == {"name": "VMess-TCP", "type": "vmess", "server": "v.example.com", "port": 443,
+                                       "uuid": "12345678-1234-1234-1234-123456789012", "alterId": 0, "cipher": "auto"}
+
+    trojan = {"name": "Trojan", "type": "trojan", "server": "t.example.com", "port": 443, "password": "",
+              "sni": "", "alpn": [], "skip-cert-verify": False}
+    assert compact_node(trojan) == {"name": "Trojan", "type": "trojan", "server": "t.example.com", "port": 443,
+                                    "password": ""}
+
+    ssr = {"name": "SSR", "type": "ssr", "server": "1.2.3.4", "port": 8388, "cipher": "aes-256-cfb",
+           "password": "pw", "protocol": "", "protocol-param": "", "obfs": "", "obfs-param": ""}
+    assert compact_node(ssr) == {"name": "SSR", "type": "ssr", "server": "1.2.3.4", "port": 8388,
+                                 "cipher": "aes-256-cfb", "password": "pw", "protocol": "", "obfs": ""}
+
+    snell = {"name": "Snell", "type": "snell", "server": "s.example.com", "port": 443, "psk": "", "version": 1}
+    assert compact_node(snell) == snell
+    print("✅ 必填字段保留正常")
+
+
+def test_only_listed_defaults_dropped():
+    """嵌套结构清理后为空时整体省略；只有列出的默认值被省略，类型不同的值保留"""
+    print("🧪 测试默认值省略...")
+    vmess_ws = {"name": "VMess-WS", "type": "vmess", "server": "v.example.com", "port": 443,
+                "uuid": "12345678-1234-1234-1234-123456789012", "alterId": 0, "cipher": "auto",
+                "tls": True, "network": "ws", "ws-opts": {"path": "/ws", "headers": {"Host": ""}}}
+    compact = compact_node(vmess_ws)
+    assert compact["tls"] is True and compact["network"] == "ws"
+    assert compact["ws-opts"] == {"path": "/ws"}
+    assert "ws-opts" not in compact_node(dict(vmess_ws, **{"ws-opts": {"path": "", "headers": {"Host": ""}}}))
+
+    vless = {"name": "VLESS", "type": "vless", "server": "l.example.com", "port": 443,
+             "uuid": "12345678-1234-1234-1234-123456789012", "encryption": "none", "flow": None, "tls": True}
+    assert compact_node(vless) == {"name": "VLESS", "type": "vless", "server": "l.example.com", "port": 443,
+                                   "uuid": "12345678-1234-1234-1234-123456789012", "tls": True}
+    flow = dict(vless, flow="xtls-rprx-vision", encryption="aes-128-gcm")
+    assert compact_node(flow)["flow"] == "xtls-rprx-vision" and compact_node(flow)["encryption"] == "aes-128-gcm"
+
+    # udp: 0 与默认值 False 相等但类型不同，不省略；未列出的字段值为 False/0 时也保留
+    kept = compact_node({"name": "X", "type": "ss", "udp": 0, "tfo": True, "smux": False, "up": 0})
+    assert kept == {"name": "X", "type": "ss", "udp": 0, "tfo": True, "smux": False, "up": 0}
+    dropped = compact_node(dict({"name": "X", "type": "ss"}, **DEFAULT_VALUES))
+    assert dropped == {"name": "X", "type": "ss"}
+    assert compact_nodes([{"name": "A", "type": "ss", "udp": False}]) == [{"name": "A", "type": "ss"}]
+    print("✅ 默认值省略正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_required_keys_survive,
+        test_only_listed_defaults_dropped
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
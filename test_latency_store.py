@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试测速历史：EWMA、丢包率、环形缓冲、TTL、持久化、延迟写盘与按延迟排序
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import latency_store
+from latency_store import LatencyStore, fingerprint, order_by_latency
+
+
+def test_record_and_summary():
+    """EWMA 平滑延迟，失败计入丢包率，样本数不超过上限"""
+    print("🧪 测试测速记录...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = LatencyStore(os.path.join(tmp_dir, "latency.json"))
+        assert store.get("a.example.com", 443) is None
+        store.record("a.example.com", 443, 100)
+        store.record("a.example.com", "443", 200)
+        summary = store.get("a.example.com", 443)
+        assert summary["latency"] == 130 and summary["last"] == 200 and summary["loss"] == 0
+
+        summary = store.record("a.example.com", 443, None, error="TCP 连接超时")
+        assert summary["latency"] == 130 and summary["last"] is None
+        assert summary["loss"] == 0.33 and summary["error"] == "TCP 连接超时"
+        assert store.latency_of({"server": "a.example.com", "port": 443}) is None
+
+        for _ in range(latency_store.HISTORY_SIZE + 5):
+            store.record("a.example.com", 443, 50)
+        summary = store.get("a.example.com", 443)
+        assert summary["samples"] == latency_store.HISTORY_SIZE and summary["loss"] == 0
+        assert fingerprint("a.example.com", 443) == fingerprint("a.example.com", "443")
+    print("✅ 测速记录正常")
+
+
+def test_ttl_and_persistence():
+    """TTL 内的结果视为新鲜；保存后重新加载不丢失，过期很久的记录被清除"""
+    print("🧪 测试 TTL 与持久化...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "latency.json")
+        store = LatencyStore(path, ttl=60)
+        now = time.time()
+        store.record("fresh.example.com", 443, 80, at=now)
+        store.record("stale.example.com", 443, 90, at=now - 120)
+        store.record("old.example.com", 443, 90, at=now - latency_store.RETENTION - 1)
+        assert store.fresh("fresh.example.com", 443)["last"] == 80
+        assert store.fresh("stale.example.com", 443) is None
+
+        assert store.save()
+        assert not store.save()  # 没有新数据时不写盘
+        loaded = LatencyStore(path, ttl=60)
+        assert loaded.get("fresh.example.com", 443)["latency"] == 80
+        assert loaded.get("stale.example.com", 443)["latency"] == 90
+        assert loaded.get("old.example.com", 443) is None
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{broken")
+        assert LatencyStore(path).entries == {}
+    print("✅ TTL 与持久化正常")
+
+
+def test_deferred_flush():
+    """节流跳过的测速结果在 SAVE_INTERVAL 后由定时器写盘；flush 立即写入，写盘失败时保留未保存标记"""
+    print("🧪 测试延迟写盘...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "latency.json")
+        old_interval = latency_store.SAVE_INTERVAL
+        latency_store.SAVE_INTERVAL = 0.2
+        try:
+            store = LatencyStore(path)
+            store.record("a.example.com", 443, 100)
+            assert store.save()
+            store.record("b.example.com", 443, 200)
+            assert not store.save()  # 距上次写盘太近，被节流
+            time.sleep(0.5)
+            assert LatencyStore(path).get("b.example.com", 443)["latency"] == 200
+
+            store.record("c.example.com", 443, 300)
+            store.flush()
+            assert LatencyStore(path).get("c.example.com", 443)["latency"] == 300
+
+            blocker = os.path.join(tmp_dir, "blocker")
+            open(blocker, "w").close()
+            store.path = os.path.join(blocker, "latency.json")  # 父目录是普通文件，写盘失败
+            store.record("d.example.com", 443, 400)
+            store.flush()
+            store.path = path
+            assert store.save(force=True)
+            assert LatencyStore(path).get("d.example.com", 443)["latency"] == 400
+        finally:
+            latency_store.SAVE_INTERVAL = old_interval
+    print("✅ 延迟写盘正常")
+
+
+def test_order_by_latency():
+    """延迟低的节点排在前面，没有数据或不可用的节点保持原顺序排在最后"""
+    print("🧪 测试按延迟排序...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = LatencyStore(os.path.join(tmp_dir, "latency.json"))
+        proxies = [{"name": name, "server": f"{name}.example.com", "port": 443}
+                   for name in ("a", "b", "c", "d", "e")]
+        store.record("b.example.com", 443, 300)
+        store.record("c.example.com", 443, None)
+        store.record("d.example.com", 443, 50)
+        assert order_by_latency(proxies, store) == ["d", "b", "a", "c", "e"]
+    print("✅ 按延迟排序正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_record_and_summary,
+        test_ttl_and_persistence,
+        test_deferred_flush,
+        test_order_by_latency
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
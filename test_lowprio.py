@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试低优先级同步：等待负载回落、临时恢复原优先级
+"""
+
+import os
+import sys
+import time
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lowprio
+import proc_inspect
+from lowprio import wait_for_load, normal_priority, lower_priority, get_nice, get_ioprio
+
+
+class FakeLoad:
+    """按顺序返回给定的负载值，用完后重复最后一个"""
+
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.values[min(self.calls, len(self.values)) - 1]
+
+
+def with_load(fake, func):
+    original = lowprio.read_loadavg
+    lowprio.read_loadavg = fake
+    try:
+        return func()
+    finally:
+        lowprio.read_loadavg = original
+
+
+def test_wait_for_load():
+    """阈值为 0 时不等待；负载回落后立即返回；一直过高时等到最长时间为止"""
+    print("🧪 测试等待负载回落...")
+    fake = FakeLoad(9.0)
+    assert with_load(fake, lambda: wait_for_load(0, 10, 0.01)) == 0.0 and fake.calls == 0
+
+    fake = FakeLoad(3.0, 2.5, 1.9)
+    waited = with_load(fake, lambda: wait_for_load(2.0, 10, 0.05))
+    assert fake.calls == 3 and 0.09 <= waited < 1.0, waited
+
+    fake = FakeLoad(1.0)
+    assert with_load(fake, lambda: wait_for_load(2.0, 10, 0.05)) < 0.05 and fake.calls == 1
+
+    fake = FakeLoad(5.0)
+    started = time.monotonic()
+    waited = with_load(fake, lambda: wait_for_load(2.0, 0.2, 0.05))
+    assert 0.2 <= waited < 1.0 and time.monotonic() - started < 1.0, waited
+    assert fake.calls >= 4
+    print("✅ 等待负载回落正常")
+
+
+def test_read_loadavg_failure():
+    """读取 /proc/loadavg 失败时视为负载为 0，不阻塞同步"""
+    print("🧪 测试负载读取失败...")
+    original = proc_inspect.read_loadavg
+
+    def broken():
+        raise OSError("no /proc")
+
+    proc_inspect.read_loadavg = broken
+    try:
+        assert lowprio.read_loadavg() == 0.0
+        assert wait_for_load(1.0, 10, 0.05) < 0.05
+    finally:
+        proc_inspect.read_loadavg = original
+    print("✅ 负载读取失败时不等待")
+
+
+def test_normal_priority_round_trip():
+    """降低优先级后，normal_priority 内恢复原值，退出后重新降低；未降低时什么都不做"""
+    print("🧪 测试临时恢复优先级...")
+    current = {"nice": get_nice(), "ioprio": get_ioprio()}
+    with normal_priority(None):
+        assert get_nice() == current["nice"]
+    with normal_priority(dict(current)):
+        assert get_nice() == current["nice"] and get_ioprio() == current["ioprio"]
+
+    if os.geteuid() != 0 or current["nice"] >= 19:
+        # 非 root 无法把 nice 值调回去，测试进程会一直保持低优先级
+        print("⚠️ 无法恢复进程优先级，跳过优先级往返测试")
+        return
+    previous = lower_priority(current["nice"] + 5)
+    try:
+        lowered = {"nice": get_nice(), "ioprio": get_ioprio()}
+        if lowered == previous:
+            print("⚠️ 未能降低进程优先级，跳过优先级往返测试")
+            return
+        assert lowered["nice"] == current["nice"] + 5
+        with normal_priority(previous):
+            assert get_nice() == previous["nice"]
+            assert previous["ioprio"] < 0 or get_ioprio() == previous["ioprio"]
+        assert get_nice() == lowered["nice"] and get_ioprio() == lowered["ioprio"]
+    finally:
+        lowprio.set_nice(current["nice"])
+        if current["ioprio"] >= 0:
+            lowprio.set_ioprio(current["ioprio"])
+    print("✅ 临时恢复优先级正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_wait_for_load,
+        test_read_loadavg_failure,
+        test_normal_priority_round_trip
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试节点结构校验与隔离
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from node_check import validate_node, validate_nodes, cipher_warning, quarantine
+
+GOOD_SS = {"name": "HK-1", "type": "ss", "server": "1.2.3.4", "port": 8388, "cipher": "aes-256-gcm", "password": "pw"}
+GOOD_VLESS = {"name": "US-1", "type": "vless", "server": "us.example.com", "port": 443,
+              "uuid": "12345678-1234-1234-1234-123456789012"}
+
+
+def test_valid_nodes_pass():
+    """合法节点没有问题"""
+    print("🧪 测试合法节点...")
+    assert validate_node(GOOD_SS) == []
+    assert validate_node(GOOD_VLESS) == []
+    print("✅ 合法节点校验通过")
+
+
+def test_invalid_fields_rejected():
+    """端口、UUID、加密方式、必填字段错误都会被发现"""
+    print("🧪 测试非法字段...")
+    assert validate_node(dict(GOOD_SS, port=70000))
+    assert validate_node(dict(GOOD_SS, port="443"))
+    assert validate_node(dict(GOOD_SS, cipher=123))
+    assert validate_node(dict(GOOD_SS, password=""))
+    assert validate_node(dict(GOOD_VLESS, uuid="1234567890"))
+    assert validate_node(dict(GOOD_VLESS, server="bad host"))
+    assert validate_node(dict(GOOD_VLESS, type="wireguard"))
+    print("✅ 非法字段均被拒绝")
+
+
+def test_unknown_cipher_warns():
+    """内核支持的新加密方式不被拒绝；未知加密方式只给出警告，由内核最终校验"""
+    print("🧪 测试加密方式...")
+    for cipher in ("chacha20-poly1305", "xchacha20-poly1305", "AES-128-CCM", "2022-blake3-aes-256-gcm"):
+        node = dict(GOOD_SS, cipher=cipher)
+        assert validate_node(node) == [] and cipher_warning(node) is None, cipher
+    unknown = dict(GOOD_SS, cipher="aes-999-gcm")
+    assert validate_node(unknown) == []
+    assert "aes-999-gcm" in cipher_warning(unknown)
+    assert validate_nodes([unknown]) == ([unknown], [])
+    assert cipher_warning(GOOD_VLESS) is None
+    print("✅ 加密方式校验正常")
+
+
+def test_duplicate_names_and_quarantine():
+    """重名节点只保留第一个，被拒绝的节点写入隔离文件"""
+    print("🧪 测试重名与隔离文件...")
+    valid, rejected = validate_nodes([GOOD_SS, dict(GOOD_SS, server="5.6.7.8"), dict(GOOD_VLESS, port=0)])
+    assert valid == [GOOD_SS]
+    assert len(rejected) == 2
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "quarantine.json")
+        quarantine(rejected, path)
+        with open(path, "r", encoding="utf-8") as f:
+            assert json.load(f)["count"] == 2
+        quarantine([], path)
+        assert not os.path.exists(path)
+    print("✅ 重名与隔离正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_valid_nodes_pass,
+        test_invalid_fields_rejected,
+        test_unknown_cipher_warns,
+        test_duplicate_names_and_quarantine
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
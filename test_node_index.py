@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试面板节点索引：行号、稳定 ID 与失效刷新
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from node_index import NodeIndex, apply_edits
+
+CONTENT = """# 注释
+trojan://pw@hk.example.com:443#香港01
+
+trojan://pw@jp.example.com:443#日本01
+trojan://pw@hk.example.com:443#香港01
+"""
+
+
+def test_positions_and_ids():
+    """位置跳过注释与空行，重复行的 ID 带序号"""
+    print("🧪 测试位置与 ID...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "nodes.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(CONTENT)
+        nodes = NodeIndex(path).list()
+        assert [n["line_no"] for n in nodes] == [1, 3, 4]
+        assert [n["position"] for n in nodes] == [0, 1, 2]
+        assert nodes[0]["id"].endswith("-1-2") and nodes[2]["id"] == nodes[0]["id"][:-4] + "-2-2"
+        assert nodes[1]["server"] == "jp.example.com" and nodes[1]["port"] == 443
+    print("✅ 位置与 ID 正常")
+
+
+def test_refresh_on_external_change():
+    """外部修改文件后重新读取，自身写入后直接更新"""
+    print("🧪 测试索引刷新...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "nodes.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(CONTENT)
+        index = NodeIndex(path)
+        first_id = index.list()[1]["id"]
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("trojan://pw@jp.example.com:443#日本01\n")
+        nodes = index.list()
+        assert len(nodes) == 1 and nodes[0]["id"] == first_id
+
+        text = "trojan://pw@sg.example.com:443#新加坡01\n"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        index.update(text)
+        assert index.list()[0]["name"] == "新加坡01"
+    print("✅ 索引刷新正常")
+
+
+def test_query_filter_sort_page():
+    """按类型、地区、关键字筛选，排序后分页，总数为筛选后的数量"""
+    print("🧪 测试查询...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "nodes.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(CONTENT + "ss://YWVzLTI1Ni1nY206cHdAMS4yLjMuNDo4Mzg4#HK-ss\n")
+        index = NodeIndex(path)
+        assert index.counts() == {"types": {"TROJAN": 3, "SS": 1}, "regions": {"香港": 3, "日本": 1}}
+
+        page, total = index.query(region="香港", sort="name", desc=True, limit=2)
+        assert total == 3 and [n["name"] for n in page] == ["香港01", "香港01"]
+        page, total = index.query(node_type="ss", q="hk")
+        assert total == 1 and page[0]["name"] == "HK-ss"
+        page, total = index.query(offset=3, limit=10)
+        assert total == 4 and len(page) == 1
+
+        latencies = {"日本01": 80, "HK-ss": 30}
+        page, _ = index.query(sort="latency", latency=lambda n: latencies.get(n["name"]))
+        assert [n["name"] for n in page][:2] == ["HK-ss", "日本01"]
+    print("✅ 查询正常")
+
+
+def test_checkout_and_edits():
+    """按 ID 取出节点并一次应用多处修改，失效的 ID 整批拒绝"""
+    print("🧪 测试按 ID 修改...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "nodes.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(CONTENT)
+        index = NodeIndex(path)
+        hk, jp, hk_dup = index.list()
+
+        lines, targets, error = index.checkout([jp["id"], hk_dup["id"]])
+        assert error is None and [n["line_no"] for n in targets] == [3, 4]
+        text = apply_edits(lines, [(targets[0], "trojan://pw@jp.example.com:8443#日本02"), (targets[1], None)])
+        assert text.split("\n")[1:] == ["trojan://pw@hk.example.com:443#香港01", "",
+                                         "trojan://pw@jp.example.com:8443#日本02", ""]
+        index.update(text)
+        assert apply_edits(["a", ""], [], ["b", "c"]) == "a\nb\nc\n"
+
+        _, _, error = index.checkout([jp["id"]])
+        assert error and jp["id"] in error
+        _, _, error = index.checkout([hk["id"], hk_dup["id"]])
+        assert error is not None
+        _, _, error = index.checkout(positions=[5])
+        assert error is not None
+
+        # 两个页面先后删除同一份重复行：第二次请求的 ID 已失效，不会删掉剩下的一份
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(CONTENT)
+        hk = index.list()[0]
+        for _ in range(2):
+            lines, targets, error = index.checkout([hk["id"]])
+            if error:
+                break
+            index.update(apply_edits(lines, [(targets[0], None)]))
+        assert error and hk["id"] in error
+        assert [n["name"] for n in index.list()] == ["日本01", "香港01"]
+    print("✅ 按 ID 修改正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_positions_and_ids,
+        test_refresh_on_external_change,
+        test_query_filter_sort_page,
+        test_checkout_and_edits
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
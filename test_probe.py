@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试节点延迟探测：用本地监听端口代替真实节点
+"""
+
+import os
+import sys
+import ssl
+import socket
+import shutil
+import tempfile
+import threading
+import subprocess
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from probe import run_probes, iter_probes
+
+
+class Listener:
+    """本地 TCP 监听：可选 TLS；silent 时只接受连接不做任何回应"""
+
+    def __init__(self, context=None, silent=False):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(64)
+        self.port = self.sock.getsockname()[1]
+        self.context = context
+        self.silent = silent
+        self.accepted = 0
+        self.connections = []
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            self.connections.append(conn)
+            if self.context is not None and not self.silent:
+                threading.Thread(target=self._handshake, args=(conn,), daemon=True).start()
+
+    def _handshake(self, conn):
+        try:
+            self.context.wrap_socket(conn, server_side=True).recv(1)
+        except (OSError, ssl.SSLError):
+            pass
+
+    def close(self):
+        self.sock.close()
+        for conn in self.connections:
+            conn.close()
+
+
+def closed_port() -> int:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_tcp_probe_and_concurrency():
+    """可连接端口返回延迟，关闭的端口返回错误，额外字段原样带回"""
+    print("🧪 测试 TCP 探测...")
+    listener = Listener()
+    try:
+        targets = [{"id": f"n{i}", "server": "127.0.0.1", "port": listener.port} for i in range(10)]
+        targets.append({"id": "closed", "server": "127.0.0.1", "port": closed_port()})
+        targets.append({"id": "empty", "server": "", "port": 0})
+        results = {r["id"]: r for r in run_probes(targets, timeout=2, concurrency=3)}
+        assert len(results) == 12
+        for i in range(10):
+            assert results[f"n{i}"]["status"] == "success" and results[f"n{i}"]["latency"] is not None
+        assert results["closed"]["latency"] is None and "TCP 连接失败" in results["closed"]["error"]
+        assert results["empty"]["error"] == "缺少服务器地址或端口"
+        assert listener.accepted == 10
+    finally:
+        listener.close()
+    print("✅ TCP 探测正常")
+
+
+def test_bad_hostname_does_not_stop_others():
+    """主机名不合法的节点返回错误，其余节点照常探测"""
+    print("🧪 测试不合法主机名...")
+    listener = Listener()
+    try:
+        targets = [{"id": "long", "server": "a" * 70 + ".com", "port": 443},
+                   {"id": "empty-label", "server": "bad..example.com", "port": 443},
+                   {"id": "ok", "server": "127.0.0.1", "port": listener.port}]
+        results = {r["id"]: r for r in run_probes(targets, timeout=2)}
+        assert len(results) == 3
+        assert results["long"]["latency"] is None and "DNS 解析失败" in results["long"]["error"]
+        assert results["empty-label"]["latency"] is None
+        assert results["ok"]["status"] == "success"
+    finally:
+        listener.close()
+    print("✅ 不合法主机名处理正常")
+
+
+def test_tls_timeout_and_handshake():
+    """TLS 握手无响应时按超时返回；有证书时测量握手耗时"""
+    print("🧪 测试 TLS 探测...")
+    silent = Listener(ssl.create_default_context(ssl.Purpose.CLIENT_AUTH), silent=True)
+    try:
+        result = run_probes([{"server": "127.0.0.1", "port": silent.port}], timeout=0.5, tls=True)[0]
+        assert result["status"] == "timeout" and result["error"] == "TLS 握手超时"
+        assert result["connect_ms"] is not None
+    finally:
+        silent.close()
+
+    if not shutil.which("openssl"):
+        print("⚠️ 未找到 openssl，跳过 TLS 握手耗时测试")
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cert, key = os.path.join(tmp_dir, "cert.pem"), os.path.join(tmp_dir, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=localhost", "-keyout", key, "-out", cert],
+                       check=True, capture_output=True)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        listener = Listener(context)
+        try:
+            result = run_probes([{"server": "127.0.0.1", "port": listener.port}], timeout=2, tls=True)[0]
+            assert result["status"] == "success" and result["tls_ms"] is not None
+        finally:
+            listener.close()
+    print("✅ TLS 探测正常")
+
+
+def test_stream_can_stop_early():
+    """逐个产出结果，提前关闭生成器不会阻塞"""
+    print("🧪 测试流式结果...")
+    listener = Listener()
+    try:
+        targets = [{"id": i, "server": "127.0.0.1", "port": listener.port} for i in range(50)]
+        stream = iter_probes(targets, timeout=2, concurrency=2)
+        first = next(stream)
+        assert first["status"] == "success"
+        stream.close()
+    finally:
+        listener.close()
+    print("✅ 流式结果正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_tcp_probe_and_concurrency,
+        test_bad_hostname_does_not_stop_others,
+        test_tls_timeout_and_handshake,
+        test_stream_can_stop_early
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试 /proc 读取：进程查找、僵尸进程、内存与负载解析
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import proc_inspect
+
+MEMINFO = """MemTotal:         245760 kB
+MemFree:           20480 kB
+MemAvailable:     122880 kB
+Buffers:            4096 kB
+Cached:            65536 kB
+SwapTotal:             0 kB
+SwapFree:              0 kB
+"""
+
+
+def make_proc(tmp_dir):
+    """构造一个最小的 /proc 目录"""
+    processes = {
+        101: (b"bash\0/root/OpenClashManage/jk.sh\0", "101 (bash) S 1"),
+        202: (b"/usr/bin/clash\0-d\0/etc/openclash\0", "202 (clash) S 1"),
+        303: (b"python3\0watcher.py\0", "303 (python3) Z 1"),
+        404: (b"", "404 (kworker/0:1) I 2"),
+    }
+    for pid, (cmdline, stat) in processes.items():
+        os.makedirs(os.path.join(tmp_dir, str(pid)))
+        with open(os.path.join(tmp_dir, str(pid), "cmdline"), "wb") as f:
+            f.write(cmdline)
+        with open(os.path.join(tmp_dir, str(pid), "stat"), "w") as f:
+            f.write(stat)
+    for name, text in (("meminfo", MEMINFO), ("loadavg", "0.52 0.40 0.31 2/87 4567\n"),
+                       ("uptime", "93784.12 180000.00\n")):
+        with open(os.path.join(tmp_dir, name), "w") as f:
+            f.write(text)
+
+
+def test_processes():
+    """按命令行查找进程，僵尸进程视为未运行"""
+    print("🧪 测试进程检查...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        make_proc(tmp_dir)
+        old_dir = proc_inspect.PROC_DIR
+        proc_inspect.PROC_DIR = tmp_dir
+        try:
+            proc_inspect.find_processes.cache_clear()
+            assert proc_inspect.find_processes(("jk.sh", "watcher.py")) == [101, 303]
+            assert proc_inspect.find_processes(("openclash",)) == [202]
+            assert proc_inspect.pid_alive("101")
+            assert not proc_inspect.pid_alive(303)
+            assert not proc_inspect.pid_alive(999)
+            assert not proc_inspect.pid_alive("abc")
+        finally:
+            proc_inspect.PROC_DIR = old_dir
+            proc_inspect.find_processes.cache_clear()
+    print("✅ 进程检查正常")
+
+
+def test_system_numbers():
+    """内存、负载、开机时长解析为数字"""
+    print("🧪 测试系统信息...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        make_proc(tmp_dir)
+        old_dir = proc_inspect.PROC_DIR
+        proc_inspect.PROC_DIR = tmp_dir
+        try:
+            memory = proc_inspect.read_meminfo()
+            assert memory["total"] == 245760 and memory["used"] == 245760 - 122880
+            load = proc_inspect.read_loadavg()
+            assert load["load1"] == 0.52 and load["processes"] == 87
+            assert proc_inspect.read_uptime() == 93784.12
+            disk = proc_inspect.disks((tmp_dir,))[0]
+            assert disk["total"] >= disk["used"] > 0
+        finally:
+            proc_inspect.PROC_DIR = old_dir
+    print("✅ 系统信息正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_processes,
+        test_system_numbers
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
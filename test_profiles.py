@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试多配置档：配置档读取与校验、节点筛选、策略组规则
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from profiles import load_profiles, select_nodes
+from zc import inject_groups
+
+NODES = [
+    {"name": "香港01", "type": "ss"},
+    {"name": "HK-x2", "type": "trojan"},
+    {"name": "台湾01", "type": "vmess"},
+    {"name": "US-01", "type": "trojan"}
+]
+
+
+def write_profiles(tmp_dir, data):
+    path = os.path.join(tmp_dir, "profiles.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return path
+
+
+def test_load_profiles_validation():
+    """文件不存在为单配置模式；名称无效、重复、缺少 config、正则错误都会报错"""
+    print("🧪 测试配置档读取...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        assert load_profiles(os.path.join(tmp_dir, "missing.json")) == []
+
+        good = [{"name": "full", "config": "/etc/openclash/config/full.yaml"},
+                {"name": "game", "config": "/etc/openclash/config/game.yaml", "groups": {"🎮 游戏": "HK|TW"}}]
+        assert [p["name"] for p in load_profiles(write_profiles(tmp_dir, {"profiles": good}))] == ["full", "game"]
+        assert len(load_profiles(write_profiles(tmp_dir, good))) == 2
+
+        bad_cases = [
+            ({"profiles": {"name": "full"}}, "必须是列表"),
+            ([{"name": "bad name", "config": "a.yaml"}], "名称无效"),
+            ([{"name": "a", "config": "a.yaml"}, {"name": "a", "config": "b.yaml"}], "名称重复"),
+            ([{"name": "a"}], "缺少 config"),
+            ([{"name": "a", "config": "a.yaml", "include": "("}], "正则无效"),
+            ([{"name": "a", "config": "a.yaml", "groups": {"g": "[x"}}], "正则无效")
+        ]
+        for data, message in bad_cases:
+            try:
+                load_profiles(write_profiles(tmp_dir, data))
+                raise AssertionError(f"应当拒绝: {data}")
+            except ValueError as e:
+                assert message in str(e), str(e)
+    print("✅ 配置档读取正常")
+
+
+def test_select_nodes():
+    """include / exclude 按名称正则筛选，types 按协议筛选，可组合使用"""
+    print("🧪 测试节点筛选...")
+    names = lambda profile: [n["name"] for n in select_nodes(NODES, profile)]
+    assert names({"name": "all"}) == ["香港01", "HK-x2", "台湾01", "US-01"]
+    assert names({"include": "香港|HK|台湾"}) == ["香港01", "HK-x2", "台湾01"]
+    assert names({"include": "香港|HK|台湾", "exclude": r"x[2-9]"}) == ["香港01", "台湾01"]
+    assert names({"types": ["trojan"]}) == ["HK-x2", "US-01"]
+    assert names({"types": ["trojan"], "exclude": "HK"}) == ["US-01"]
+    print("✅ 节点筛选正常")
+
+
+def test_group_rules():
+    """策略组规则：正则只注入匹配的节点，null 保持不变，未列出的组注入全部节点"""
+    print("🧪 测试策略组规则...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        old_log = os.environ.get("ZC_LOG_PATH")
+        os.environ["ZC_LOG_PATH"] = os.path.join(tmp_dir, "log.txt")
+        try:
+            config = {"proxy-groups": [
+                {"name": "游戏", "type": "select", "proxies": ["DIRECT", "old"]},
+                {"name": "流媒体", "type": "select", "proxies": ["old"]},
+                {"name": "自动", "type": "url-test", "proxies": []}
+            ]}
+            names = ["香港01", "HK-x2", "台湾01", "US-01"]
+            inject_groups(config, names, {"游戏": "香港|台湾", "流媒体": None})
+            groups = {g["name"]: g["proxies"] for g in config["proxy-groups"]}
+            assert groups["游戏"] == ["DIRECT", "香港01", "台湾01"]
+            assert groups["流媒体"] == ["old"]
+            assert groups["自动"] == names
+        finally:
+            if old_log is None:
+                os.environ.pop("ZC_LOG_PATH", None)
+            else:
+                os.environ["ZC_LOG_PATH"] = old_log
+    print("✅ 策略组规则正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_load_profiles_validation,
+        test_select_nodes,
+        test_group_rules
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试同步调度器的加锁与合并逻辑
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scheduler import SyncScheduler
+
+
+def make_scheduler(tmp_dir):
+    return SyncScheduler(os.path.join(tmp_dir, "sync.lock"), os.path.join(tmp_dir, "sync.pending"))
+
+
+def test_single_run():
+    """没有竞争时直接执行一次"""
+    print("🧪 测试单次执行...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        runs = []
+        result = make_scheduler(tmp_dir).run(lambda: runs.append(1) or 0)
+        assert result == 0
+        assert len(runs) == 1
+        assert not os.path.exists(os.path.join(tmp_dir, "sync.pending"))
+    print("✅ 单次执行正常")
+
+
+def test_burst_coalesced_into_one_follow_up():
+    """执行期间的多次触发只补跑一次"""
+    print("🧪 测试触发合并...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        runs = []
+        results = []
+
+        def trigger():
+            results.append(make_scheduler(tmp_dir).run(job))
+
+        def job():
+            runs.append(1)
+            if len(runs) == 1:
+                # 第一次执行期间连续触发 5 次
+                threads = [threading.Thread(target=trigger) for _ in range(5)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+            return 0
+
+        assert make_scheduler(tmp_dir).run(job) == 0
+        assert len(runs) == 2, f"期望执行 2 次，实际 {len(runs)} 次"
+        assert results == [None] * 5
+    print("✅ 触发合并正常")
+
+
+def test_lock_released_after_failure():
+    """任务抛出异常后锁被释放，下次可以正常执行"""
+    print("🧪 测试异常后释放锁...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scheduler = make_scheduler(tmp_dir)
+
+        def broken_job():
+            raise RuntimeError("boom")
+
+        try:
+            scheduler.run(broken_job)
+        except RuntimeError:
+            pass
+        with scheduler.locked() as acquired:
+            assert acquired
+        assert scheduler.run(lambda: 0) == 0
+    print("✅ 异常后锁已释放")
+
+
+def test_locked_defers_triggers():
+    """独占锁期间的触发只登记标记，释放后由调用方补跑一次"""
+    print("🧪 测试独占锁...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scheduler = make_scheduler(tmp_dir)
+        runs = []
+        with scheduler.locked() as acquired:
+            assert acquired
+            with make_scheduler(tmp_dir).locked() as again:
+                assert not again
+            assert make_scheduler(tmp_dir).run(lambda: runs.append(1) or 0) is None
+        assert runs == [] and scheduler.has_pending()
+        assert scheduler.run(lambda: runs.append(1) or 0) == 0
+        assert runs == [1] and not scheduler.has_pending()
+    print("✅ 独占锁正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_single_run,
+        test_burst_coalesced_into_one_follow_up,
+        test_lock_released_after_failure,
+        test_locked_defers_triggers
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试配置快照库：去重、预算淘汰与恢复
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from snapshots import SnapshotStore
+
+
+def test_dedup_same_content():
+    """相同内容只保存一个对象"""
+    print("🧪 测试快照去重...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config.yaml")
+        store = SnapshotStore(os.path.join(tmp_dir, "snapshots"))
+        store.add(b"proxies: []\n", config_path)
+        store.add(b"proxies: []\n", config_path)
+        assert len(store.list()) == 1
+        assert len(os.listdir(store.objects_dir)) == 1
+    print("✅ 快照去重正常")
+
+
+def test_ensure_skips_unchanged_file():
+    """配置文件未变化时 ensure 不会新增记录"""
+    print("🧪 测试 ensure 跳过未变化的文件...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config.yaml")
+        with open(config_path, "wb") as f:
+            f.write(b"mode: rule\n")
+        store = SnapshotStore(os.path.join(tmp_dir, "snapshots"))
+        first = store.ensure(config_path)
+        second = store.ensure(config_path)
+        assert first["digest"] == second["digest"]
+        assert first["created"] == second["created"]
+        assert len(store.list()) == 1
+    print("✅ ensure 行为正常")
+
+
+def test_budget_eviction():
+    """超出预算时淘汰最旧的快照"""
+    print("🧪 测试预算淘汰...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config.yaml")
+        store = SnapshotStore(os.path.join(tmp_dir, "snapshots"), budget=1)
+        for i in range(5):
+            store.add(os.urandom(256) + str(i).encode(), config_path)
+        entries = store.list()
+        assert len(entries) == 2
+        assert len(os.listdir(store.objects_dir)) == 2
+    print("✅ 预算淘汰正常")
+
+
+def test_restore_roundtrip():
+    """恢复快照后文件内容与快照一致"""
+    print("🧪 测试快照恢复...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config.yaml")
+        store = SnapshotStore(os.path.join(tmp_dir, "snapshots"))
+        old = store.add("mode: rule\nproxies: []\n".encode(), config_path)
+        with open(config_path, "wb") as f:
+            f.write(b"mode: global\n")
+        store.restore(old["id"])
+        with open(config_path, "rb") as f:
+            assert f.read() == b"mode: rule\nproxies: []\n"
+        # 恢复前的内容也被保存
+        assert any(store.read(e) == b"mode: global\n" for e in store.list())
+    print("✅ 快照恢复正常")
+
+
+def test_get_requires_unique_match():
+    """编号必须完整或前缀唯一；相同内容属于多个配置文件时需指定路径"""
+    print("🧪 测试快照查找...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = SnapshotStore(os.path.join(tmp_dir, "snapshots"))
+        config_path = os.path.join(tmp_dir, "config.yaml")
+        entries = [store.add(f"mode: rule\n# {i}\n".encode(), config_path) for i in range(20)]
+        first = {}
+        for entry in entries:
+            first.setdefault(entry["id"][0], []).append(entry)
+        shared = next(group for group in first.values() if len(group) > 1)
+        try:
+            store.get(shared[0]["id"][0])
+            raise AssertionError("不唯一的前缀应当被拒绝")
+        except ValueError:
+            pass
+        for entry in entries:
+            assert store.get(entry["id"])["digest"] == entry["digest"]
+            assert store.get(entry["digest"][:16])["digest"] == entry["digest"]
+        assert store.get("") is None and store.get("zz") is None
+
+        other_path = os.path.join(tmp_dir, "game.yaml")
+        store.add(b"mode: rule\n# 0\n", other_path)
+        try:
+            store.get(entries[0]["id"])
+            raise AssertionError("属于多个配置文件的快照应当要求指定路径")
+        except ValueError:
+            pass
+        assert store.get(entries[0]["id"], other_path)["path"] == other_path
+    print("✅ 快照查找正常")
+
+
+def test_install_survives_snapshot_failure():
+    """快照库写入失败时新配置照常安装，返回回滚用的备份"""
+    print("🧪 测试快照失败不影响安装...")
+    from zr import install_config
+    from sync_stats import SyncTimer
+
+    class BrokenStore(SnapshotStore):
+        def ensure(self, *args, **kwargs):
+            raise OSError(28, "No space left on device")
+
+        def add(self, *args, **kwargs):
+            raise ValueError("index.json 损坏")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, "config.yaml")
+        staged_path = config_path + ".staged"
+        with open(config_path, "wb") as f:
+            f.write(b"mode: rule\n")
+        with open(staged_path, "wb") as f:
+            f.write(b"mode: global\n")
+        backup = install_config(config_path, staged_path, b"mode: global\n", "测试",
+                                BrokenStore(os.path.join(tmp_dir, "snapshots")), SyncTimer("test"))
+        with open(config_path, "rb") as f:
+            assert f.read() == b"mode: global\n"
+        with open(backup, "rb") as f:
+            assert f.read() == b"mode: rule\n"
+    print("✅ 快照失败不影响安装")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_dedup_same_content,
+        test_ensure_skips_unchanged_file,
+        test_budget_eviction,
+        test_restore_roundtrip,
+        test_get_requires_unique_match,
+        test_install_survives_snapshot_failure
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试同步计划：节点增删改、策略组成员变化、引用校验与是否需要重启
+"""
+
+import os
+import sys
+import copy
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sync_plan import capture_state, check_references, diff_config, format_plan
+
+CONFIG = {
+    "proxies": [
+        {"name": "HK-1", "type": "ss", "server": "1.1.1.1", "port": 8388, "cipher": "aes-256-gcm", "password": "a"},
+        {"name": "JP-1", "type": "ss", "server": "2.2.2.2", "port": 8388, "cipher": "aes-256-gcm", "password": "b"},
+        {"name": "US-1", "type": "ss", "server": "3.3.3.3", "port": 8388, "cipher": "aes-256-gcm", "password": "c"}
+    ],
+    "proxy-groups": [
+        {"name": "Proxy", "type": "select", "proxies": ["Auto", "HK-1", "JP-1", "US-1", "DIRECT"]},
+        {"name": "Auto", "type": "url-test", "proxies": ["HK-1", "JP-1", "US-1"]}
+    ]
+}
+
+
+def test_proxy_and_group_changes():
+    """新增、删除、变更节点分别统计，策略组区分成员增减与仅顺序变化"""
+    print("🧪 测试配置差异...")
+    config = copy.deepcopy(CONFIG)
+    before = capture_state(config)
+    config["proxies"][0]["port"] = 443
+    del config["proxies"][2]
+    config["proxies"].append({"name": "SG-1", "type": "ss", "server": "4.4.4.4", "port": 8388,
+                              "cipher": "aes-256-gcm", "password": "d"})
+    config["proxy-groups"][0]["proxies"] = ["Auto", "HK-1", "JP-1", "SG-1", "DIRECT"]
+    config["proxy-groups"][1]["proxies"] = ["JP-1", "HK-1", "US-1"]
+    plan = diff_config(before, capture_state(config), 2048)
+
+    proxies = plan["proxies"]
+    assert (proxies["added"], proxies["removed"], proxies["changed"], proxies["unchanged"]) == (1, 1, 1, 1)
+    assert proxies["added_names"] == ["SG-1"] and proxies["removed_names"] == ["US-1"]
+    assert proxies["changed_names"] == ["HK-1"] and proxies["total"] == 3
+    groups = {g["name"]: g for g in plan["groups"]}
+    assert groups["Proxy"]["added"] == 1 and groups["Proxy"]["removed"] == 1 and not groups["Proxy"]["reordered"]
+    assert groups["Auto"]["reordered"] and groups["Auto"]["added"] == groups["Auto"]["removed"] == 0
+    assert plan["restart_needed"] and plan["estimated_size"] > 0
+
+    text = format_plan(plan)
+    assert "+ SG-1" in text and "- US-1" in text and "~ HK-1" in text
+    assert "Auto: 仅顺序变化" in text and "需要重启: 是" in text
+    print("✅ 配置差异正常")
+
+
+def test_no_changes_no_restart():
+    """注入结果与原配置相同时不需要重启"""
+    print("🧪 测试无变化...")
+    state = capture_state(copy.deepcopy(CONFIG))
+    plan = diff_config(state, capture_state(copy.deepcopy(CONFIG)), 1000)
+    assert plan["groups"] == [] and not plan["restart_needed"]
+    assert plan["proxies"]["unchanged"] == 3 and plan["estimated_size"] == 1000
+    text = format_plan(plan)
+    assert "策略组变化: 无" in text and "需要重启: 否" in text
+    print("✅ 无变化时不重启")
+
+
+def test_missing_references():
+    """策略组引用不存在的成员、节点重名都会被报告，内置策略和其他策略组不算缺失"""
+    print("🧪 测试引用校验...")
+    assert check_references(copy.deepcopy(CONFIG)) == []
+
+    config = copy.deepcopy(CONFIG)
+    config["proxy-groups"][1]["proxies"].append("KR-1")
+    config["proxies"].append(dict(config["proxies"][0]))
+    problems = check_references(config)
+    assert len(problems) == 2
+    assert "存在重名或缺少名称的节点" in problems
+    assert any("Auto" in p and "KR-1" in p for p in problems)
+
+    plan = diff_config(capture_state(CONFIG), capture_state(config))
+    plan["problems"] = problems
+    assert "⚠️ 策略组 Auto 引用了不存在的成员: KR-1" in format_plan(plan)
+    print("✅ 引用校验正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_proxy_and_group_changes,
+        test_no_changes_no_restart,
+        test_missing_references
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试节点文件监控：防抖与最长推迟时间、事件过滤、读取出错不退出、PID 文件
+"""
+
+import os
+import sys
+import errno
+import tempfile
+import subprocess
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import watcher
+from watcher import Debouncer, NodeWatcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeInotify:
+    """按脚本返回事件：每一步先把时钟推进若干秒，再返回该步的事件；脚本结束后停止监控"""
+
+    def __init__(self, clock, node_watcher, script):
+        self.clock = clock
+        self.node_watcher = node_watcher
+        self.script = list(script)
+        self.timeouts = []
+
+    def __call__(self):
+        return self
+
+    def add_watch(self, path, mask):
+        return 1
+
+    def read_events(self, timeout=None):
+        self.timeouts.append(timeout)
+        if not self.script:
+            self.node_watcher.running = False
+            return []
+        advance, events = self.script.pop(0)
+        self.clock.now += advance
+        return events
+
+    def close(self):
+        pass
+
+
+def write_event(name="nodes.txt"):
+    return (1, watcher.IN_CLOSE_WRITE, 0, name)
+
+
+def run_watch(script, debounce=2, max_delay=5):
+    """用假的时钟和 inotify 运行 watch，返回 (同步时刻列表, 每次等待的超时)"""
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        node_watcher = NodeWatcher(debounce=debounce, max_delay=max_delay)
+        node_watcher.log = lambda msg: None
+        syncs = []
+        node_watcher.maybe_sync = lambda: syncs.append(clock.now)
+        fake = FakeInotify(clock, node_watcher, script)
+        originals = (watcher.Inotify, watcher.time, watcher.LOG_FILE)
+        watcher.Inotify, watcher.time = fake, clock
+        watcher.LOG_FILE = os.path.join(tmp_dir, "log.txt")
+        try:
+            node_watcher.watch()
+        finally:
+            watcher.Inotify, watcher.time, watcher.LOG_FILE = originals
+    return syncs, fake.timeouts
+
+
+def test_debouncer():
+    """静默 debounce 秒后到期；持续写入时最晚在首个事件后 max_delay 秒到期；到期后重置"""
+    print("🧪 测试防抖计时...")
+    debouncer = Debouncer(2, 5)
+    assert debouncer.timeout(0) is None and not debouncer.due(100)
+    debouncer.event(1)
+    assert debouncer.timeout(1) == 2 and not debouncer.due(2.9)
+    debouncer.event(2.5)
+    assert debouncer.deadline == 4.5
+    debouncer.event(4)
+    debouncer.event(5.5)
+    assert debouncer.deadline == 6 and debouncer.timeout(5.5) == 0.5
+    assert debouncer.timeout(7) == 0.0
+    assert debouncer.due(6) and debouncer.deadline is None and debouncer.first_event is None
+
+    # 最长推迟时间小于防抖窗口时按防抖窗口计算
+    debouncer = Debouncer(3, 1)
+    debouncer.event(0)
+    assert debouncer.deadline == 3
+    print("✅ 防抖计时正常")
+
+
+def test_watch_debounce_and_max_delay():
+    """连续写入合并为一次同步，不超过最长推迟时间；其他文件的事件被忽略，队列溢出也会触发"""
+    print("🧪 测试监控循环...")
+    script = [
+        (1, [write_event()]),                  # t=1，到期 3
+        (1.5, [write_event()]),                # t=2.5，顺延到 4.5
+        (1.5, [write_event()]),                # t=4，顺延到 6（首个事件 + 5）
+        (1.5, [write_event()]),                # t=5.5，不能超过 6
+        (0.5, []),                             # t=6，到期同步
+        (1, [write_event("other.txt")]),       # 其他文件不触发
+        (1, [(-1, watcher.IN_Q_OVERFLOW, 0, "")]),  # t=8，队列溢出视为变化
+        (2, [])                                # t=10，到期同步
+    ]
+    syncs, timeouts = run_watch(script)
+    assert syncs == [0, 6, 10], syncs
+    assert timeouts == [None, 2, 2, 2, 0.5, None, None, 2, None], timeouts
+
+    try:
+        run_watch([(1, [(1, watcher.IN_DELETE_SELF, 0, "")])])
+        raise AssertionError("监控目录被删除时应当抛出 OSError")
+    except OSError as e:
+        assert e.errno == errno.ENOENT
+    print("✅ 监控循环正常")
+
+
+def test_content_changed_errors():
+    """读取节点文件出错时只跳过本次检查，不结束监控"""
+    print("🧪 测试检查出错...")
+    node_watcher = NodeWatcher()
+    logs = []
+    node_watcher.log = logs.append
+
+    class BrokenDetector:
+        def __init__(self, error):
+            self.error = error
+
+        def check(self):
+            raise self.error
+
+    for error in (FileNotFoundError(errno.ENOENT, "missing"), PermissionError(errno.EACCES, "denied"),
+                  OSError(errno.EIO, "Input/output error")):
+        node_watcher.detector = BrokenDetector(error)
+        assert node_watcher.content_changed() is False
+    assert len(logs) == 3 and "Input/output error" in logs[-1]
+    print("✅ 检查出错时继续监控")
+
+
+def test_pid_file():
+    """已有存活实例时拒绝启动；PID 已失效或属于自己时接管；只删除自己的 PID 文件"""
+    print("🧪 测试 PID 文件...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        originals = (watcher.PID_FILE, watcher.LOG_FILE)
+        watcher.PID_FILE = os.path.join(tmp_dir, "watchdog.pid")
+        watcher.LOG_FILE = os.path.join(tmp_dir, "log.txt")
+        try:
+            def write_pid(pid):
+                with open(watcher.PID_FILE, "w") as f:
+                    f.write(str(pid))
+
+            def read_pid():
+                with open(watcher.PID_FILE, "r") as f:
+                    return int(f.read())
+
+            assert watcher.claim_pid_file() and read_pid() == os.getpid()
+            assert watcher.claim_pid_file()
+
+            write_pid(os.getppid())
+            assert not watcher.claim_pid_file() and read_pid() == os.getppid()
+            watcher.release_pid_file()
+            assert read_pid() == os.getppid()
+
+            dead = subprocess.Popen([sys.executable, "-c", "pass"])
+            dead.wait()
+            write_pid(dead.pid)
+            assert watcher.claim_pid_file() and read_pid() == os.getpid()
+
+            write_pid("garbage")
+            assert watcher.claim_pid_file() and read_pid() == os.getpid()
+
+            watcher.release_pid_file()
+            assert not os.path.exists(watcher.PID_FILE)
+            watcher.release_pid_file()
+        finally:
+            watcher.PID_FILE, watcher.LOG_FILE = originals
+    print("✅ PID 文件正常")
+
+
+def main():
+    """主测试函数"""
+    tests = [
+        test_debouncer,
+        test_watch_debounce_and_max_delay,
+        test_content_changed_errors,
+        test_pid_file
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__} 失败: {e}")
+
+    print(f"\n📊 测试总结: {passed}/{len(tests)} 通过")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基于 inotify 的节点文件监控守护进程
+替代 jk.sh 的 5 秒轮询：文件写入完成后立即触发，连续保存合并为一次同步
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import signal
+import struct
+import ctypes
+import ctypes.util
+import argparse
+import subprocess
+from log import write_log
+from change_detect import ChangeDetector
+from scheduler import EXIT_MERGED
+
+ROOT_DIR = os.getenv("OPENCLASH_MANAGE_ROOT", "/root/OpenClashManage")
+WATCH_DIR = f"{ROOT_DIR}/wangluo"
+NODES_FILE = f"{WATCH_DIR}/nodes.txt"
+SCRIPT_TO_RUN = f"{ROOT_DIR}/zr.py"
+LOG_FILE = f"{WATCH_DIR}/log.txt"
+PID_FILE = "/tmp/openclash_watchdog.pid"
+# 防抖窗口：最后一次写入后静默多久才开始同步（秒）
+DEBOUNCE = float(os.getenv("OPENCLASH_WATCH_DEBOUNCE", "2"))
+# 持续写入时最多推迟多久（秒）
+MAX_DELAY = float(os.getenv("OPENCLASH_WATCH_MAX_DELAY", "30"))
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """通过 ctypes 调用 libc 的 inotify 接口，不依赖第三方库"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        # musl 等环境下 find_library 可能返回 None，此时使用已加载的符号
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 失败: {os.strerror(err)}")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch 失败: {os.strerror(err)}", path)
+        return wd
+
+    def read_events(self, timeout=None) -> list:
+        """等待事件，返回 [(wd, mask, cookie, name)]，超时返回空列表"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", errors="ignore")
+            offset += length
+            events.append((wd, mask, cookie, name))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class Debouncer:
+    """合并连续事件：最后一次事件后静默 debounce 秒到期，持续有事件时最晚在首个事件后 max_delay 秒到期"""
+
+    def __init__(self, debounce: float, max_delay: float):
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        self.first_event = None
+        self.deadline = None
+
+    def event(self, now: float):
+        if self.first_event is None:
+            self.first_event = now
+        # 每次新事件都顺延，但不超过最大推迟时间
+        self.deadline = min(now + self.debounce, self.first_event + self.max_delay)
+
+    def timeout(self, now: float):
+        """距到期的秒数，没有待处理事件时返回 None（一直等待）"""
+        return None if self.deadline is None else max(0.0, self.deadline - now)
+
+    def due(self, now: float) -> bool:
+        """到期时重置并返回 True"""
+        if self.deadline is None or now < self.deadline:
+            return False
+        self.first_event = None
+        self.deadline = None
+        return True
+
+
+class NodeWatcher:
+    def __init__(self, debounce: float = DEBOUNCE, max_delay: float = MAX_DELAY):
+        self.debounce = debounce
+        self.debouncer = Debouncer(debounce, max_delay)
+        self.detector = ChangeDetector(NODES_FILE)
+        self.running = True
+        self.syncing = False
+
+    def log(self, msg: str):
+        write_log(msg, LOG_FILE)
+
+    def handle_signal(self, signum, frame):
+        self.running = False
+        # 同步进行中时等它结束再退出，避免中断配置写入
+        if not self.syncing:
+            raise SystemExit(0)
+
+    def content_changed(self) -> bool:
+        try:
+            changed, _ = self.detector.check()
+            return changed
+        except FileNotFoundError:
+            self.log(f"⚠️ 文件不存在: {NODES_FILE}")
+            return False
+        except PermissionError:
+            self.log(f"❌ 无法读取: {NODES_FILE}，请检查权限")
+            return False
+        except OSError as e:
+            # 其他读取错误（如 EIO、文件系统暂时不可用）只跳过本次检查，不结束监控
+            self.log(f"❌ 检查节点文件失败: {e}")
+            return False
+
+    def run_sync(self):
+        # 备份与回滚由 zr.py 通过快照库完成，这里不再复制配置文件
+        self.syncing = True
+        try:
+            self.log(f"🚀 开始执行同步脚本: {SCRIPT_TO_RUN}")
+            with open(LOG_FILE, "a", encoding="utf-8") as log_f:
+                # zr.py 自己写日志文件，这里只收集异常输出
+                result = subprocess.run(["python3", SCRIPT_TO_RUN], stdout=subprocess.DEVNULL, stderr=log_f)
+            if result.returncode == 0:
+                self.log("✅ 同步成功，OpenClash 配置文件已更新")
+            elif result.returncode == EXIT_MERGED:
+                self.log("⏳ 已有同步在执行，本次触发已合并，将在其结束后补跑")
+            else:
+                self.log("❌ 同步失败，配置未写入或已由同步脚本回滚，详见上方日志")
+        except Exception as e:
+            self.log(f"❌ 执行同步出错: {e}")
+        finally:
+            self.syncing = False
+
+    def maybe_sync(self):
+        if self.content_changed():
+            self.log("🔄 检测到节点文件变动，准备执行同步")
+            self.run_sync()
+
+    def watch(self):
+        inotify = Inotify()
+        try:
+            inotify.add_watch(WATCH_DIR, WATCH_MASK)
+            self.log(f"🔄 开始监控节点文件变化 (inotify，防抖 {self.debounce:g} 秒)...")
+
+            # 启动时先检查一次，与 jk.sh 行为一致
+            self.maybe_sync()
+
+            debouncer = self.debouncer
+            while self.running:
+                events = inotify.read_events(debouncer.timeout(time.monotonic()))
+
+                for wd, mask, cookie, name in events:
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                        raise OSError(errno.ENOENT, "监控目录已被删除或移动", WATCH_DIR)
+                    if mask & IN_Q_OVERFLOW or name == os.path.basename(NODES_FILE):
+                        debouncer.event(time.monotonic())
+
+                if debouncer.due(time.monotonic()):
+                    self.maybe_sync()
+        finally:
+            inotify.close()
+
+
+def claim_pid_file() -> bool:
+    """沿用 jk.sh 的 PID 文件语义：已有存活实例时退出"""
+    try:
+        with open(PID_FILE, "r") as f:
+            pid = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        pid = 0
+    if pid and pid != os.getpid():
+        try:
+            os.kill(pid, 0)
+            write_log(f"⚠️ 已有守护进程运行中 (PID: {pid})，退出当前实例。", LOG_FILE)
+            return False
+        except OSError:
+            pass
+    with open(PID_FILE, "w") as f:
+        f.write(str(os.getpid()))
+    return True
+
+
+def release_pid_file():
+    try:
+        with open(PID_FILE, "r") as f:
+            if f.read().strip() == str(os.getpid()):
+                os.remove(PID_FILE)
+    except OSError:
+        pass
+
+
+def check_inotify() -> bool:
+    """检查当前系统能否使用 inotify 监控节点目录"""
+    try:
+        inotify = Inotify()
+        try:
+            inotify.add_watch(WATCH_DIR, WATCH_MASK)
+        finally:
+            inotify.close()
+        return True
+    except (OSError, AttributeError):
+        return False
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="OpenClash 节点文件监控 (inotify)")
+    parser.add_argument("--check", action="store_true", help="只检查 inotify 是否可用")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE, help="防抖窗口（秒）")
+    args = parser.parse_args()
+
+    if args.check:
+        return 0 if check_inotify() else 1
+
+    if not claim_pid_file():
+        return 1
+
+    watcher = NodeWatcher(debounce=args.debounce)
+    signal.signal(signal.SIGTERM, watcher.handle_signal)
+    signal.signal(signal.SIGINT, watcher.handle_signal)
+    write_log("✅ OpenClash 节点同步守护已启动 (inotify)...", LOG_FILE)
+    try:
+        watcher.watch()
+        return 0
+    except OSError as e:
+        write_log(f"❌ inotify 监控异常退出: {e}", LOG_FILE)
+        return 1
+    finally:
+        release_pid_file()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
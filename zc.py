@@ -3,7 +3,7 @@ import os
 import re
 from datetime import datetime
 
-def inject_groups(config, node_names: list) -> tuple:
+def inject_groups(config, node_names: list, group_rules: dict = None) -> tuple:
     # 日志路径
     log_path = os.getenv("ZC_LOG_PATH", "/root/OpenClashManage/wangluo/log.txt")
     def write_log(msg):
@@ -58,10 +58,20 @@ def inject_groups(config, node_names: list) -> tuple:
             skipped_groups += 1
             continue
 
+        # 配置档规则：null 表示保持不变，正则表示只注入名称匹配的节点
+        rule = (group_rules or {}).get(group_name, "")
+        if rule is None:
+            write_log(f"⏭️ [zc] 按配置档规则保持策略组不变：{group_name}")
+            skipped_groups += 1
+            continue
+
         # 检查策略组类型，只处理需要代理的策略组
         if group_type in ["select", "url-test", "fallback", "load-balance"]:
             # 过滤掉可能导致循环引用的节点名称
             safe_names = [name for name in valid_names if name != group_name]
+            if rule:
+                pattern = re.compile(rule)
+                safe_names = [name for name in safe_names if pattern.search(name)]
             
             if safe_names:
                 # 保留原有的 REJECT 和 DIRECT，然后添加所有节点
@@ -69,7 +79,8 @@ def inject_groups(config, node_names: list) -> tuple:
                 keep_proxies = [p for p in original_proxies if p in ["REJECT", "DIRECT"]]
                 updated = keep_proxies + safe_names
 
-                added = len([n for n in safe_names if n not in original_proxies])
+                original_set = set(original_proxies)
+                added = len([n for n in safe_names if n not in original_set])
                 group["proxies"] = updated
 
                 injected_total += added
@@ -1,147 +1,428 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import io
 import os
+import sys
+import json
 import time
-import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from ruamel.yaml import YAML
 from jx import parse_nodes
 from zw import inject_proxies
 from zc import inject_groups
+import log
 from log import write_log
+from sync_stats import SyncTimer
+from fsutil import write_staged, link_or_copy
+from env_probe import is_openclash_installed, get_openclash_config_path
+from change_detect import ChangeDetector
+from scheduler import SyncScheduler, EXIT_MERGED
+from snapshots import SnapshotStore
+from fragments import FragmentCache, FRAGMENT_CACHE_FILE
+from profiles import load_profiles, select_nodes, same_file, PROFILE_WORKERS
+from fastyaml import SafeYAML, dump_config, load_config as fast_load_config
+from lowprio import lower_priority, normal_priority, wait_for_load, get_nice
+from node_check import validate_nodes, cipher_warning, quarantine, QUARANTINE_FILE
+from sync_plan import capture_state, diff_config, check_references, format_plan
+from latency_store import LatencyStore, order_by_latency, SYNC_LATENCY_ORDER
 
-lock_file = "/tmp/openclash_update.lock"
-if os.path.exists(lock_file):
-    write_log("⚠️ 已有运行中的更新任务，已退出避免重复执行。")
-    exit(0)
-open(lock_file, "w").close()
+nodes_file = "/root/OpenClashManage/wangluo/nodes.txt"
 
 def verify_config(tmp_path: str) -> bool:
     write_log("🔍 正在验证配置可用性 ...")
     result = os.system(f"/etc/init.d/openclash verify_config {tmp_path} > /dev/null 2>&1")
     return result == 0
 
-try:
+def load_config(yaml: YAML, config_file: str, timer: SyncTimer):
+    with timer.stage("load_config"):
+        return fast_load_config(yaml, config_file)
+
+def serialize_config(yaml: YAML, config, timer: SyncTimer = None, cache_path: str = FRAGMENT_CACHE_FILE) -> bytes:
+    """proxies 段由片段缓存拼接，proxy-groups 用 safe 模式输出，出错时退回完整序列化"""
+    safe = SafeYAML()
+    cache = FragmentCache(cache_path, safe.name)
+    try:
+        text = dump_config(yaml, config, lambda nodes: cache.render(safe.dump, nodes), safe)
+    except Exception as e:
+        write_log(f"⚠️ [zr] 快速序列化失败，改为完整序列化: {e}")
+        buf = io.StringIO()
+        yaml.dump(config, buf)
+        return buf.getvalue().encode("utf-8")
+    if timer is not None:
+        timer.extra["yaml_backend"] = safe.name
+        timer.extra["fragment_hits"] = cache.hits
+        timer.extra["fragment_misses"] = cache.misses
+    try:
+        cache.save()
+    except OSError as e:
+        write_log(f"⚠️ [zr] 保存片段缓存失败: {e}")
+    return text.encode("utf-8")
+
+def prepare_config(config_file: str, timer: SyncTimer):
+    """加载配置并解析节点，返回 (yaml, config, new_proxies)"""
+    # 加载配置与解析节点互不依赖：配置在后台线程加载，主线程同时解析节点
+    write_log("🔍 [zr] 读取OpenClash配置文件，同时开始解析节点...")
+    yaml = YAML()
+    yaml.preserve_quotes = True
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        with timer.stage("load_and_parse"):
+            config_future = pool.submit(load_config, yaml, config_file, timer)
+            with timer.stage("parse"):
+                new_proxies = parse_nodes(nodes_file)
+            # 任一侧的异常都在这里抛出
+            config = config_future.result()
+    existing_nodes_count = len(config.get("proxies") or [])
+    write_log(f"✅ [zr] 当前配置中有 {existing_nodes_count} 个节点")
+    return yaml, config, new_proxies
+
+def check_nodes(new_proxies: list, timer: SyncTimer, persist: bool = True) -> list:
+    """按协议校验节点，问题节点从本次同步中剔除；persist 为 False 时（预览）不写隔离文件"""
+    with timer.stage("validate_nodes"):
+        valid, rejected = validate_nodes(new_proxies)
+        if persist:
+            quarantine(rejected)
+    for item in rejected:
+        write_log(f"⚠️ [zr] 节点已隔离: {item['node'].get('name')} → {'；'.join(item['problems'])}")
+    for node in valid:
+        warning = cipher_warning(node)
+        if warning:
+            write_log(f"⚠️ [zr] 节点 {node.get('name')}: {warning}，仍交给内核校验")
+    if rejected and persist:
+        write_log(f"⚠️ [zr] 共隔离 {len(rejected)} 个问题节点，详见 {QUARANTINE_FILE}")
+    timer.extra["rejected"] = len(rejected)
+    return valid
+
+def apply_nodes(config, new_proxies: list, timer: SyncTimer, group_rules: dict = None):
+    write_log("🔍 [zr] 开始注入代理节点...")
+    # 🔄 修改：完全替换模式 - 先清空现有节点
+    with timer.stage("inject_proxies"):
+        config["proxies"] = []
+        inject_proxies(config, new_proxies)
+    write_log("✅ [zr] 代理节点注入完成")
+
+    write_log("🔍 [zr] 开始注入策略组...")
+    with timer.stage("inject_groups"):
+        if SYNC_LATENCY_ORDER:
+            # 按测速历史排列策略组成员，延迟低的在前
+            names = order_by_latency(new_proxies, LatencyStore())
+        else:
+            names = [p["name"] for p in new_proxies]
+        inject_groups(config, names, group_rules)
+    write_log("✅ [zr] 策略组注入完成")
+
+def run_sync(timer: SyncTimer, priority: dict = None) -> int:
     write_log("🚀 [zr] 开始执行同步脚本...")
-    
+
     # 检查OpenClash是否安装
     write_log("🔍 [zr] 检查OpenClash安装状态...")
-    openclash_status = os.system("opkg list-installed | grep openclash > /dev/null 2>&1")
-    if openclash_status != 0:
+    with timer.stage("check_install"):
+        installed = is_openclash_installed()
+    if not installed:
         write_log("❌ [zr] OpenClash未安装，请先安装OpenClash")
-        exit(1)
+        timer.status = "failed"
+        return 1
     write_log("✅ [zr] OpenClash已安装")
-    
-    nodes_file = "/root/OpenClashManage/wangluo/nodes.txt"
-    md5_record_file = "/root/OpenClashManage/wangluo/nodes_content.md5"
-    
+
     # 获取OpenClash配置文件路径
     write_log("🔍 [zr] 获取OpenClash配置文件路径...")
-    config_file = os.popen("uci get openclash.config.config_path").read().strip()
+    with timer.stage("config_path"):
+        config_file = get_openclash_config_path()
     if not config_file:
         write_log("❌ [zr] 无法获取OpenClash配置文件路径")
-        exit(1)
+        timer.status = "failed"
+        return 1
     write_log(f"✅ [zr] 配置文件路径: {config_file}")
-    
+
     # 检查配置文件是否存在
     if not os.path.exists(config_file):
         write_log(f"❌ [zr] 配置文件不存在: {config_file}")
-        exit(1)
+        timer.status = "failed"
+        return 1
     write_log("✅ [zr] 配置文件存在")
 
-    write_log("🔍 [zr] 读取节点文件...")
-    with open(nodes_file, "r", encoding="utf-8") as f:
-        content = f.read()
-    current_md5 = hashlib.md5(content.encode()).hexdigest()
-    write_log(f"✅ [zr] 节点文件MD5: {current_md5}")
+    write_log("🔍 [zr] 检查节点文件变化...")
+    detector = ChangeDetector(nodes_file)
+    with timer.stage("detect_change"):
+        changed, record = detector.check()
+    if not changed:
+        write_log("✅ [zr] nodes.txt 内容无变化，无需重启 OpenClash")
+        timer.status = "unchanged"
+        return 0
+    write_log(f"📝 [zr] 检测到 nodes.txt 内容发生变更 ({record['digest']})，准备更新配置 ...")
 
-    previous_md5 = ""
-    if os.path.exists(md5_record_file):
-        with open(md5_record_file, "r") as f:
-            previous_md5 = f.read().strip()
-        write_log(f"🔍 [zr] 上次MD5: {previous_md5}")
-
-    write_log("🔍 [zr] 读取OpenClash配置文件...")
-    yaml = YAML()
-    yaml.preserve_quotes = True
-    with open(config_file, "r", encoding="utf-8") as f:
-        config = yaml.load(f)
-    existing_nodes_count = len(config.get("proxies") or [])
-    write_log(f"✅ [zr] 当前配置中有 {existing_nodes_count} 个节点")
+    with timer.stage("load_profiles"):
+        profiles = load_profiles()
+    if profiles:
+        result = run_profiles(timer, profiles, config_file, priority)
+        if result == 0:
+            detector.commit(record)
+            timer.status = "success"
+        elif timer.status != "rollback":
+            timer.status = "failed"
+        return result
 
-    if current_md5 == previous_md5:
-        write_log(f"✅ [zr] nodes.txt 内容无变化，无需重启 OpenClash，当前节点数：{existing_nodes_count} 个")
-        os.remove(lock_file)
-        exit(0)
-    else:
-        write_log("📝 [zr] 检测到 nodes.txt 内容发生变更，准备更新配置 ...")
-        with open(md5_record_file, "w") as f:
-            f.write(current_md5)
-        write_log("✅ [zr] 已更新MD5记录")
-
-    write_log("🔍 [zr] 开始解析节点...")
-    new_proxies = parse_nodes(nodes_file)
+    yaml, config, new_proxies = prepare_config(config_file, timer)
+    new_proxies = check_nodes(new_proxies, timer)
     if not new_proxies:
         write_log("⚠️ [zr] 未解析到任何有效节点，终止执行。")
-        exit(1)
+        timer.status = "failed"
+        return 1
     write_log(f"✅ [zr] 成功解析 {len(new_proxies)} 个节点")
+    timer.extra["nodes"] = len(new_proxies)
 
-    write_log("🔍 [zr] 开始注入代理节点...")
-    # 🔄 修改：完全替换模式 - 先清空现有节点
-    config["proxies"] = []
-    inject_proxies(config, new_proxies)
-    write_log("✅ [zr] 代理节点注入完成")
-
-    write_log("🔍 [zr] 开始注入策略组...")
-    inject_groups(config, [p["name"] for p in new_proxies])
-    write_log("✅ [zr] 策略组注入完成")
+    apply_nodes(config, new_proxies, timer)
 
     write_log("🔍 [zr] 开始验证配置...")
-    test_file = "/tmp/clash_verify_test.yaml"
-    with open(test_file, "w", encoding="utf-8") as f:
-        yaml.dump(config, f)
+    # 只序列化一次：验证与写入使用同一份字节，保证部署的就是验证过的内容
+    with timer.stage("serialize"):
+        data = serialize_config(yaml, config, timer)
+    timer.extra["config_bytes"] = len(data)
+    with timer.stage("write_staged"):
+        staged_file = write_staged(config_file, data)
     write_log("✅ [zr] 测试配置文件已生成")
 
-    if not verify_config(test_file):
+    with timer.stage("verify_config"):
+        verified = verify_config(staged_file)
+    if not verified:
+        os.remove(staged_file)
         write_log("❌ [zr] 配置验证失败，未写入配置，已退出。")
-        os.remove(test_file)
-        exit(1)
-    os.remove(test_file)
+        timer.status = "failed"
+        return 1
     write_log("✅ [zr] 配置验证通过")
 
-    write_log("🔍 [zr] 开始备份原配置...")
+    store = SnapshotStore()
+    backup_file = install_config(config_file, staged_file, data, f"同步 {len(new_proxies)} 个节点", store, timer)
+    if not restart_and_check(config_file, backup_file, priority, timer):
+        timer.status = "rollback"
+        return 1
+
+    # 同步成功后才保存状态记录，失败时下次触发会重新同步
+    detector.commit(record)
+    write_log("✅ [zr] 已更新节点文件状态记录")
+
+    write_log(f"🎉 [zr] 本次执行完成，已写入新配置并重启，总节点：{len(new_proxies)} 个")
+    write_log("✅ [zr] OpenClash 已重启运行，节点已同步完成")
+    timer.status = "success"
+    return 0
+
+def install_config(config_file: str, staged_file: str, data: bytes, note: str, store: SnapshotStore,
+                   timer: SyncTimer, prefix: str = "") -> str:
+    """备份原配置并用验证过的临时文件替换，返回回滚用的备份路径"""
+    write_log(f"🔍 [zr] 开始备份原配置 {config_file} ...")
+    # 硬链接用于重启失败时的即时回滚，快照库保存历史版本（内容未变时不会重复写入）
     backup_file = f"{config_file}.bak"
-    os.system(f"cp {config_file} {backup_file}")
+    with timer.stage(prefix + "backup"):
+        link_or_copy(config_file, backup_file)
+        try:
+            store.ensure(config_file, "同步前配置")
+        except Exception as e:
+            # 快照只是历史记录，写入失败（闪存已满、索引损坏等）不影响本次安装
+            write_log(f"⚠️ [zr] 保存同步前快照失败: {e}")
     write_log("✅ [zr] 原配置已备份")
 
     write_log("🔍 [zr] 开始写入新配置...")
-    with open(config_file, "w", encoding="utf-8") as f:
-        yaml.dump(config, f)
-    write_log("✅ [zr] 新配置已写入")
+    with timer.stage(prefix + "install"):
+        os.replace(staged_file, config_file)
+    with timer.stage(prefix + "snapshot"):
+        try:
+            snapshot = store.add(data, config_file, note)
+        except Exception as e:
+            # 新配置已经就位，必须继续重启，否则运行中的内核与磁盘上的配置不一致
+            write_log(f"⚠️ [zr] 新配置已写入，但保存快照失败: {e}")
+            return backup_file
+    write_log(f"✅ [zr] 新配置已写入，快照: {snapshot['id']}")
+    return backup_file
 
+def restart_and_check(config_file: str, backup_file: str, priority: dict, timer: SyncTimer) -> bool:
+    """重启 OpenClash 并检查日志，发现解析错误时回滚到备份并返回 False"""
     write_log("🔍 [zr] 开始重启 OpenClash...")
-    os.system("/etc/init.d/openclash restart")
-    time.sleep(8)
+    with timer.stage("restart"), normal_priority(priority):
+        os.system("/etc/init.d/openclash restart")
+        time.sleep(8)
     write_log("✅ [zr] OpenClash重启完成")
 
     write_log("🔍 [zr] 检查重启后状态...")
-    check_log = os.popen("logread | grep 'Parse config error' | tail -n 5").read()
+    with timer.stage("post_check"):
+        check_log = os.popen("logread | grep 'Parse config error' | tail -n 5").read()
     if "Parse config error" in check_log:
         write_log("❌ [zr] 检测到配置解析错误，已触发回滚 ...")
-        os.system(f"cp {backup_file} {config_file}")
-        os.system("/etc/init.d/openclash restart")
-        exit(1)
+        os.replace(backup_file, config_file)
+        with normal_priority(priority):
+            os.system("/etc/init.d/openclash restart")
+        return False
     write_log("✅ [zr] 重启后状态正常")
+    return True
 
-    write_log(f"🎉 [zr] 本次执行完成，已写入新配置并重启，总节点：{len(new_proxies)} 个")
-    write_log("✅ [zr] OpenClash 已重启运行，节点已同步完成")
+def build_profile(profile: dict, new_proxies: list) -> dict:
+    """在工作线程中为单个配置档生成并验证新配置，返回待安装的结果"""
+    name = profile["name"]
+    config_file = profile["config"]
+    timer = SyncTimer(name)
+    if not os.path.exists(config_file):
+        raise FileNotFoundError(f"配置文件不存在: {config_file}")
+    nodes = select_nodes(new_proxies, profile)
+    if not nodes:
+        raise ValueError("没有符合规则的节点")
+
+    yaml = YAML()
+    yaml.preserve_quotes = True
+    config = load_config(yaml, config_file, timer)
+    apply_nodes(config, nodes, timer, profile.get("groups"))
+    with timer.stage("serialize"):
+        data = serialize_config(yaml, config, timer, f"{FRAGMENT_CACHE_FILE}.{name}")
+    with timer.stage("write_staged"):
+        staged_file = write_staged(config_file, data)
+    with timer.stage("verify_config"):
+        verified = verify_config(staged_file)
+    if not verified:
+        os.remove(staged_file)
+        raise ValueError("配置验证失败")
+    return {"profile": profile, "data": data, "staged": staged_file, "nodes": len(nodes), "timer": timer}
+
+def run_profiles(timer: SyncTimer, profiles: list, active_file: str, priority: dict = None) -> int:
+    """多配置档模式：节点只解析一次，各配置档在工作线程中并行生成，只有当前启用的配置档触发重启"""
+    write_log(f"🔍 [zr] 多配置档模式，共 {len(profiles)} 个配置档，开始解析节点...")
+    with timer.stage("parse"):
+        new_proxies = parse_nodes(nodes_file)
+    new_proxies = check_nodes(new_proxies, timer)
+    if not new_proxies:
+        write_log("⚠️ [zr] 未解析到任何有效节点，终止执行。")
+        return 1
+    write_log(f"✅ [zr] 成功解析 {len(new_proxies)} 个节点")
+    timer.extra["nodes"] = len(new_proxies)
+
+    results = []
+    failed = []
+    workers = max(1, min(PROFILE_WORKERS, len(profiles)))
+    with timer.stage("build_profiles"), ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(p, pool.submit(build_profile, p, new_proxies)) for p in profiles]
+        for profile, future in futures:
+            try:
+                result = future.result()
+                timer.merge(result["timer"], profile["name"])
+                results.append(result)
+                write_log(f"✅ [zr] 配置档 {profile['name']} 已生成并验证通过，{result['nodes']} 个节点")
+            except Exception as e:
+                failed.append(profile["name"])
+                write_log(f"❌ [zr] 配置档 {profile['name']} 生成失败: {e}")
+
+    store = SnapshotStore()
+    active = None
+    for result in results:
+        profile = result["profile"]
+        with open(profile["config"], "rb") as f:
+            unchanged = f.read() == result["data"]
+        if unchanged:
+            # 重试时已写入过的配置档内容相同，不重复写入也不重启
+            os.remove(result["staged"])
+            write_log(f"✅ [zr] 配置档 {profile['name']} 内容未变化，跳过写入")
+            continue
+        note = f"同步 {result['nodes']} 个节点 ({profile['name']})"
+        backup_file = install_config(profile["config"], result["staged"], result["data"], note, store, timer,
+                                     f"{profile['name']}/")
+        if same_file(profile["config"], active_file):
+            active = (profile, backup_file)
+    timer.extra["profiles"] = {"written": [r["profile"]["name"] for r in results], "failed": failed}
+
+    if active is None:
+        write_log("ℹ️ [zr] 当前启用的配置不在已更新的配置档中，无需重启 OpenClash")
+    else:
+        profile, backup_file = active
+        timer.extra["profiles"]["active"] = profile["name"]
+        if not restart_and_check(profile["config"], backup_file, priority, timer):
+            timer.status = "rollback"
+            return 1
+
+    if failed:
+        write_log(f"⚠️ [zr] {len(failed)} 个配置档生成失败: {'、'.join(failed)}，下次触发时重试")
+        return 1
+    write_log(f"🎉 [zr] 多配置档同步完成，共写入 {len(results)} 个配置档，总节点：{len(new_proxies)} 个")
+    return 0
+
+def plan_sync(timer: SyncTimer = None) -> dict:
+    """只在内存中完成解析、注入与校验，返回配置差异；不写文件、不重启"""
+    timer = timer or SyncTimer("plan")
+    started = time.monotonic()
+    with timer.stage("config_path"):
+        config_file = get_openclash_config_path()
+    if not config_file or not os.path.exists(config_file):
+        raise FileNotFoundError(f"配置文件不存在: {config_file}")
+
+    with timer.stage("detect_change"):
+        changed, _ = ChangeDetector(nodes_file).check()
+
+    yaml, config, new_proxies = prepare_config(config_file, timer)
+    new_proxies = check_nodes(new_proxies, timer, persist=False)
+    if not new_proxies:
+        raise ValueError("未解析到任何有效节点")
+    before = capture_state(config)
+    apply_nodes(config, new_proxies, timer)
+
+    with timer.stage("diff"):
+        after = capture_state(config)
+        plan = diff_config(before, after, os.path.getsize(config_file))
+        plan["problems"] = check_references(config)
+
+    plan["config_file"] = config_file
+    plan["nodes_file_changed"] = changed
+    plan["parsed_nodes"] = len(new_proxies)
+    plan["rejected_nodes"] = timer.extra["rejected"]
+    plan["elapsed"] = round(time.monotonic() - started, 3)
+    plan["stages"] = timer.to_dict()["stages"]
+    return plan
+
+def sync_once(priority: dict = None) -> int:
+    timer = SyncTimer("zr")
+    waited = 0.0
+    try:
+        # 系统繁忙时先等待负载回落，等待时间不计入执行耗时
+        with timer.stage("wait_load"):
+            waited = wait_for_load()
+        if waited >= 1:
+            write_log(f"⏳ [zr] 系统负载较高，已等待 {waited:.0f} 秒后开始同步")
+        return run_sync(timer, priority)
+    except Exception as e:
+        import traceback
+        write_log(f"❌ [zr] 脚本执行出错: {e}")
+        write_log(f"❌ [zr] 错误详情: {traceback.format_exc()}")
+        timer.status = "error"
+        return 1
+    finally:
+        total_ms = timer.to_dict()["total_ms"]
+        timer.extra["wait_ms"] = round(waited * 1000, 2)
+        timer.extra["run_ms"] = round(max(0.0, total_ms - waited * 1000), 2)
+        timer.extra["nice"] = get_nice()
+        try:
+            timer.save()
+        except Exception as e:
+            write_log(f"⚠️ [zr] 保存同步耗时记录失败: {e}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="同步 nodes.txt 到 OpenClash 配置")
+    parser.add_argument("--plan", action="store_true", help="只预览配置差异，不写入、不重启")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出预览结果")
+    args = parser.parse_args()
+    # 同步与预览都在较低的 CPU/IO 优先级下进行，避免影响路由转发
+    priority = lower_priority()
+
+    if args.plan:
+        # 预览模式下标准输出只保留报告，日志仍写入日志文件
+        log.ENABLE_CONSOLE_OUTPUT = False
+        try:
+            plan = plan_sync()
+        except Exception as e:
+            print(f"❌ 生成同步计划失败: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps(plan, ensure_ascii=False, indent=2) if args.json else format_plan(plan))
+        return 0
 
-except Exception as e:
-    import traceback
-    write_log(f"❌ [zr] 脚本执行出错: {e}")
-    write_log(f"❌ [zr] 错误详情: {traceback.format_exc()}")
+    result = SyncScheduler().run(lambda: sync_once(priority))
+    if result is None:
+        write_log("⚠️ 已有运行中的更新任务，本次触发已合并，将在其结束后补跑一次。")
+        return EXIT_MERGED
+    return result
 
-finally:
-    if os.path.exists(lock_file):
-        os.remove(lock_file)
-        write_log("🔧 [zr] 已清理锁文件")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,14 @@
 # zw.py
 from ruamel.yaml import YAML
 import copy
-import os
 import re
 from jx import parse_nodes
 from log import write_log
+from env_probe import get_openclash_config_path
 
 yaml = YAML()
 yaml.preserve_quotes = True
 
-def get_openclash_config_path() -> str:
-    try:
-        return os.popen("uci get openclash.config.config_path").read().strip()
-    except Exception:
-        return ""
-
 def load_config(path: str):
     try:
         with open(path, "r", encoding="utf-8") as f: